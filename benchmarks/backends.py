@@ -0,0 +1,134 @@
+"""
+Run the same append and range-read workloads against every storage backend, and report throughput and latency.
+
+    python -m benchmarks.backends --years 1 --records-per-day 5 30
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import pathlib
+import tempfile
+import time
+
+from typing import Callable, Iterable
+
+import numpy as np
+
+from habit_tracker.database.storage import BACKENDS, Storage, create_database
+from habit_tracker.records import RecordBatch
+from .workload import Workload, fill, generate
+
+RANGES = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+@dataclasses.dataclass
+class Result:
+    backend: str
+    workload: str
+    records: int
+    latencies: list[float]
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.latencies)
+
+    @property
+    def ops_per_sec(self) -> float:
+        return len(self.latencies) / self.seconds if self.seconds else float("inf")
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.seconds if self.seconds else float("inf")
+
+    def percentile_ms(self, q: float) -> float:
+        return float(np.percentile(self.latencies, q)) * 1000
+
+    def as_dict(self) -> dict:
+        return {"backend": self.backend, "workload": self.workload, "ops": len(self.latencies),
+                "records": self.records, "seconds": self.seconds, "ops_per_sec": self.ops_per_sec,
+                "records_per_sec": self.records_per_sec, "p50_ms": self.percentile_ms(50),
+                "p95_ms": self.percentile_ms(95), "p99_ms": self.percentile_ms(99)}
+
+
+def timed(operations: Iterable[Callable[[], int]]) -> tuple[int, list[float]]:
+    """
+    Run a sequence of operations, each returning the number of records it handled.
+    :return: Total number of records, and the latency of every operation in seconds.
+    """
+    records, latencies = 0, []
+    for operation in operations:
+        start = time.perf_counter()
+        records += operation()
+        latencies.append(time.perf_counter() - start)
+    return records, latencies
+
+
+def run_backend(backend: str, workload: Workload, days: dict[datetime.date, RecordBatch], par_dir: pathlib.Path,
+                n_reads: int = 50) -> list[Result]:
+    results = []
+
+    def result(name, operations):
+        records, latencies = timed(operations)
+        results.append(Result(backend, name, records, latencies))
+
+    # The Tracker appends one record at a time.
+    db: Storage = create_database("append", workload.activities, par_dir, backend)
+    result("append", ((lambda date=date, record=record: db.update_log(date, record) or 1)
+                      for date, records in days.items() for record in records))
+
+    db = create_database("append_batch", workload.activities, par_dir, backend)
+    result("append_batch", ((lambda date=date, records=records: fill(db, {date: records}))
+                            for date, records in days.items()))
+
+    # Ranges are drawn over the whole calendar, days without records included.
+    rng = np.random.default_rng(workload.seed)
+    first, last = workload.first_date, workload.first_date + datetime.timedelta(days=workload.n_days - 1)
+    for name, length in RANGES.items():
+        n_starts = max((last - first).days - length + 2, 1)
+        starts = [first + datetime.timedelta(days=int(i)) for i in rng.integers(0, n_starts, n_reads)]
+        ranges = [(start, start + datetime.timedelta(days=length - 1)) for start in starts]
+        result(f"read_{name}", ((lambda start=start, end=end: sum(map(len, db.read_interval(start, end).values())))
+                                for start, end in ranges))
+        result(f"totals_{name}", ((lambda start=start, end=end: len(db.secs_between(start, end)))
+                                  for start, end in ranges))
+    return results
+
+
+def run(backends: Iterable[str], workload: Workload, n_reads: int = 50) -> list[Result]:
+    days = generate(workload)
+    results = []
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results += run_backend(backend, workload, days, pathlib.Path(tmp_dir), n_reads)
+    return results
+
+
+def print_table(results: list[Result]) -> None:
+    print(f"{'backend':<8} {'workload':<20} {'ops':>7} {'ops/s':>10} {'records/s':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r.backend:<8} {r.workload:<20} {len(r.latencies):>7} {r.ops_per_sec:>10.0f} "
+              f"{r.records_per_sec:>11.0f} {r.percentile_ms(50):>8.3f} {r.percentile_ms(95):>8.3f} "
+              f"{r.percentile_ms(99):>8.3f}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--records-per-day", type=int, nargs=2, default=[5, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--reads", type=int, default=50, help="Number of reads of every range length.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=pathlib.Path, help="Also write the results to this JSON file.")
+    args = parser.parse_args(args)
+
+    workload = Workload(years=args.years, records_per_day=tuple(args.records_per_day), seed=args.seed)
+    results = run(args.backends, workload, args.reads)
+    print_table(results)
+    if args.json:
+        args.json.write_text(json.dumps([r.as_dict() for r in results], indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Time the hot paths of the tracker on a synthetic multi-year workload, for every storage backend:
+Tracker.add_record throughput, read_interval latency per range length, Report.total_secs_per_activity and
+Graphics.workday rendering. Results are stored as JSON, tagged with the current commit, to compare runs:
+
+    python -m benchmarks.hot_paths --years 3 --json before.json
+    python -m benchmarks.hot_paths --years 3 --json after.json --compare before.json
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import subprocess
+import tempfile
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from habit_tracker.database.appender import BufferedAppender
+from habit_tracker.database.storage import BACKENDS, create_database
+from habit_tracker.plots import Graphics
+from habit_tracker.records import RecordBatch
+from habit_tracker.report import Report
+from habit_tracker.tracker import Tracker
+from .backends import RANGES, Result, print_table, timed
+from .workload import Workload, fill, generate
+
+# Ranges drawn on a figure: a year of intervals is not something anyone looks at.
+RENDER_RANGES = ("day", "week", "month")
+
+
+def run_backend(backend: str, workload: Workload, days: dict[datetime.date, RecordBatch], par_dir: pathlib.Path,
+                n_reads: int = 20, n_appends: int = 2000) -> list[Result]:
+    results = []
+
+    def result(name, operations):
+        records, latencies = timed(operations)
+        results.append(Result(backend, name, records, latencies))
+
+    # Appends go through the Tracker, as in the application: one record at a time.
+    records = [(date, record) for date, batch in days.items() for record in batch][:n_appends]
+    for name, max_records in (("add_record", 1), ("add_record_buffered", 100)):
+        db = create_database(name, workload.activities, par_dir, backend)
+        appender = BufferedAppender(db, max_records=max_records, owns_db=True)
+        trackers = {date: Tracker(db, date, appender) for date, _ in records}
+        result(name, ((lambda date=date, record=record: trackers[date].add_record(record) and 1)
+                      for date, record in records))
+        appender.close()
+
+    db = create_database("hot_paths", workload.activities, par_dir, backend)
+    fill(db, days)
+
+    rng = np.random.default_rng(workload.seed)
+    first, last = workload.first_date, workload.first_date + datetime.timedelta(days=workload.n_days - 1)
+    graphics = Graphics()
+    for name, length in RANGES.items():
+        n_starts = max((last - first).days - length + 2, 1)
+        starts = [first + datetime.timedelta(days=int(i)) for i in rng.integers(0, n_starts, n_reads)]
+        ranges = [(start, start + datetime.timedelta(days=length - 1)) for start in starts]
+        result(f"read_{name}", ((lambda start=start, end=end: sum(map(len, db.read_interval(start, end).values())))
+                                for start, end in ranges))
+
+        intervals = [db.read_interval(start, end) for start, end in ranges]
+        result(f"totals_{name}", ((lambda interval=interval: _totals(interval, workload.activities))
+                                  for interval in intervals))
+        if name in RENDER_RANGES:
+            result(f"workday_{name}", ((lambda interval=interval: _render(graphics, interval, workload.activities))
+                                       for interval in intervals))
+    db.close()
+    return results
+
+
+def _totals(interval: dict[datetime.date, RecordBatch], activities: list[str]) -> int:
+    Report(interval, activities).total_secs_per_activity
+    return sum(map(len, interval.values()))
+
+
+def _render(graphics: Graphics, interval: dict[datetime.date, RecordBatch], activities: list[str]) -> int:
+    graphics.workday(interval.items(), activities)
+    graphics.render("png")
+    return sum(map(len, interval.values()))
+
+
+def run(backends: Iterable[str], workload: Workload, n_reads: int = 20, n_appends: int = 2000) -> list[Result]:
+    days = generate(workload)
+    results = []
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results += run_backend(backend, workload, days, pathlib.Path(tmp_dir), n_reads, n_appends)
+    return results
+
+
+def run_info(workload: Workload) -> dict:
+    """ What a run depends on, so results are only compared with runs of the same workload."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "workload": workload.as_dict()}
+
+
+def compare(results: list[dict], baseline: list[dict]) -> list[tuple[str, str, float, float]]:
+    """
+    :return: (backend, workload, baseline p50 ms, p50 ms) of every workload measured in both runs.
+    """
+    baseline = {(r["backend"], r["workload"]): r for r in baseline}
+    return [(r["backend"], r["workload"], baseline[key]["p50_ms"], r["p50_ms"])
+            for r in results if (key := (r["backend"], r["workload"])) in baseline]
+
+
+def print_comparison(rows: list[tuple[str, str, float, float]]) -> None:
+    print(f"{'backend':<8} {'workload':<20} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for backend, workload, before, after in rows:
+        change = f"{(after / before - 1) * 100:+.0f}%" if before else "-"
+        print(f"{backend:<8} {workload:<20} {before:>10.3f} {after:>10.3f} {change:>8}")
+
+
+def main(args=None) -> Optional[dict]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--records-per-day", type=int, nargs=2, default=[5, 30], metavar=("MIN", "MAX"))
+    parser.add_argument("--reads", type=int, default=20, help="Number of reads of every range length.")
+    parser.add_argument("--appends", type=int, default=2000, help="Number of records added through the Tracker.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=pathlib.Path, help="Write the results to this JSON file.")
+    parser.add_argument("--compare", type=pathlib.Path, help="JSON results of a previous run to compare with.")
+    args = parser.parse_args(args)
+
+    workload = Workload(years=args.years, records_per_day=tuple(args.records_per_day), seed=args.seed)
+    results = run(args.backends, workload, args.reads, args.appends)
+    print_table(results)
+
+    report = {"run": run_info(workload), "results": [r.as_dict() for r in results]}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=4))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline["run"]["workload"] != report["run"]["workload"]:
+            print(f"Warning: {args.compare} was run with another workload.")
+        print(f"\nCompared with {baseline['run']['commit']} ({args.compare}):")
+        print_comparison(compare(report["results"], baseline["results"]))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Deterministic synthetic workloads: years of realistic records to fill any storage backend with.
+"""
+import dataclasses
+import datetime
+
+import numpy as np
+
+from habit_tracker.database.storage import Storage
+from habit_tracker.records import RecordBatch
+
+ACTIVITIES = ["work", "study", "workout", "read", "rest"]
+
+
+@dataclasses.dataclass
+class Workload:
+    """
+    Shape of the generated records. Every day starts at a random time around `day_start_hour`, and is a sequence of
+    intervals of random activities (picked with `activity_weights`) with short breaks between them. Interval
+    lengths follow a log-normal distribution, as most tracked intervals are short and a few are very long.
+    """
+    years: float = 1.0
+    first_date: datetime.date = datetime.date(2020, 1, 1)
+    activities: list[str] = dataclasses.field(default_factory=lambda: list(ACTIVITIES))
+    activity_weights: list[float] = dataclasses.field(default_factory=lambda: [0.45, 0.2, 0.1, 0.15, 0.1])
+    records_per_day: tuple[int, int] = (5, 30)  # Range of the number of records of a day with data.
+    median_interval_secs: int = 20 * 60
+    max_interval_secs: int = 4 * 3600
+    max_break_secs: int = 15 * 60
+    day_start_hour: float = 8.0
+    empty_weekday_ratio: float = 0.05  # Ratio of weekdays without any record.
+    empty_weekend_ratio: float = 0.5
+    seed: int = 0
+
+    @property
+    def n_days(self) -> int:
+        return int(round(self.years * 365.25))
+
+    def as_dict(self) -> dict:
+        """ JSON-compatible values of the fields."""
+        converters = {datetime.date: datetime.date.isoformat, tuple: list}
+        return {key: converters.get(type(value), lambda x: x)(value)
+                for key, value in dataclasses.asdict(self).items()}
+
+
+def generate(workload: Workload) -> dict[datetime.date, RecordBatch]:
+    """
+    Generate the records of a workload. The same workload always generates the same records.
+    :return: Records of every day with data, in date order.
+    """
+    rng = np.random.default_rng(workload.seed)
+    weights = np.asarray(workload.activity_weights, dtype=float)
+    weights /= weights.sum()
+    low, high = workload.records_per_day
+
+    days = dict()
+    for day in range(workload.n_days):
+        date = workload.first_date + datetime.timedelta(days=day)
+        empty_ratio = workload.empty_weekend_ratio if date.weekday() >= 5 else workload.empty_weekday_ratio
+        if rng.random() < empty_ratio:
+            continue
+
+        n = int(rng.integers(low, high + 1))
+        activity = rng.choice(len(weights), n, p=weights)
+        interval = rng.lognormal(np.log(workload.median_interval_secs), 1.0, n).astype(np.int64)
+        interval = np.clip(interval, 1, workload.max_interval_secs)
+        breaks = rng.integers(0, workload.max_break_secs + 1, n)
+        day_start = int(workload.day_start_hour * 3600 + rng.normal(0, 1800))
+        start = day_start + np.concatenate([[0], np.cumsum(interval + breaks)[:-1]])
+
+        in_day = start + interval <= 24 * 3600  # A day never spills over midnight.
+        days[date] = RecordBatch.from_rows(np.stack([activity, interval, start], axis=1)[in_day])
+    return days
+
+
+def fill(db: Storage, days: dict[datetime.date, RecordBatch]) -> int:
+    """
+    Write the records of every day to a database, one batch per day.
+    :return: Number of records written.
+    """
+    for date, records in days.items():
+        db.update_log(date, records)
+    return sum(map(len, days.values()))
@@ -1,9 +1,115 @@
+import atexit
+import copy
+import datetime
 import logging
+import logging.handlers
+import os
+import pathlib
+import queue
+import warnings
+
+from typing import Optional, Union
+
 from habit_tracker import settings
 
+LOG_FORMAT = "%(asctime)s %(levelname)-8s [%(threadName)s] %(name)s: %(message)s"
+# Arguments of a log message that format the same later as when they are logged.
+_IMMUTABLE_ARG_TYPES = {str, int, float, bool, bytes, type(None), datetime.date, datetime.datetime,
+                        datetime.timedelta}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue log records without formatting them when it's safe. QueueHandler formats every record before enqueuing
+    it, in the logging thread. The queue never leaves the process here, so messages whose arguments are all
+    immutable are formatted by the listener thread instead. Any other argument (e.g. a list, or an object with its
+    own __str__) could change or be used by another thread meanwhile, so such messages are formatted right away.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if not args:
+            return record
+        values = args.values() if isinstance(args, dict) else args
+        if all(type(value) in _IMMUTABLE_ARG_TYPES for value in values):
+            return record
+        record = copy.copy(record)  # Other handlers of the logger still get the original record.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def config_logger(log_dir: pathlib.Path = None, level: Union[int, str] = None,
+                  levels: dict[str, Union[int, str]] = None, max_bytes: int = settings.LOG_MAX_BYTES,
+                  backup_count: int = settings.LOG_BACKUP_COUNT) -> logging.handlers.QueueListener:
+    """
+    Send the logs of the application to a size-rotated file, through a queue: the logging threads only enqueue
+    their records, and a listener thread formats and writes them. Calling it again replaces the previous setup.
+    :param log_dir: Folder of the log file. Defaults to settings.LOGS_DIR.
+    :param level: Level of the root logger. Defaults to settings.LOG_LEVEL.
+    :param levels: Levels of specific loggers (e.g. {"habit_tracker.database": "DEBUG"}), on top of
+                   settings.LOG_LEVELS and of the HABIT_TRACKER_LOG_LEVELS environment variable.
+    :param max_bytes: Size of the log file that triggers a rotation.
+    :param backup_count: Number of rotated files kept.
+    :return: The listener writing the logs. It's stopped (and the queue drained) when the program exits.
+    """
+    global _listener, _queue_handler
+    stop_logger()
+
+    log_dir = log_dir if log_dir else settings.LOGS_DIR
+    log_dir.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(log_dir / settings.LOG_FILE_NAME, maxBytes=max_bytes,
+                                                        backupCount=backup_count, delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = _LazyQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level if level is not None else settings.LOG_LEVEL)
+    all_levels = {**settings.LOG_LEVELS, **_env_levels(), **(levels if levels else dict())}
+    for name, logger_level in all_levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    # The listener runs before records are enqueued, so none waits in the queue for it.
+    _listener.start()
+    root.addHandler(_queue_handler)
+    atexit.register(stop_logger)
+    return _listener
+
+
+def stop_logger() -> None:
+    """ Write the queued records, and detach the pipeline set up by config_logger, if any."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    atexit.unregister(stop_logger)
+
 
-def config_logger():
-    logging.basicConfig(
-        filename=settings.LOGS_DIR / 'output.log',
-        level=logging.DEBUG
-    )
+def _env_levels() -> dict[str, Union[int, str]]:
+    """
+    Levels of the HABIT_TRACKER_LOG_LEVELS environment variable, e.g. "habit_tracker.database=DEBUG,PIL=40".
+    Items that aren't a logger name and a known level are skipped with a warning.
+    """
+    levels = dict()
+    for item in os.environ.get(settings.LOG_LEVELS_ENV_VAR, "").split(","):
+        if not item.strip():
+            continue
+        name, _, level = (part.strip() for part in item.partition("="))
+        level = int(level) if level.isdigit() else level.upper()
+        if not name or not isinstance(level, int) and not isinstance(logging.getLevelName(level), int):
+            warnings.warn(f"Ignoring '{item.strip()}' in {settings.LOG_LEVELS_ENV_VAR}: expected <logger>=<level>, "
+                          f"with a level such as DEBUG, INFO, WARNING or ERROR.")
+            continue
+        levels[name] = level
+    return levels
@@ -0,0 +1,94 @@
+import datetime
+
+import numpy as np
+
+from .records import RecordBatch
+
+
+class Aggregates:
+    """
+    Per-activity totals of a set of days, accumulated one day at a time with numpy.bincount over the activity
+    column, weighted by the interval duration.
+    """
+
+    def __init__(self, n_activities: int = 0):
+        self._n_activities = n_activities
+        self._secs_per_day: dict[datetime.date, np.ndarray] = dict()
+        self._secs = np.zeros(n_activities, dtype=np.int64)
+        self._counts = np.zeros(n_activities, dtype=np.int64)
+
+    @classmethod
+    def from_days(cls, days, n_activities: int = 0):
+        """
+        :param days: Iterable of (date, RecordBatch) pairs.
+        :param n_activities: Size of the activity set, so every array has one column per activity.
+        """
+        aggregates = cls(n_activities)
+        for date, records in days:
+            aggregates.add_day(date, records)
+        return aggregates
+
+    def add_day(self, date: datetime.date, records: RecordBatch) -> None:
+        # Records without activity (e.g. Tracker.stop() called before start()) are not aggregated.
+        secs = records.secs_per_activity(minlength=self._n_activities)
+        counts = records.records_per_activity(minlength=self._n_activities)
+
+        if len(secs) > len(self._secs):
+            self._resize(len(secs))
+        secs = np.pad(secs, (0, len(self._secs) - len(secs)))
+        counts = np.pad(counts, (0, len(self._counts) - len(counts)))
+
+        previous = self._secs_per_day.get(date)
+        self._secs_per_day[date] = secs if previous is None else previous + secs
+        self._secs += secs
+        self._counts += counts
+
+    def add_summary(self, date: datetime.date, secs_per_activity: dict[int, int],
+                    records_per_activity: dict[int, int]) -> None:
+        """
+        Add a day from its precomputed totals (see LogEntry) instead of its records.
+        """
+        n_activities = max([len(self._secs)] + [idx + 1 for idx in secs_per_activity])
+        if n_activities > len(self._secs):
+            self._resize(n_activities)
+
+        secs = np.zeros(len(self._secs), dtype=np.int64)
+        secs[list(secs_per_activity)] = list(secs_per_activity.values())
+        self._counts[list(records_per_activity)] += list(records_per_activity.values())
+
+        previous = self._secs_per_day.get(date)
+        self._secs_per_day[date] = secs if previous is None else previous + secs
+        self._secs += secs
+
+    def _resize(self, n_activities: int) -> None:
+        self._n_activities = n_activities
+        self._secs = np.pad(self._secs, (0, n_activities - len(self._secs)))
+        self._counts = np.pad(self._counts, (0, n_activities - len(self._counts)))
+        for date, secs in self._secs_per_day.items():
+            self._secs_per_day[date] = np.pad(secs, (0, n_activities - len(secs)))
+
+    @property
+    def secs_per_activity(self) -> np.ndarray:
+        """ Total seconds per activity index."""
+        return self._secs
+
+    @property
+    def counts_per_activity(self) -> np.ndarray:
+        """ Number of records per activity index."""
+        return self._counts
+
+    @property
+    def secs_per_day(self) -> dict[datetime.date, np.ndarray]:
+        """ Seconds per activity index for every day with records."""
+        return self._secs_per_day
+
+    @property
+    def total_secs(self) -> int:
+        return int(self._secs.sum())
+
+    def as_dict(self) -> dict[int, int]:
+        """
+        :return: Total seconds of every activity with at least one record, keyed by activity index.
+        """
+        present = np.flatnonzero(self._counts)
+        return dict(zip(present.tolist(), self._secs[present].tolist()))
@@ -1,12 +1,24 @@
+import asyncio
+import datetime
+import logging
+
 from enum import Enum, auto
+from typing import Callable
 
+from .plots import Graphics
+from .settings import DEF_DB_PAR_DIR
 from .tracker import Tracker
-from .database.csv.database import CSVDatabase
+from .database.registry import DatabaseRegistry
+from .database.storage import create_database, load_database
 from .view.cli import CliView
 
 import pathlib
 
-DEF_DB_PAR_DIR = pathlib.Path('.db')
+logger = logging.getLogger(__name__)
+
+DEF_DB_BACKEND = 'csv'
+DEF_CHECKPOINT_INTERVAL = 60.0
+DEF_STATUS_INTERVAL = 1.0
 
 
 class Stage(Enum):
@@ -20,25 +32,27 @@ class Stage(Enum):
 
 class Controller:
     """ The controller communicates the View (UI) with the Model (Tracker)."""
-    def __init__(self, view: CliView, db_par_dir: pathlib.Path = None):
+    def __init__(self, view: CliView, db_par_dir: pathlib.Path = None, db_backend: str = DEF_DB_BACKEND):
         self.tracker = None
         self.gui = view
         self.db_par_dir: pathlib.Path = db_par_dir if db_par_dir else DEF_DB_PAR_DIR
+        self.db_backend = db_backend  # Backend of new databases. Existing ones keep the one in their metadata.
+        self.graphics = Graphics(interactive=True)  # Shared by every report shown
 
         if not self.db_par_dir.exists():
             self.db_par_dir.mkdir(parents=True)
 
-        self.db_list = self.find_databases()  # TODO: db's created after init are not listed here
+        self.registry = DatabaseRegistry(self.db_par_dir)
 
         self.stage = Stage.SelectDatabase
 
+    @property
+    def db_list(self) -> list[str]:
+        """ Names of the databases, up to date with the ones created or deleted since the start."""
+        return self.find_databases()
+
     def find_databases(self) -> list[str]:
-        db_list = []
-        db_par_dir_items = self.db_par_dir.iterdir()
-        for item in db_par_dir_items:
-            if item.is_dir() and (item / "metadata.json").is_file():
-                db_list.append(item.name)
-        return db_list
+        return self.registry.names()
 
     def run(self) -> None:
         """
@@ -61,18 +75,19 @@ class Controller:
 
     def select_database(self):
         self.gui.section_intro("Choose Database")
-        if not self.db_list:
+        db_list = self.db_list
+        if not db_list:
             self.gui.message("No databases found.")
             self.stage = Stage.CreateDatabase
             return
 
         else:
-            load_db = self.gui.confirm(f'{len(self.db_list)} existing database(s) found. Load?')
+            load_db = self.gui.confirm(f'{len(db_list)} existing database(s) found. Load?')
 
             if load_db:
-                selected = self.gui.options_menu("Choose your database", self.db_list)
+                selected = self.gui.options_menu("Choose your database", db_list)
                 self.gui.message(f'Loading database: {selected}')
-                db = CSVDatabase.load_from_name(selected, self.db_par_dir)
+                db = load_database(selected, self.db_par_dir)
             else:
                 self.stage = Stage.CreateDatabase
                 return
@@ -89,7 +104,7 @@ class Controller:
 
         else:
             activities_list = self.gui.get_list("Type a list of activities to track.")
-            db = CSVDatabase.create(db_name, activities_list, self.db_par_dir)
+            db = create_database(db_name, activities_list, self.db_par_dir, self.db_backend)
 
             self.tracker = Tracker(db)
             self.stage = Stage.Track
@@ -128,7 +143,7 @@ class Controller:
         self.gui.section_intro("Show reports")
         if self.gui.confirm("Show today's report?"):
             self.gui.message("Close the popup window to proceed...")
-            report = self.tracker.generate_report(start_date='today')
+            report = self.tracker.generate_report(start_date='today', graphics=self.graphics)
             report.show()
             report.graphics.fig.savefig("sample")
 
@@ -144,7 +159,7 @@ class Controller:
                 end_date = self.gui.get_input_date("> End date [dd-mm-yyyy]: ")
 
             self.gui.message("Close the popup window to proceed...")
-            report = self.tracker.generate_report(start_date, end_date)
+            report = self.tracker.generate_report(start_date, end_date, graphics=self.graphics)
             report.show()
 
         self.stage = Stage.End
@@ -153,4 +168,94 @@ class Controller:
         pass
 
     def end_program(self):
-        pass
+        if self.tracker is not None:
+            self.tracker.close()
+
+
+class AsyncController(Controller):
+    """
+    Controller running on an asyncio event loop. Blocking prompts of the view run in a worker thread, so while an
+    activity is tracked the loop checkpoints it to the database every `checkpoint_interval` seconds, refreshes its
+    status, and is free to serve any other task.
+    """
+    def __init__(self, view: CliView, db_par_dir: pathlib.Path = None, db_backend: str = DEF_DB_BACKEND,
+                 checkpoint_interval: float = DEF_CHECKPOINT_INTERVAL, status_interval: float = DEF_STATUS_INTERVAL):
+        """
+        :param checkpoint_interval: Seconds between writes of the activity being tracked (see Tracker.checkpoint).
+        :param status_interval: Seconds between refreshes of the status shown while tracking.
+        """
+        super().__init__(view, db_par_dir, db_backend)
+        self.checkpoint_interval = checkpoint_interval
+        self.status_interval = status_interval
+
+    def run(self) -> None:
+        asyncio.run(self.run_async())
+
+    async def run_async(self) -> None:
+        """
+        Asynchronous version of Controller.run(), to run it as a task of an existing event loop.
+        :return: None
+        """
+        try:
+            while self.stage != Stage.End:
+                if self.stage == Stage.SelectDatabase:
+                    await asyncio.to_thread(self.select_database)
+                if self.stage == Stage.CreateDatabase:
+                    await asyncio.to_thread(self.create_database)
+                if self.stage == Stage.Track:
+                    await self.track_async()
+                # Reports stay in the loop thread: GUI toolkits only show windows from the main thread.
+                if self.stage == Stage.DailyReport:
+                    self.show_daily_reports()
+                if self.stage == Stage.OtherReports:
+                    self.show_history_report()
+        finally:
+            self.end_program()
+
+    async def track_async(self) -> None:
+        self.gui.print_separator()
+        await asyncio.to_thread(self.ask_new_entry)
+        await self.wait_async()
+        if not await asyncio.to_thread(self.gui.confirm, "Track a new activity?"):
+            self.stage = Stage.DailyReport
+            self.save_reports()
+        else:
+            self.stage = Stage.Track
+
+    async def wait_async(self) -> None:
+        """
+        Wait for the view to end the tracking of the current activity, checkpointing it meanwhile.
+        :return: None
+        """
+        stopped = asyncio.Event()
+        timers = [asyncio.create_task(self._every(self.checkpoint_interval, self.tracker.checkpoint, stopped)),
+                  asyncio.create_task(self._every(self.status_interval, self.refresh_status, stopped))]
+        try:
+            await asyncio.to_thread(self.gui.wait_input, "Do your best!", "q")
+        finally:
+            # The timers end once their current call is done, so none runs along with stop().
+            stopped.set()
+            await asyncio.gather(*timers)
+            self.tracker.stop()
+
+    def refresh_status(self) -> None:
+        activity = self.tracker.activity_set[self.tracker.current_activity]
+        elapsed = datetime.timedelta(seconds=self.tracker.elapsed_seconds)
+        self.gui.update_status(f"{activity}: {elapsed}")
+
+    @staticmethod
+    async def _every(interval: float, callback: Callable[[], object], stopped: asyncio.Event) -> None:
+        """
+        Call a function on a worker thread every `interval` seconds, until `stopped` is set. A failing call is
+        logged, and the next ones still run.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(stopped.wait(), interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.to_thread(callback)
+            except Exception:
+                logger.exception("%s failed", getattr(callback, "__qualname__", callback))
@@ -0,0 +1,290 @@
+"""
+Local tracking daemon: owns the databases and their Trackers, and serves newline-delimited JSON events from any
+number of local clients over a Unix domain socket.
+
+    python -m habit_tracker.daemon [--socket /tmp/habit_tracker.sock] [--db-dir .db]
+
+Every line sent is one event, answered by one line, in order:
+
+    {"op": "start", "db": "work", "activity": "coding"}      -> {"ok": true}
+    {"op": "stop", "db": "work"}                              -> {"ok": true}
+    {"op": "record", "db": "work", "activity": 0, "interval_seconds": 60, "seconds_from_start": 3600}
+    {"op": "status", "db": "work"}                            -> {"ok": true, "tracking": true, "activity": "coding"}
+    {"op": "query", "db": "work", "period": "week"}           -> {"ok": true, "totals": {"coding": 3600}}
+    {"op": "flush"}
+
+An optional "id" field is echoed in the answer. Lines longer than MAX_EVENT_BYTES are answered with an error.
+Records are written to storage in groups, every `flush_records` records per database or every `flush_delay`
+seconds, and when the daemon stops. Events are served one at a time on a worker thread, so storage I/O never
+blocks the event loop.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import pathlib
+import signal
+import socket
+import tempfile
+import threading
+
+from typing import Optional, Union
+
+from .database.appender import BufferedAppender
+from .database.storage import load_database
+from .records import Record
+from .settings import DEF_DB_PAR_DIR
+from .tracker import Tracker
+
+logger = logging.getLogger(__name__)
+
+DEF_SOCKET_PATH = pathlib.Path(tempfile.gettempdir()) / "habit_tracker.sock"
+MAX_EVENT_BYTES = 64 * 1024
+
+
+class EventError(Exception):
+    """ An event that can't be served. Its message is sent back to the client."""
+
+
+class TrackingDaemon:
+
+    def __init__(self, db_par_dir: pathlib.Path = DEF_DB_PAR_DIR, socket_path: pathlib.Path = DEF_SOCKET_PATH,
+                 flush_records: int = 100, flush_delay: float = 1.0):
+        """
+        :param db_par_dir: Folder of the databases.
+        :param socket_path: Path of the Unix domain socket to listen to.
+        :param flush_records: Number of buffered records of a database that triggers a write.
+        :param flush_delay: Maximum time (seconds) a record stays buffered.
+        """
+        self.db_par_dir = db_par_dir
+        self.socket_path = socket_path
+        self.flush_records = flush_records
+        self.flush_delay = flush_delay
+
+        self._appenders: dict[str, BufferedAppender] = dict()
+        self._trackers: dict[str, Tracker] = dict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopped: Optional[asyncio.Event] = None
+        # Serialises the work done on the worker threads: trackers and appenders aren't shared between threads.
+        self._busy: Optional[asyncio.Lock] = None
+
+    async def start(self) -> None:
+        """ Start listening. Use serve_forever() to also wait until the daemon is stopped."""
+        self._stopped = asyncio.Event()
+        self._busy = asyncio.Lock()
+        if self.socket_path.exists():
+            self.socket_path.unlink()  # Left by a daemon that didn't stop cleanly.
+        self._server = await asyncio.start_unix_server(self._handle_client, path=str(self.socket_path),
+                                                       limit=MAX_EVENT_BYTES)
+        self._flush_task = asyncio.create_task(self._flush_periodically())
+        logger.info("Listening on %s", self.socket_path)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        await self._stopped.wait()
+        await self.stop()
+
+    async def stop(self) -> None:
+        """ Stop listening, and write every buffered record."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            self._flush_task.cancel()
+        if self._busy is None:
+            self._close()  # Never started: nothing else can be running.
+        else:
+            async with self._busy:
+                await asyncio.to_thread(self._close)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        logger.info("Stopped")
+
+    def handle_event(self, event: dict) -> dict:
+        """
+        Serve a single event. It may read or write storage, so the daemon calls it on a worker thread.
+        :return: Answer to the event.
+        """
+        op = event.get("op")
+        if op == "flush":
+            for tracker in self._trackers.values():
+                tracker.flush()
+            return {"ok": True}
+
+        tracker = self._tracker(event.get("db"))
+        if op == "start":
+            if tracker.is_tracking:
+                tracker.stop(flush=False)
+            tracker.start(self._activity_idx(tracker, event.get("activity")))
+            return {"ok": True}
+        if op == "stop":
+            if not tracker.is_tracking:
+                raise EventError("Not tracking any activity.")
+            tracker.stop(flush=False)
+            return {"ok": True}
+        if op == "record":
+            try:
+                record = Record(self._activity_idx(tracker, event.get("activity")), int(event["interval_seconds"]),
+                                int(event["seconds_from_start"]))
+            except (KeyError, TypeError, ValueError):
+                raise EventError("A record needs an activity, interval_seconds and seconds_from_start.")
+            if not tracker.add_record(record):
+                raise EventError("Can't add a record while tracking an activity.")
+            return {"ok": True}
+        if op == "status":
+            activity = tracker.activity_set[tracker.current_activity] if tracker.is_tracking else None
+            return {"ok": True, "tracking": tracker.is_tracking, "activity": activity}
+        if op == "query":
+            try:
+                totals = tracker.totals_to_date(event.get("period", "week"))
+            except ValueError as e:
+                raise EventError(str(e))
+            return {"ok": True, "totals": {tracker.activity_set[idx]: secs for idx, secs in totals.items()}}
+        raise EventError(f"Unknown op '{op}'.")
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial  # Last line, sent without a newline. Empty once the client is done.
+                except asyncio.LimitOverrunError:
+                    await self._skip_line(reader)
+                    line = None
+                if line == b"":
+                    break
+
+                if line is None:
+                    answer = json.dumps({"ok": False, "error": f"An event can't be longer than {MAX_EVENT_BYTES} "
+                                                               f"bytes."})
+                else:
+                    async with self._busy:
+                        answer = await asyncio.to_thread(self._answer, line)
+                writer.write(answer.encode() + b"\n")
+                await writer.drain()  # Only waits if the client is slower to read than we are to answer.
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _skip_line(reader: asyncio.StreamReader) -> None:
+        """ Drop a line longer than the limit of the stream, up to its newline (or the end of the stream)."""
+        while True:
+            try:
+                await reader.readuntil(b"\n")
+                return
+            except asyncio.LimitOverrunError as e:
+                await reader.readexactly(e.consumed)
+            except asyncio.IncompleteReadError:
+                return
+
+    def _answer(self, line: bytes) -> str:
+        event = None
+        try:
+            event = json.loads(line)
+            if not isinstance(event, dict):
+                raise EventError("An event must be a JSON object.")
+            answer = self.handle_event(event)
+        except json.JSONDecodeError:
+            answer = {"ok": False, "error": "Not valid JSON."}
+        except EventError as e:
+            answer = {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.exception("Failed to serve event %s", event)
+            answer = {"ok": False, "error": f"Internal error: {e}"}
+        if isinstance(event, dict) and "id" in event:
+            answer["id"] = event["id"]
+        return json.dumps(answer)
+
+    def _tracker(self, db_name: Optional[str]) -> Tracker:
+        """
+        Tracker of a database, loaded on first use. A new one is created for each new day, once the one of the
+        previous day isn't tracking any activity.
+        """
+        if not db_name:
+            raise EventError("Missing the 'db' of the event.")
+        today = datetime.date.today()
+        tracker = self._trackers.get(db_name)
+        if tracker is not None and (tracker.date == today or tracker.is_tracking):
+            return tracker
+
+        appender = self._appenders.get(db_name)
+        if appender is None:
+            db = load_database(db_name, self.db_par_dir)
+            if db is None:
+                raise EventError(f"No database named '{db_name}'.")
+            appender = self._appenders[db_name] = BufferedAppender(db, max_records=self.flush_records, owns_db=True)
+        tracker = self._trackers[db_name] = Tracker(appender.db, today, appender)
+        return tracker
+
+    @staticmethod
+    def _activity_idx(tracker: Tracker, activity: Union[str, int, None]) -> int:
+        activity_set = tracker.activity_set
+        if isinstance(activity, str) and activity in activity_set:
+            return activity_set.index(activity)
+        if isinstance(activity, int) and not isinstance(activity, bool) and 0 <= activity < len(activity_set):
+            return activity
+        raise EventError(f"Unknown activity {activity!r}. Choose one of: {', '.join(activity_set)}.")
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_delay)
+            try:
+                async with self._busy:
+                    await asyncio.to_thread(self._flush)
+            except Exception:
+                # The records stay buffered, and are written by the next flush.
+                logger.exception("Failed to flush the buffered records")
+
+    def _flush(self) -> None:
+        for tracker in self._trackers.values():
+            tracker.flush()
+
+    def _close(self) -> None:
+        for appender in self._appenders.values():
+            appender.close()
+        self._trackers.clear()
+        self._appenders.clear()
+
+
+def send_events(events: list[dict], socket_path: pathlib.Path = DEF_SOCKET_PATH) -> list[dict]:
+    """
+    Send events to a running daemon from a script, in a single connection.
+    :return: The answer to every event, in order.
+    """
+    def send():
+        sock.sendall(b"".join(json.dumps(event).encode() + b"\n" for event in events))
+        sock.shutdown(socket.SHUT_WR)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        # Answers are read while sending, or both ends could block on full socket buffers.
+        sender = threading.Thread(target=send)
+        sender.start()
+        with sock.makefile("rb") as f:
+            answers = [json.loads(line) for line in f]
+        sender.join()
+        return answers
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", type=pathlib.Path, default=DEF_SOCKET_PATH)
+    parser.add_argument("--db-dir", type=pathlib.Path, default=DEF_DB_PAR_DIR)
+    parser.add_argument("--flush-records", type=int, default=100)
+    parser.add_argument("--flush-delay", type=float, default=1.0)
+    args = parser.parse_args(args)
+
+    daemon = TrackingDaemon(args.db_dir, args.socket, args.flush_records, args.flush_delay)
+    asyncio.run(daemon.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
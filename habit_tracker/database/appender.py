@@ -0,0 +1,110 @@
+import atexit
+import datetime
+import threading
+import time
+import weakref
+
+from typing import Optional, Union
+
+from .storage import Storage
+from .. import tracing
+from ..records import Record, RecordBatch
+
+# Open appenders, flushed when the interpreter exits. The set doesn't keep them alive.
+_OPEN_APPENDERS: "weakref.WeakSet[BufferedAppender]" = weakref.WeakSet()
+
+
+class BufferedAppender:
+    """
+    Long-lived append path of a database: records are buffered and written in groups, so the cost of an append
+    (opening the day log, saving the manifest, committing a transaction...) is paid once per group.
+    The buffer is flushed when it holds `max_records` records, `max_delay` seconds after its first record, when the
+    day of the records changes, and on flush()/close() (also called when the interpreter exits).
+    Flushes hold the lock of the database, so they may run on a timer thread while other threads read it.
+    """
+
+    def __init__(self, db: Storage, max_records: int = 1, max_delay: Optional[float] = None, fsync: bool = False,
+                 owns_db: bool = False):
+        """
+        :param db: Database to append to.
+        :param max_records: Number of buffered records that triggers a flush. 1 writes every record at once.
+        :param max_delay: Maximum time (seconds) a record stays in the buffer. None waits for the other triggers.
+        :param fsync: If True, every flush is forced to disk before returning.
+        :param owns_db: If True, close() also closes the database. Otherwise, it's left to whoever opened it.
+        """
+        self._db = db
+        self.owns_db = owns_db
+        self.max_records = max_records
+        self.max_delay = max_delay
+        self.fsync = fsync
+
+        self._date: Optional[datetime.date] = None
+        self._buffer: list[RecordBatch] = []
+        self._n_buffered = 0
+        self._first_buffered_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        _OPEN_APPENDERS.add(self)
+
+    def add(self, date: datetime.date, records: Union[Record, RecordBatch]) -> None:
+        records = RecordBatch.coerce(records)
+        with self._lock:
+            if self._date is not None and date != self._date:
+                self.flush()  # Day rollover: the buffer only holds records of a single day.
+            self._date = date
+            self._buffer.append(records)
+            self._n_buffered += len(records)
+
+            if self._n_buffered >= self.max_records or self._is_overdue():
+                self.flush()
+            elif self._first_buffered_at is None:
+                self._first_buffered_at = time.monotonic()
+                if self.max_delay is not None:
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def flush(self) -> None:
+        """ Write every buffered record to the database."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._buffer:
+                with tracing.span("BufferedAppender.flush", records=self._n_buffered), self._db.lock:
+                    self._db.update_log(self._date, RecordBatch.concatenate(self._buffer))
+                    if self.fsync:
+                        self._db.sync()
+            self._buffer, self._n_buffered, self._first_buffered_at = [], 0, None
+
+    def close(self) -> None:
+        """ Flush the buffer, and close the database if the appender owns it."""
+        with self._lock:
+            self.flush()
+            if self.owns_db:
+                self._db.close()
+        _OPEN_APPENDERS.discard(self)
+
+    @property
+    def db(self) -> Storage:
+        return self._db
+
+    @property
+    def n_buffered(self) -> int:
+        return self._n_buffered
+
+    def _is_overdue(self) -> bool:
+        return self.max_delay is not None and self._first_buffered_at is not None and \
+            time.monotonic() - self._first_buffered_at >= self.max_delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@atexit.register
+def _close_open_appenders() -> None:
+    for appender in list(_OPEN_APPENDERS):
+        appender.close()
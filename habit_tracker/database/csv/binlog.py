@@ -0,0 +1,51 @@
+import pathlib
+import struct
+
+from typing import IO
+
+import numpy as np
+
+from .log import CSVLog
+from ...records import RECORD_DTYPE, RecordBatch
+
+_RECORD = struct.Struct("<3i")
+
+
+class BinaryLog(CSVLog):
+    """
+    Day log stored as fixed-width little-endian int32 records (activity, interval_seconds, seconds_from_start).
+    Shares the folder tree of CSVLog, so both formats can live side by side.
+    """
+    suffix = ".bin"
+
+    def load(self):
+        """
+        Map the log file into memory without parsing it.
+        :return: Structured array with one row per record.
+        """
+        if self._file.stat().st_size == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)  # An empty file can't be mapped.
+        return np.memmap(self._file, dtype=RECORD_DTYPE, mode="r")
+
+    def iter_rows(self):
+        yield from self.load().tolist()
+
+    def load_batch(self) -> RecordBatch:
+        return RecordBatch(self.load())
+
+    def update(self, activity, interval, start_time) -> int:
+        if not self.exists():
+            self.create()
+
+        with open(self._file, "ab") as f:
+            f.write(_RECORD.pack(int(activity), int(interval), int(start_time)))
+            return f.tell()
+
+    def write(self, f: IO, records: RecordBatch) -> int:
+        f.write(records.data.tobytes())
+        f.flush()
+        return f.tell()
+
+    @staticmethod
+    def _open(file: pathlib.Path, mode: str) -> IO:
+        return open(file, mode + "b")
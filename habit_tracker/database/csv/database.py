@@ -1,37 +1,69 @@
 # TODO consider using pandas: intervals can be computed in-site or in a new df.
 
 import datetime
+import functools
+import os
 import pathlib
+import threading
 import warnings
 import json
 
-from typing import Optional
+from typing import IO, Callable, Iterator, Optional, Union
+
+import numpy as np
 
 # TODO: check imports as modules
-from .log import CSVLog
-from .metadata import DBMetadata
+from .log import LATEST_LAYOUT, LAYOUT_V1, CSVLog
+from .binlog import BinaryLog
+from ..metadata import DBMetadata
+from ..registry import register_database
+from .manifest import DBManifest, LogEntry
+from .segment import MonthSegment
+from ..range_index import RangeIndex
+from ... import tracing
+from ...records import Record, RecordBatch
 
 DEF_BASE_DIR = pathlib.Path('.db')
 
-# TODO reformat database tree folder: use year/month/days instead of year/month/week/weekday.
+LOG_FORMATS = {
+    "csv": CSVLog,
+    "binary": BinaryLog,
+}
+
+
+def _locked(method: Callable) -> Callable:
+    """ Run a method of the database under its lock: the manifest, the range index and the open log are shared
+    by every thread."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class CSVDatabase:
     """ Interface to operate with a CSV file as a database."""
 
-    # TODO: track set of existing databases to check if a db already exists.
-
     def __init__(self, metadata: DBMetadata):
         self.metadata = metadata
+        self._manifest: Optional[DBManifest] = None
+        self._range_index: Optional[RangeIndex] = None
+        # Log of the last day appended to, kept open for the next appends of the same day.
+        self._open_log: Optional[tuple[datetime.date, CSVLog, IO]] = None
+        self.lock = threading.RLock()
 
     @classmethod
-    def create(cls, name: str, activities: list[str], par_dir: pathlib.Path):
-        metadata = DBMetadata(name=name, activities=activities, par_dir=par_dir)
+    def create(cls, name: str, activities: list[str], par_dir: pathlib.Path, log_format: str = "csv"):
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{log_format}'. Choose one of: {', '.join(LOG_FORMATS)}.")
+        metadata = DBMetadata(name=name, activities=activities, par_dir=par_dir, log_format=log_format,
+                              layout=LATEST_LAYOUT)
         metadata.db_path.mkdir(parents=True)
-        with open(metadata.file, "w") as f:
-            json_string = metadata.model_dump_json(indent=4)
-            f.write(json_string)
-        return cls(metadata)
+        db = cls(metadata)
+        db.save_metadata()
+        db._manifest = DBManifest()
+        db._manifest.save(metadata.manifest_file)
+        return db
 
     @classmethod
     def load_from_name(cls, name: str, par_dir: pathlib.Path):
@@ -43,34 +75,371 @@ class CSVDatabase:
         except FileNotFoundError:
             return None
 
-    def read_log(self, date: datetime.date) -> list[list[str]]:
+    def save_metadata(self) -> None:
+        with open(self.metadata.file, "w") as f:
+            json_string = self.metadata.model_dump_json(indent=4)
+            f.write(json_string)
+        register_database(self.metadata)
+
+    @_locked
+    def read_log(self, date: datetime.date) -> RecordBatch:
         """
-        Read the full content of the current CSV file.
-        :return: List of rows of the CSV file.
+        Read the full content of the log file for the given date.
+        :return: Records of the log file.
         """
-        return CSVLog(date, base_dir=self.metadata.db_path).read()
+        if date not in self.manifest.logs:
+            return RecordBatch()
+        segment = self._segment(date)
+        if segment.exists():
+            return segment.read_day(date)
+        return self._log(date).load_batch()
 
-    def update_log(self, date: datetime.date, values: list[str]):
+    @_locked
+    def update_log(self, date: datetime.date, records: Union[Record, RecordBatch]):
+        """
+        Append one record, or a batch of records, to the log of the given date.
+        """
         # TODO check that the activity is in the activity set
-        CSVLog(date, self.metadata.db_path).update(*values)
+        records = RecordBatch.coerce(records)
+        if not len(records):
+            return
+        range_index = self.range_index  # Built (if missing) before the manifest changes.
+        entry = self.manifest.logs.setdefault(date, LogEntry())
+        segment = self._segment(date)
+        if segment.exists():
+            # Sealed months are rare to edit: rewrite the whole segment.
+            days = segment.read()
+            days[date] = RecordBatch.concatenate([days.get(date, RecordBatch()), records])
+            segment.write(days)
+            entry.size = days[date].nbytes
+        else:
+            entry.size = self._append(date, records)
+        entry.add(records)
+        self.manifest.record(self.metadata.manifest_file, date)
+        range_index.add(date, records.secs_per_activity())
 
-    def delete_log(self, date: datetime.date) -> None:
-        CSVLog(date, base_dir=self.metadata.db_path).delete()
+    @_locked
+    def upsert_record(self, date: datetime.date, record: Record) -> None:
+        """
+        Write a record, replacing the record of the same day and activity that starts at the same second, if any.
+        An interval still being tracked is rewritten in place as it grows (see Tracker.checkpoint).
+        """
+        records = self.read_log(date)
+        match = np.flatnonzero((records.activity == record.activity) &
+                               (records.seconds_from_start == record.seconds_from_start))
+        if not len(match):
+            self.update_log(date, record)
+            return
 
-    def read_interval(self, start_date: datetime.date, end_date: datetime.date = None) -> Optional[dict]:
-        if (end_date is None) or (start_date == end_date):
-            return {start_date: CSVLog(start_date, self.metadata.db_path).read()}
+        range_index = self.range_index  # Built (if missing) before the manifest changes.
+        old_secs = records.secs_per_activity()
+        data = records.data.copy()
+        data["interval_seconds"][match[0]] = record.interval_seconds
+        records = RecordBatch(data)
+        segment = self._segment(date)
+        if segment.exists():
+            days = segment.read()
+            days[date] = records
+            segment.write(days)
+            size = records.nbytes
         else:
-            interval_records = dict()
-            if end_date < start_date:
-                warnings.warn("Not valid interval_seconds: end date is earlier than the start date.",
-                              category=UserWarning)
-                return interval_records
+            self.close()
+            size = self._log(date).rewrite(records)
+
+        entry = self.manifest.logs[date] = LogEntry(size=size)
+        entry.add(records)
+        self.manifest.record(self.metadata.manifest_file, date)
+        range_index.add(date, records.secs_per_activity() - old_secs)
+
+    @_locked
+    def delete_log(self, date: datetime.date) -> None:
+        self.close()
+        range_index = self.range_index  # Built (if missing) before the manifest changes.
+        segment = self._segment(date)
+        if segment.exists():
+            days = segment.read()
+            if days.pop(date, None) is not None:
+                if days:
+                    segment.write(days)
+                else:
+                    segment.delete()
+        else:
+            self._log(date).delete()
+
+        entry = self.manifest.logs.pop(date, None)
+        if entry is not None:
+            self.manifest.record(self.metadata.manifest_file, date)
+            range_index.add(date, -self._secs_array(entry.secs_per_activity))
+
+    def read_interval(self, start_date: datetime.date,
+                      end_date: datetime.date = None) -> dict[datetime.date, RecordBatch]:
+        interval_records = dict()
+        if end_date is None:
+            end_date = start_date
+        elif end_date < start_date:
+            warnings.warn("Not valid interval_seconds: end date is earlier than the start date.",
+                          category=UserWarning)
+            return interval_records
+
+        with tracing.span("CSVDatabase.read_interval") as span:
             days = (end_date - start_date).days
             for t_delta in range(days + 1):
-                date = start_date + datetime.timedelta(days=t_delta)
-                interval_records[date] = CSVLog(date, self.metadata.db_path).read()
-            return interval_records
+                interval_records[start_date + datetime.timedelta(days=t_delta)] = RecordBatch()
+            interval_records.update(self.iter_records(start_date, end_date))
+            if span:
+                dates = self.manifest.dates_between(start_date, end_date)
+                span.set(days=days + 1, records=sum(map(len, interval_records.values())),
+                         bytes=sum(self.manifest.logs[date].size for date in dates))
+        return interval_records
+
+    def iter_records(self, start_date: datetime.date, end_date: datetime.date = None) -> Iterator[tuple]:
+        """
+        Lazily yield the records of every day with data between both dates (both included), in date order.
+        At most one day, or one sealed month, is held in memory at a time. Every day read is traced as a span, so
+        the time spent reading is told apart from the time the caller spends on the records.
+        :param start_date: First date of the interval.
+        :param end_date: Last date of the interval. Defaults to the start date.
+        :return: Iterator of (date, RecordBatch) pairs. Days without records are skipped.
+        """
+        if end_date is None:
+            end_date = start_date
+
+        # Only dates listed in the manifest are looked for on disk. The lock is taken for every day read, not
+        # while the caller consumes them.
+        with self.lock:
+            dates = self.manifest.dates_between(start_date, end_date)
+        month, sealed_days = None, None
+        for date in dates:
+            with self.lock, tracing.span("CSVDatabase.iter_records") as span:
+                if date.replace(day=1) != month:
+                    month = date.replace(day=1)
+                    segment = self._segment(month)
+                    sealed_days = segment.read() if segment.exists() else None
+
+                if sealed_days is not None:
+                    records = sealed_days.get(date, RecordBatch())
+                else:
+                    records = self._log(date).load_batch()
+                if span:
+                    span.set(records=len(records), bytes=self.manifest.logs[date].size)
+            if len(records):
+                yield date, records
+
+    @_locked
+    def compact(self, today: datetime.date = None) -> list[datetime.date]:
+        """
+        Pack every closed month (any month before the one of `today`) into a single MonthSegment file and remove
+        its loose day logs. The current month is left as loose logs until it is sealed.
+        :param today: Reference date. Defaults to the current date.
+        :return: First day of every month that has been sealed.
+        """
+        current_month = (today if today else datetime.date.today()).replace(day=1)
+        self.close()
+
+        loose_logs = dict()
+        for date in self._logged_dates():
+            if date >= current_month:
+                break
+            log = self._log(date)
+            if log.exists():
+                loose_logs.setdefault(date.replace(day=1), {})[date] = RecordBatch(log.read_batch().data.copy())
+
+        for month, new_days in loose_logs.items():
+            segment = self._segment(month)
+            days = segment.read() if segment.exists() else dict()
+            for date, records in new_days.items():
+                days[date] = RecordBatch.concatenate([days.get(date, RecordBatch()), records])
+            segment.write(days)
+
+            for date in new_days:
+                self._log(date).delete()
+                entry = self.manifest.logs.get(date)
+                if entry is None:
+                    entry = self.manifest.logs[date] = LogEntry()
+                    entry.add(days[date])
+                entry.size = days[date].nbytes
+                self.manifest.record(self.metadata.manifest_file, date)
+            for week_dir in segment.file.parent.iterdir():
+                if week_dir.is_dir() and not any(week_dir.iterdir()):
+                    week_dir.rmdir()
+
+        return list(loose_logs)
+
+    @_locked
+    def convert_logs(self, log_format: str) -> None:
+        """
+        Rewrite every existing log of the database in another storage format.
+        CSV stays the readable/editable format; binary logs skip parsing on read.
+        :param log_format: Target format ("csv" or "binary").
+        :return: None
+        """
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format '{log_format}'. Choose one of: {', '.join(LOG_FORMATS)}.")
+        if log_format == self.metadata.log_format:
+            return
+        self.close()
+
+        src_cls, dst_cls = LOG_FORMATS[self.metadata.log_format], LOG_FORMATS[log_format]
+        for date in self._logged_dates():
+            src = src_cls(date, self.metadata.db_path, self.metadata.layout)
+            if not src.exists():
+                continue
+            records = RecordBatch(src.read_batch().data.copy())  # Copy, so no memory map stays open.
+            dst = dst_cls(date, self.metadata.db_path, self.metadata.layout)
+            dst.delete()
+            dst.append(records)
+            src.delete()
+
+        self.metadata.log_format = log_format
+        self.save_metadata()
+        self.rebuild_manifest()
+
+    @_locked
+    def rebuild_manifest(self) -> DBManifest:
+        """
+        Scan the database tree to list every date with logs. Only needed for databases created before the
+        manifest existed, or after editing the tree by hand.
+        :return: The new manifest, which is also saved to disk.
+        """
+        manifest = DBManifest()
+        sealed_months = dict()
+        for date in self._logged_dates():
+            month = date.replace(day=1)
+            if month not in sealed_months:
+                segment = self._segment(month)
+                sealed_months[month] = segment.read() if segment.exists() else None
+
+            if sealed_months[month] is not None:
+                records = sealed_months[month].get(date, RecordBatch())
+                size = records.nbytes
+            else:
+                records = self._log(date).read_batch()
+                size = self._log(date).file.stat().st_size if len(records) else 0
+
+            if len(records):
+                manifest.logs[date] = LogEntry(size=size)
+                manifest.logs[date].add(records)
+
+        manifest.save(self.metadata.manifest_file)
+        self._manifest = manifest
+        self.rebuild_range_index()
+        return manifest
+
+    @_locked
+    def rebuild_range_index(self) -> RangeIndex:
+        """
+        Build the range index from the per-day summaries of the manifest, without reading any log.
+        """
+        secs_per_day = {date: self._secs_array(entry.secs_per_activity) for date, entry in self.manifest.logs.items()}
+        if self._range_index is not None:
+            self._range_index.close()  # Its file is replaced below.
+        self._range_index = RangeIndex.build(self.metadata.range_index_file, secs_per_day,
+                                             len(self.metadata.activities))
+        return self._range_index
+
+    @_locked
+    def secs_between(self, start_date: datetime.date, end_date: datetime.date) -> dict[int, int]:
+        """
+        Seconds per activity between both dates (both included), answered by the range index in O(log n),
+        whatever the length of the interval.
+        :return: Seconds of every activity with any time in the interval, keyed by activity index.
+        """
+        if end_date < start_date:
+            return dict()
+        secs = self.range_index.query(start_date, end_date)
+        return {idx: int(secs[idx]) for idx in np.flatnonzero(secs).tolist()}
+
+    @_locked
+    def read_summaries(self, start_date: datetime.date,
+                       end_date: datetime.date = None) -> dict[datetime.date, LogEntry]:
+        """
+        Read the summaries of every day with records between both dates, without opening any log.
+        :return: Dictionary with the summary of every day with records, in date order.
+        """
+        if end_date is None:
+            end_date = start_date
+        return {date: self.manifest.logs[date] for date in self.manifest.dates_between(start_date, end_date)}
+
+    @_locked
+    def sync(self) -> None:
+        """ Force the appended records of the open log to disk (fsync)."""
+        if self._open_log is not None:
+            os.fsync(self._open_log[2].fileno())
+
+    @_locked
+    def close(self) -> None:
+        """ Close the open log, if any. It's opened again by the next append."""
+        if self._open_log is not None:
+            self._open_log[2].close()
+            self._open_log = None
+
+    @property
+    @_locked
+    def range_index(self) -> RangeIndex:
+        if self._range_index is None:
+            self._range_index = RangeIndex(self.metadata.range_index_file)
+            if not self._range_index.exists():
+                self.rebuild_range_index()
+        return self._range_index
+
+    @property
+    @_locked
+    def manifest(self) -> DBManifest:
+        if self._manifest is None:
+            self._manifest = DBManifest.load(self.metadata.manifest_file)
+            if self._manifest is None:
+                self._manifest = self.rebuild_manifest()
+        return self._manifest
+
+    def _append(self, date: datetime.date, records: RecordBatch) -> int:
+        """
+        Append records to the log of a day, through a file handle that stays open until another day is appended to.
+        :return: Size of the log file after the update, in bytes.
+        """
+        if self._open_log is None or self._open_log[0] != date:
+            self.close()
+            log = self._log(date)
+            self._open_log = (date, log, log.open_append())
+        _, log, f = self._open_log
+        return log.write(f, records)
+
+    def _log(self, date: datetime.date) -> CSVLog:
+        return LOG_FORMATS[self.metadata.log_format](date, self.metadata.db_path, self.metadata.layout)
+
+    @staticmethod
+    def _secs_array(secs_per_activity: dict[int, int]) -> np.ndarray:
+        secs = np.zeros(max(secs_per_activity, default=-1) + 1, dtype=np.int64)
+        secs[list(secs_per_activity)] = list(secs_per_activity.values())
+        return secs
+
+    def _segment(self, date: datetime.date) -> MonthSegment:
+        return MonthSegment(date, self.metadata.db_path)
+
+    def _logged_dates(self):
+        """
+        Dates that may have records in the database tree, in chronological order: the dates of the day logs found
+        with a single scandir per month folder (layout 2), or every date of the month if its logs can't be listed
+        (layout 1) or it's sealed in a segment.
+        """
+        for year_dir in sorted(p for p in self.metadata.db_path.iterdir() if p.is_dir() and p.name.isdigit()):
+            for month_dir in sorted(p for p in year_dir.iterdir() if p.is_dir() and p.name.isdigit()):
+                date = datetime.date(int(year_dir.name), int(month_dir.name), 1)
+                if self.metadata.layout != LAYOUT_V1 and not self._segment(date).exists():
+                    yield from self._month_log_dates(month_dir, date)
+                    continue
+                while date.month == int(month_dir.name):
+                    yield date
+                    date += datetime.timedelta(days=1)
+
+    def _month_log_dates(self, month_dir: pathlib.Path, month: datetime.date) -> list[datetime.date]:
+        suffix = LOG_FORMATS[self.metadata.log_format].suffix
+        days = []
+        with os.scandir(month_dir) as it:
+            for item in it:
+                stem, item_suffix = os.path.splitext(item.name)
+                if item_suffix == suffix and stem.isdigit() and item.is_file():
+                    days.append(int(stem))
+        return [month.replace(day=day) for day in sorted(days)]
 
     @property
     def name(self):
@@ -0,0 +1,93 @@
+"""
+Move the day logs of CSV databases to the latest folder tree (see log.log_path), in place:
+
+    python -m habit_tracker.database.csv.layout_migration <name> [<name> ...] [--par-dir .db]
+    python -m habit_tracker.database.csv.layout_migration --all [--par-dir .db]
+"""
+import argparse
+import datetime
+import logging
+import os
+import pathlib
+
+from .database import LOG_FORMATS, CSVDatabase
+from .log import LATEST_LAYOUT, LAYOUT_V1, LAYOUT_V2, log_path, v1_log_date
+from ..registry import DatabaseRegistry
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = {log_cls.suffix for log_cls in LOG_FORMATS.values()}
+
+
+def migrate_layout(db: CSVDatabase) -> int:
+    """
+    Move every day log of a layout 1 database to its layout 2 path, then record the new layout in its metadata.
+    Every log is moved with an atomic rename, so if interrupted, running it again resumes with the logs left in
+    the old tree. The database shouldn't be used until it's done. The manifest, range index and month segments
+    don't depend on the layout, and are kept as they are.
+    :return: Number of logs moved.
+    """
+    if db.metadata.layout == LATEST_LAYOUT:
+        return 0
+    if db.metadata.layout != LAYOUT_V1:
+        raise ValueError(f"Can't migrate {db.name}: unknown layout {db.metadata.layout}.")
+    db.close()
+
+    moved = 0
+    for year_dir in sorted(p for p in db.metadata.db_path.iterdir() if p.is_dir() and p.name.isdigit()):
+        for month_dir in sorted(p for p in year_dir.iterdir() if p.is_dir() and p.name.isdigit()):
+            month = datetime.date(int(year_dir.name), int(month_dir.name), 1)
+            for week_dir in sorted(p for p in month_dir.iterdir() if p.is_dir() and p.name.isdigit()):
+                moved += _move_week(db, month, week_dir)
+
+    db.metadata.layout = LAYOUT_V2
+    db.save_metadata()
+    logger.info("Moved %s log(s) of %s to layout %s.", moved, db.name, LAYOUT_V2)
+    return moved
+
+
+def _move_week(db: CSVDatabase, month: datetime.date, week_dir: pathlib.Path) -> int:
+    moved = 0
+    with os.scandir(week_dir) as it:
+        logs = [item for item in it if item.is_file()]
+    for item in logs:
+        stem, suffix = os.path.splitext(item.name)
+        date = v1_log_date(month, week_dir.name, stem) if suffix in SUFFIXES else None
+        if date is None:
+            logger.warning("Skipping %s: not a day log.", item.path)
+            continue
+        dst = log_path(db.metadata.db_path, date, suffix, LAYOUT_V2)
+        if dst.exists():
+            raise RuntimeError(f"Can't move {item.path}: {dst} already exists.")
+        os.replace(item.path, dst)
+        moved += 1
+    if not any(week_dir.iterdir()):
+        week_dir.rmdir()
+    return moved
+
+
+def main(args=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help="Names of the CSV databases.")
+    parser.add_argument("--all", action="store_true", help="Migrate every CSV database of the folder.")
+    parser.add_argument("--par-dir", type=pathlib.Path, default=pathlib.Path(".db"))
+    args = parser.parse_args(args)
+
+    if args.all:
+        names = [name for name, entry in DatabaseRegistry(args.par_dir).entries().items() if entry.backend == "csv"]
+    elif args.names:
+        names = args.names
+    else:
+        parser.error("Give the names of the databases to migrate, or --all.")
+
+    moved = 0
+    for name in names:
+        db = CSVDatabase.load_from_name(name, args.par_dir)
+        if db is None or db.metadata.backend != "csv":
+            parser.error(f"No CSV database named '{name}' in {args.par_dir}.")
+        moved += migrate_layout(db)
+    return moved
+
+
+if __name__ == "__main__":
+    main()
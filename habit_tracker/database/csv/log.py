@@ -1,25 +1,77 @@
 import csv
 import datetime
+import os
 import pathlib
 
 from math import ceil
-from typing import Optional
+from typing import IO, Iterator, Optional
+
+from ...records import RecordBatch
+
+
+# Folder tree of the day logs of a database (see DBMetadata.layout):
+#   1: year/month/week of month/weekday, e.g. 2023/05/01/00.csv for Monday 2023-05-01.
+#   2: year/month/day of month, e.g. 2023/05/01.csv. The logs of a month are listed with a single scandir.
+LAYOUT_V1 = 1
+LAYOUT_V2 = 2
+LATEST_LAYOUT = LAYOUT_V2
+
+
+def log_path(base_dir: pathlib.Path, date: datetime.date, suffix: str, layout: int = LATEST_LAYOUT) -> pathlib.Path:
+    """
+    :return: Path of the log of a date in a database tree.
+    """
+    month_dir = base_dir / str(date.year) / str(date.month).zfill(2)
+    if layout == LAYOUT_V2:
+        return month_dir / f"{str(date.day).zfill(2)}{suffix}"
+    if layout == LAYOUT_V1:
+        week = ceil((date.day + date.replace(day=1).weekday()) / 7.0)
+        return month_dir / str(week).zfill(2) / f"{str(date.weekday()).zfill(2)}{suffix}"
+    raise ValueError(f"Unknown database layout {layout}.")
+
+
+def v1_log_date(month: datetime.date, week_dir: str, file_stem: str) -> Optional[datetime.date]:
+    """
+    Inverse of the layout 1 path of a log.
+    :param month: First day of the month of the log.
+    :param week_dir: Name of the week of month folder, e.g. "01".
+    :param file_stem: Name of the log file without suffix (the weekday), e.g. "00".
+    :return: Date of the log, or None if the names don't match any date of the month.
+    """
+    if not (week_dir.isdigit() and file_stem.isdigit()):
+        return None
+    day = (int(week_dir) - 1) * 7 + int(file_stem) + 1 - month.weekday()
+    try:
+        date = month.replace(day=day)
+    except ValueError:
+        return None
+    return date if log_path(pathlib.Path(), date, "", LAYOUT_V1).parts[-2:] == (week_dir, file_stem) else None
+
 
 class CSVLog:
-    def __init__(self, date: datetime.date, base_dir: pathlib.Path):
+    suffix = ".csv"
+
+    def __init__(self, date: datetime.date, base_dir: pathlib.Path, layout: int = LAYOUT_V1):
+        """
+        :param date: Date of the log.
+        :param base_dir: Folder of the database tree.
+        :param layout: Folder tree of the database (LAYOUT_V1 or LAYOUT_V2).
+        """
         self._date = date
         self._year = str(date.year)
         self._month = str(date.month).zfill(2)
-        self._week = str(self._week_of_month()).zfill(2)
-        self._day_of_week = str(self._date.weekday()).zfill(2)
         self._day = str(date.day).zfill(2)
+        if layout == LAYOUT_V1:
+            self._week = str(self._week_of_month()).zfill(2)
+            self._day_of_week = str(self._date.weekday()).zfill(2)
 
         self._base_dir = base_dir
-        self._file = self._base_dir / self._year / self._month / self._week / f"{self._day_of_week}.csv"
+        self._layout = layout
+        self._file = log_path(base_dir, date, self.suffix, layout)
 
     @classmethod
-    def new(cls, date: datetime.date, logs_dir: pathlib.Path = None):
-        csv_log = cls(date, logs_dir)
+    def new(cls, date: datetime.date, logs_dir: pathlib.Path = None, layout: int = LAYOUT_V1):
+        csv_log = cls(date, logs_dir, layout)
         csv_log.create()  # If log was already created, this won't do anything.
         return csv_log
 
@@ -34,25 +86,93 @@ class CSVLog:
 
     def read(self) -> Optional[list[list[str]]]:
         if self.exists() and self._file.stat().st_size > 0:
-            with open(self._file, "r") as f:
-                csv_reader = csv.reader(f, delimiter=",")
-                # TODO: save integer values as integers instead of strings
-                return [row for row in csv_reader]  # TODO think about how to use generator here
+            return self.load()
         else:
             return []
 
-    def update(self, activity: str, interval: str, start_time: str):
+    def load(self) -> list[list[str]]:
+        """
+        Read the log file, assuming it exists and is not empty.
+        """
+        return list(self.iter_rows())
+
+    def iter_rows(self) -> Iterator[list[str]]:
+        """
+        Lazily yield the rows of the log file, assuming it exists.
+        """
+        with open(self._file, "r") as f:
+            yield from csv.reader(f, delimiter=",")
+
+    def read_batch(self) -> RecordBatch:
+        if self.exists() and self._file.stat().st_size > 0:
+            return self.load_batch()
+        else:
+            return RecordBatch()
+
+    def load_batch(self) -> RecordBatch:
+        """
+        Read the log file into a RecordBatch, assuming it exists and is not empty.
+        """
+        return RecordBatch.from_rows(self.iter_rows())
+
+    def update(self, activity: str, interval: str, start_time: str) -> int:
+        """
+        Append a row to the log file.
+        :return: Size of the log file after the update, in bytes.
+        """
         if not self.exists():
             self.create()
 
         with open(self._file, "a+", newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow([activity, interval, start_time])
+            return csvfile.tell()
+
+    def append(self, records: RecordBatch) -> int:
+        """
+        Append a batch of records to the log file.
+        :return: Size of the log file after the update, in bytes.
+        """
+        with self.open_append() as f:
+            return self.write(f, records)
+
+    def open_append(self) -> IO:
+        """
+        Open the log file to append records to it with write(), creating it if needed.
+        """
+        if not self.exists():
+            self.create()
+        return self._open(self._file, "a")
+
+    def write(self, f: IO, records: RecordBatch) -> int:
+        """
+        Append a batch of records to a file opened with open_append(), and flush it to the OS.
+        :return: Size of the log file after the update, in bytes.
+        """
+        csv.writer(f).writerows(records.data.tolist())
+        f.flush()
+        return f.tell()
+
+    def rewrite(self, records: RecordBatch) -> int:
+        """
+        Replace the records of the log file. The file is replaced atomically.
+        :return: Size of the log file after the update, in bytes.
+        """
+        self._file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._file.with_suffix(".tmp")
+        with self._open(tmp_file, "w") as f:
+            size = self.write(f, records)
+        os.replace(tmp_file, self._file)
+        return size
 
     def delete(self):
         if self.exists():
             self._file.unlink()
 
+    @staticmethod
+    def _open(file: pathlib.Path, mode: str) -> IO:
+        return open(file, mode, newline='')
+
     def _week_of_month(self):
         first_day = self._date.replace(day=1)
         dom = self._date.day
@@ -62,3 +182,7 @@ class CSVLog:
     @property
     def date(self):
         return self._date
+
+    @property
+    def file(self) -> pathlib.Path:
+        return self._file
@@ -0,0 +1,127 @@
+import datetime
+import json
+import os
+import pathlib
+
+from typing import Optional
+
+import numpy as np
+from pydantic import BaseModel, PrivateAttr, ValidationError
+
+from ...records import RecordBatch
+
+MANIFEST_VERSION = 2
+# The journal is folded into the manifest file once it holds this many entries, and as many as the manifest file.
+MIN_JOURNAL_ENTRIES = 1000
+
+
+class LogEntry(BaseModel):
+    """ Size of a day log, and a summary of its records kept up to date on every append."""
+    size: int = 0
+    records: int = 0
+    secs_per_activity: dict[int, int] = {}
+    records_per_activity: dict[int, int] = {}
+    first_start: Optional[int] = None
+    last_end: Optional[int] = None
+
+    def add(self, records: RecordBatch) -> None:
+        """
+        Update the summary with newly appended records.
+        """
+        if not len(records):
+            return
+        self.records += len(records)
+
+        secs = records.secs_per_activity()
+        counts = records.records_per_activity()
+        for idx in np.flatnonzero(counts).tolist():
+            self.secs_per_activity[idx] = self.secs_per_activity.get(idx, 0) + int(secs[idx])
+            self.records_per_activity[idx] = self.records_per_activity.get(idx, 0) + int(counts[idx])
+
+        first_start = int(records.seconds_from_start.min())
+        last_end = int((records.seconds_from_start.astype(np.int64) + records.interval_seconds).max())
+        self.first_start = first_start if self.first_start is None else min(self.first_start, first_start)
+        self.last_end = last_end if self.last_end is None else max(self.last_end, last_end)
+
+
+class DBManifest(BaseModel):
+    """
+    Index of the dates that have logs in a database, so reads never probe empty days on disk.
+    On disk, it's a snapshot (manifest.json) and an append-only journal next to it (manifest.journal): a change of
+    a day appends its new entry to the journal, so an append doesn't rewrite the summaries of the whole history.
+    The journal is replayed on load, and folded into the snapshot once it grows as large as it.
+    """
+    version: int = MANIFEST_VERSION
+    logs: dict[datetime.date, LogEntry] = {}
+    _journal_entries: int = PrivateAttr(default=0)
+    _snapshot_logs: int = PrivateAttr(default=0)  # Days in the snapshot on disk
+
+    @classmethod
+    def load(cls, file: pathlib.Path):
+        """
+        :return: The manifest, with its journal replayed, or None if it doesn't exist or was written by an older
+                 version.
+        """
+        try:
+            with open(file, "r") as f:
+                manifest = cls.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        up_to_date = "version" in manifest.model_fields_set and manifest.version == MANIFEST_VERSION
+        if not up_to_date:
+            return None
+        manifest._snapshot_logs = len(manifest.logs)
+        manifest._replay(cls.journal_file(file))
+        return manifest
+
+    def save(self, file: pathlib.Path) -> None:
+        """ Write the whole manifest, and drop the journal it now includes."""
+        tmp_file = file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            f.write(self.model_dump_json(indent=4))
+        os.replace(tmp_file, file)
+        journal_file = self.journal_file(file)
+        if journal_file.exists():
+            journal_file.unlink()
+        self._journal_entries = 0
+        self._snapshot_logs = len(self.logs)
+
+    def record(self, file: pathlib.Path, date: datetime.date) -> None:
+        """
+        Persist the current entry of a date (or its removal, if it's no longer listed) by appending it to the
+        journal. Entries are whole days, so replaying one twice is harmless.
+        :param file: Manifest file.
+        """
+        entry = self.logs.get(date)
+        line = {"date": date.isoformat(), "entry": entry.model_dump() if entry is not None else None}
+        with open(self.journal_file(file), "a") as f:
+            f.write(json.dumps(line) + "\n")
+        self._journal_entries += 1
+        if self._journal_entries >= max(MIN_JOURNAL_ENTRIES, self._snapshot_logs):
+            self.save(file)
+
+    @staticmethod
+    def journal_file(file: pathlib.Path) -> pathlib.Path:
+        return file.with_suffix(".journal")
+
+    def dates_between(self, start_date: datetime.date, end_date: datetime.date) -> list[datetime.date]:
+        return sorted(date for date in self.logs if start_date <= date <= end_date)
+
+    def _replay(self, journal_file: pathlib.Path) -> None:
+        try:
+            with open(journal_file, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                item = json.loads(line)
+                date = datetime.date.fromisoformat(item["date"])
+                entry = LogEntry(**item["entry"]) if item["entry"] is not None else None
+            except (ValueError, KeyError, TypeError, ValidationError):
+                continue  # Last line cut by a crash while appending: the change it held never completed.
+            if entry is None:
+                self.logs.pop(date, None)
+            else:
+                self.logs[date] = entry
+            self._journal_entries += 1
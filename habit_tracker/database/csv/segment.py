@@ -0,0 +1,98 @@
+import datetime
+import os
+import pathlib
+
+import numpy as np
+
+from ...records import RECORD_DTYPE, RecordBatch
+
+MAGIC = b"HTSEG\x00\x01\x00"
+MAX_DAYS = 31
+# Header: magic + (byte offset, record count) for every possible day of the month.
+INDEX_DTYPE = np.dtype([("offset", "<u4"), ("count", "<u4")])
+HEADER_SIZE = len(MAGIC) + MAX_DAYS * INDEX_DTYPE.itemsize
+
+
+class MonthSegment:
+    """
+    Packed file holding every record of a closed month, in binary format (see BinaryLog).
+    A small header stores the byte offset and record count of each day, so a whole month is read with one open
+    and one sequential read, and a single day with one seek.
+    """
+    file_name = "segment.bin"
+
+    def __init__(self, date: datetime.date, base_dir: pathlib.Path):
+        self._year = date.year
+        self._month = date.month
+        self._file = base_dir / str(self._year) / str(self._month).zfill(2) / self.file_name
+
+    def exists(self) -> bool:
+        return self._file.exists()
+
+    def read(self) -> dict[datetime.date, RecordBatch]:
+        """
+        Read the full segment.
+        :return: Dictionary with the records of every day that has any.
+        """
+        with open(self._file, "rb") as f:
+            buffer = f.read()
+        index = self._parse_header(buffer)
+        days = dict()
+        for day_idx, (offset, count) in enumerate(index.tolist()):
+            if count:
+                days[self._date(day_idx)] = RecordBatch(
+                    np.frombuffer(buffer, dtype=RECORD_DTYPE, count=count, offset=offset))
+        return days
+
+    def read_day(self, date: datetime.date) -> RecordBatch:
+        """
+        Read the records of a single day.
+        :return: Records of the day (empty if there are none).
+        """
+        with open(self._file, "rb") as f:
+            index = self._parse_header(f.read(HEADER_SIZE))
+            offset, count = index[date.day - 1].tolist()
+            if not count:
+                return RecordBatch()
+            f.seek(offset)
+            return RecordBatch(np.frombuffer(f.read(count * RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE))
+
+    def write(self, days: dict[datetime.date, RecordBatch]) -> None:
+        """
+        Write (or overwrite) the segment with the given records. The file is replaced atomically.
+        :param days: Records per day.
+        :return: None
+        """
+        index = np.zeros(MAX_DAYS, dtype=INDEX_DTYPE)
+        chunks = []
+        offset = HEADER_SIZE
+        for date in sorted(days):
+            chunk = days[date].data
+            index[date.day - 1] = (offset, len(chunk))
+            offset += chunk.nbytes
+            chunks.append(chunk)
+
+        self._file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._file.with_suffix(".tmp")
+        with open(tmp_file, "wb") as f:
+            f.write(MAGIC)
+            f.write(index.tobytes())
+            for chunk in chunks:
+                f.write(chunk.tobytes())
+        os.replace(tmp_file, self._file)
+
+    def delete(self) -> None:
+        if self.exists():
+            self._file.unlink()
+
+    def _parse_header(self, buffer: bytes) -> np.ndarray:
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a valid month segment: {self._file}")
+        return np.frombuffer(buffer, dtype=INDEX_DTYPE, count=MAX_DAYS, offset=len(MAGIC))
+
+    def _date(self, day_idx: int) -> datetime.date:
+        return datetime.date(self._year, self._month, day_idx + 1)
+
+    @property
+    def file(self) -> pathlib.Path:
+        return self._file
@@ -0,0 +1,32 @@
+import pathlib
+
+from pydantic import BaseModel
+
+
+class DBMetadata(BaseModel):
+    name: str
+    activities: list[str]
+    par_dir: pathlib.Path
+    backend: str = "csv"  # Storage backend: "csv" or "sqlite" (see database.storage.BACKENDS)
+    log_format: str = "csv"  # "csv" (readable, editable) or "binary" (int32 columns, memory-mapped on read)
+    layout: int = 1  # Folder tree of the day logs (see csv.log.log_path). 1 for databases created before layout 2.
+
+    @property
+    def db_path(self) -> pathlib.Path:
+        return self.par_dir / pathlib.Path(self.name)
+
+    @property
+    def file(self) -> pathlib.Path:
+        return self.db_path / pathlib.Path("metadata.json")
+
+    @property
+    def manifest_file(self) -> pathlib.Path:
+        return self.db_path / pathlib.Path("manifest.json")
+
+    @property
+    def range_index_file(self) -> pathlib.Path:
+        return self.db_path / pathlib.Path("range_index.npy")
+
+    @property
+    def sqlite_file(self) -> pathlib.Path:
+        return self.db_path / pathlib.Path("records.sqlite3")
@@ -0,0 +1,132 @@
+import datetime
+import os
+import pathlib
+
+from typing import Optional
+
+import numpy as np
+
+# Row 0 of a Fenwick tree is never used (indices are 1-based), so it stores the ordinal of the first day instead.
+_ORIGIN = (0, 0)
+
+
+class RangeIndex:
+    """
+    Persistent Fenwick tree (binary indexed tree) over days, with one column of seconds per activity.
+    Answers "seconds per activity between date A and date B" in O(log n) and is updated in place, through a
+    memory-mapped .npy file, when records are appended. The file is only ever replaced once every reference to its
+    mapping is dropped: Windows can't replace a file with an open mapped view.
+    """
+
+    def __init__(self, file: pathlib.Path):
+        self._file = file
+        self._tree: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, file: pathlib.Path, secs_per_day: dict[datetime.date, np.ndarray], n_activities: int):
+        """
+        Build (or rebuild) the index from the totals of every day, in O(n).
+        :param file: Path of the index file.
+        :param secs_per_day: Seconds per activity index of every day with records.
+        :param n_activities: Minimum number of activity columns.
+        """
+        index = cls(file)
+        if secs_per_day:
+            first_date, last_date = min(secs_per_day), max(secs_per_day)
+            n_activities = max([n_activities] + [len(secs) for secs in secs_per_day.values()])
+        else:
+            first_date = last_date = datetime.date.today()
+        index._write(secs_per_day, cls._origin_for(first_date), last_date, n_activities)
+        return index
+
+    def exists(self) -> bool:
+        return self._file.exists()
+
+    def add(self, date: datetime.date, secs_per_activity: np.ndarray) -> None:
+        """
+        Add the seconds per activity of some records of a day (negative values to remove them). O(log n).
+        """
+        tree = self._open()
+        position = date.toordinal() - self.origin.toordinal() + 1
+        if position < 1 or position >= len(tree) or len(secs_per_activity) > tree.shape[1]:
+            del tree  # The file is replaced by _grow.
+            self._grow(date, len(secs_per_activity))
+            tree = self._open()
+            position = date.toordinal() - self.origin.toordinal() + 1
+
+        values = np.zeros(tree.shape[1], dtype=np.int64)
+        values[:len(secs_per_activity)] = secs_per_activity
+        while position < len(tree):
+            tree[position] += values
+            position += position & -position
+        tree.flush()
+
+    def query(self, start_date: datetime.date, end_date: datetime.date) -> np.ndarray:
+        """
+        :return: Seconds per activity index between both dates (both included). O(log n).
+        """
+        return self._prefix(end_date.toordinal() - self.origin.toordinal() + 1) - \
+            self._prefix(start_date.toordinal() - self.origin.toordinal())
+
+    @property
+    def origin(self) -> datetime.date:
+        return datetime.date.fromordinal(int(self._open()[_ORIGIN]))
+
+    def _prefix(self, position: int) -> np.ndarray:
+        tree = self._open()
+        total = np.zeros(tree.shape[1], dtype=np.int64)
+        position = min(position, len(tree) - 1)
+        while position > 0:
+            total += tree[position]
+            position -= position & -position
+        return total
+
+    def _open(self) -> np.ndarray:
+        if self._tree is None:
+            self._tree = np.lib.format.open_memmap(self._file, mode="r+")
+        return self._tree
+
+    def close(self) -> None:
+        """ Release the mapping of the index file. It's mapped again by the next update or query."""
+        self._tree = None
+
+    def _grow(self, date: datetime.date, n_activities: int) -> None:
+        """
+        Rebuild the tree so it covers the given date and number of activities.
+        """
+        tree = np.array(self._open())
+        origin = self.origin
+        capacity = len(tree) - 1
+
+        # Undo the O(n) construction to recover the totals of every day.
+        for position in range(capacity, 0, -1):
+            parent = position + (position & -position)
+            if parent <= capacity:
+                tree[parent] -= tree[position]
+        secs_per_day = {origin + datetime.timedelta(days=int(position) - 1): tree[position]
+                        for position in np.flatnonzero(tree[1:].any(axis=1)) + 1}
+
+        last_date = max(date, origin + datetime.timedelta(days=capacity - 1))
+        self._write(secs_per_day, min(origin, self._origin_for(date)), last_date, max(n_activities, tree.shape[1]))
+
+    def _write(self, secs_per_day: dict, origin: datetime.date, last_date: datetime.date, n_activities: int):
+        self.close()
+        n_days = (last_date - origin).days + 1
+        capacity = 1 << max(n_days, 1).bit_length()  # Room to grow before the next rebuild.
+
+        tree = np.zeros((capacity + 1, max(n_activities, 1)), dtype=np.int64)
+        for date, secs in secs_per_day.items():
+            tree[date.toordinal() - origin.toordinal() + 1, :len(secs)] += secs
+        for position in range(1, capacity + 1):
+            parent = position + (position & -position)
+            if parent <= capacity:
+                tree[parent] += tree[position]
+        tree[_ORIGIN] = origin.toordinal()
+
+        tmp_file = self._file.with_name(self._file.stem + ".tmp.npy")
+        np.save(tmp_file, tree)
+        os.replace(tmp_file, self._file)
+
+    @staticmethod
+    def _origin_for(date: datetime.date) -> datetime.date:
+        return date.replace(month=1, day=1)
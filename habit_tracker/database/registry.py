@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .metadata import DBMetadata
+
+try:
+    import fcntl  # Serializes the updates of concurrent processes (POSIX only).
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILE_NAME = "registry.json"
+REGISTRY_LOCK_FILE_NAME = ".registry.lock"
+
+_REGISTRY_LOCK = threading.Lock()
+
+
+class RegistryEntry(BaseModel):
+    activities: list[str]
+    backend: str = "csv"
+    modified: float  # Time of the last save of the metadata, in seconds since the epoch.
+
+
+class Registry(BaseModel):
+    databases: dict[str, RegistryEntry] = dict()
+
+
+class DatabaseRegistry:
+    """
+    Index of the databases of a parent folder, stored in a single file of that folder, so listing them doesn't scan
+    the folder. It's updated by the backends every time they save their metadata, and by delete_database.
+
+    The file is always replaced atomically, and its mtime is then set to the mtime of the folder: if the folder
+    changes behind the registry (e.g. a database copied or removed by hand), it's newer than the file and the
+    registry is rebuilt with a full scan on the next read. A metadata.json edited in place doesn't change the
+    folder: its entry is updated when the database is loaded (see check), or by an explicit rescan().
+    """
+
+    def __init__(self, par_dir: pathlib.Path):
+        self.par_dir = par_dir
+
+    @property
+    def file(self) -> pathlib.Path:
+        return self.par_dir / REGISTRY_FILE_NAME
+
+    def entries(self) -> dict[str, RegistryEntry]:
+        """
+        :return: Every database of the folder, by name.
+        """
+        registry = self._read() if self.is_consistent() else None
+        if registry is None:
+            with self._locked():
+                registry = self._rescan()
+        return registry.databases
+
+    def names(self) -> list[str]:
+        return sorted(self.entries())
+
+    def register(self, metadata: DBMetadata) -> None:
+        """ Add a database to the registry, or update its entry."""
+        with self._locked():
+            registry = self._read() if self.is_consistent() else None
+            if registry is None:
+                registry = self._rescan(write=False)
+            registry.databases[metadata.name] = self._entry(metadata)
+            self._write(registry)
+
+    def unregister(self, name: str) -> None:
+        with self._locked():
+            registry = self._read() if self.is_consistent() else None
+            if registry is None:
+                registry = self._rescan(write=False)
+            registry.databases.pop(name, None)
+            self._write(registry)
+
+    def check(self, metadata: DBMetadata) -> None:
+        """ Update the entry of a database just loaded, if its metadata changed behind the registry."""
+        registry = self._read() if self.is_consistent() else None
+        if registry is None or registry.databases.get(metadata.name) != self._entry(metadata):
+            self.register(metadata)
+
+    def rescan(self) -> dict[str, RegistryEntry]:
+        """
+        Rebuild the registry from the metadata of every database of the folder.
+        :return: Every database of the folder, by name.
+        """
+        with self._locked():
+            return self._rescan().databases
+
+    def is_consistent(self) -> bool:
+        """
+        :return: False if the folder changed since the registry was written (or there's no registry yet).
+        """
+        try:
+            return self.file.stat().st_mtime_ns >= self.par_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _read(self) -> Optional[Registry]:
+        try:
+            with open(self.file, "r") as f:
+                return Registry(**json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError, ValidationError):
+            return None
+
+    def _write(self, registry: Registry) -> None:
+        fd, tmp_file = tempfile.mkstemp(dir=self.par_dir, prefix=f".{REGISTRY_FILE_NAME}.")
+        with os.fdopen(fd, "w") as f:
+            f.write(registry.model_dump_json(indent=4))
+        os.replace(tmp_file, self.file)
+        dir_mtime_ns = self.par_dir.stat().st_mtime_ns  # Changed by the replace above.
+        os.utime(self.file, ns=(time.time_ns(), dir_mtime_ns))
+
+    def _rescan(self, write: bool = True) -> Registry:
+        logger.info("Rebuilding the database registry of %s.", self.par_dir)
+        registry = Registry()
+        with os.scandir(self.par_dir) as it:
+            for item in it:
+                if not item.is_dir():
+                    continue
+                metadata_file = pathlib.Path(item.path) / "metadata.json"
+                try:
+                    with open(metadata_file, "r") as f:
+                        metadata = DBMetadata(**json.load(f))
+                except (FileNotFoundError, json.JSONDecodeError, ValidationError):
+                    continue
+                registry.databases[item.name] = self._entry(metadata)
+        if write:
+            self._write(registry)
+        return registry
+
+    @staticmethod
+    def _entry(metadata: DBMetadata) -> RegistryEntry:
+        try:
+            modified = metadata.file.stat().st_mtime
+        except FileNotFoundError:
+            modified = time.time()
+        return RegistryEntry(activities=metadata.activities, backend=metadata.backend, modified=modified)
+
+    @contextmanager
+    def _locked(self):
+        with _REGISTRY_LOCK:
+            if fcntl is None:
+                yield
+                return
+            with open(self.par_dir / REGISTRY_LOCK_FILE_NAME, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def register_database(metadata: DBMetadata) -> None:
+    DatabaseRegistry(metadata.par_dir).register(metadata)
@@ -25,16 +25,16 @@ class HabitsTable:
 
     def create(self, name: str, overwrite: bool = False):
         if self.exists_in_db():
-            logger.warning(f"Table {self._name} has already been defined in the current database.")
+            logger.warning("Table %s has already been defined in the current database.", self._name)
             if not overwrite:
-                logger.info(f"Selecting existing table. Use overwrite=True to overwrite.")
+                logger.info("Selecting existing table. Use overwrite=True to overwrite.")
             else:
-                logger.warning(f"Overwriting existing table.")
+                logger.warning("Overwriting existing table.")
                 self._cursor.execute(f"DROP TABLE '{self._name}'")
                 self._cursor.execute(f"CREATE TABLE {self._name}({', '.join(self._columns)}")
                 self._conn.commit()
         else:
-            logger.info(f"Creating new table with name '{self._name}'")
+            logger.info("Creating new table with name '%s'", self._name)
             self._cursor.execute(f"CREATE TABLE {self._name}({', '.join(self._columns)}")
             self._conn.commit()
 
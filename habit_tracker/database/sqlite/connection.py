@@ -0,0 +1,102 @@
+import contextlib
+import logging
+import pathlib
+import queue
+import sqlite3
+import threading
+
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = {
+    "journal_mode": "WAL",  # Readers don't block the writer, and a commit is a sequential append to the log.
+    "synchronous": "NORMAL",  # Safe with WAL: only the last commits can be lost on power failure, never corrupted.
+    "cache_size": -32000,  # 32 MB of page cache per connection (negative values are KiB).
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms to wait for a lock instead of failing at once.
+}
+
+DEF_MAX_READERS = 4
+DEF_CACHED_STATEMENTS = 256
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: dict = None) -> sqlite3.Connection:
+    for name, value in (PRAGMAS if pragmas is None else pragmas).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+class ConnectionManager:
+    """
+    Long-lived connections to a SQLite file: a single writer connection, serialised by a lock, and a pool of
+    read-only connections, so report readers run concurrently with the writer (see WAL). Pragmas are applied once,
+    when a connection is opened, and every connection keeps a cache of prepared statements.
+    """
+
+    def __init__(self, file: pathlib.Path, max_readers: int = DEF_MAX_READERS,
+                 cached_statements: int = DEF_CACHED_STATEMENTS):
+        self._file = file
+        self._max_readers = max_readers
+        self._cached_statements = cached_statements
+
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.RLock()
+        self._readers: queue.LifoQueue = queue.LifoQueue()  # Idle readers: the most recent has the warmest cache.
+        self._n_readers = 0
+        self._readers_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """
+        Writer connection, in a transaction that is committed on exit (or rolled back on error).
+        Only one thread holds it at a time; nested uses in the same thread share the outer transaction.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            if self._writer.in_transaction:
+                yield self._writer
+            else:
+                with self._writer:
+                    yield self._writer
+
+    @contextlib.contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        Read-only connection, checked out of the pool (waits if every reader is busy).
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def close(self) -> None:
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            while not self._readers.empty():  # Readers still checked out are closed by the garbage collector.
+                self._readers.get_nowait().close()
+                self._n_readers -= 1
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if self._n_readers < self._max_readers:
+                self._n_readers += 1
+                conn = self._connect()
+                conn.execute("PRAGMA query_only=ON")
+                return conn
+        return self._readers.get()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._file, check_same_thread=False, cached_statements=self._cached_statements)
+        apply_pragmas(conn)
+        logger.debug("Opened a connection to %s", self._file)
+        return conn
@@ -1,109 +1,321 @@
-import sqlite3
-from sqlite3 import Connection, Cursor
 import datetime
+import json
 import logging
+import pathlib
+import threading
+import warnings
 
-from typing import List
+from typing import Iterator, Optional, Union
 
-from habit_tracker import settings
-from habit_tracker.database.sqlite.HabitsTable import HabitsTable
+import numpy as np
+
+from .connection import ConnectionManager
+from ..csv.manifest import LogEntry
+from ..metadata import DBMetadata
+from ..registry import register_database
+from ... import tracing
+from ...records import Record, RecordBatch
 
 logger = logging.getLogger(__name__)
 
+SECS_PER_DAY = 86400
 
-class DBModel:
+# Records are keyed by their absolute start time: seconds since 0001-01-01 (date.toordinal() * 86400 + seconds
+# from the start of the day), so a range of days is a single index seek. Both indexes cover every column read by
+# the queries below, so aggregations never look up the table itself.
+SCHEMA_VERSION = 2
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    activity INTEGER NOT NULL,
+    duration INTEGER NOT NULL
+);
+DROP INDEX IF EXISTS records_timestamp_activity;
+CREATE INDEX IF NOT EXISTS records_timestamp_activity_duration ON records (timestamp, activity, duration);
+CREATE INDEX IF NOT EXISTS records_activity_timestamp_duration ON records (activity, timestamp, duration);
+PRAGMA user_version = {SCHEMA_VERSION};
+"""
 
-    def __init__(self, db_name: str):
-        self._name = db_name
-        self._conn: Connection = sqlite3.connect(settings.DB_DIR / 'sqlite3.db')
-        self._cur: Cursor = self._conn.cursor()
-        self._db_name: str
-        self._db_type: str  # Sqlite, PostgresQL, MySQL, CSV, etc.
-        self._active_table: HabitsTable
-        self._table_set: list[HabitsTable]
-        self._conn: Connection
-        self._cur: Cursor
+INSERT_RECORD = "INSERT INTO records (timestamp, activity, duration) VALUES (?, ?, ?)"
+UPDATE_DURATION = "UPDATE records SET duration = ? WHERE timestamp = ? AND activity = ?"
+SELECT_RECORDS = ("SELECT timestamp / 86400, activity, duration, timestamp % 86400 FROM records "
+                  "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id")
+DELETE_RECORDS = "DELETE FROM records WHERE timestamp >= ? AND timestamp < ?"
+SELECT_SUMMARIES = ("SELECT timestamp / 86400, activity, SUM(duration), COUNT(*), MIN(timestamp % 86400), "
+                    "MAX(timestamp % 86400 + duration) FROM records WHERE timestamp >= ? AND timestamp < ? "
+                    "GROUP BY timestamp / 86400, activity ORDER BY 1")
+SELECT_SECS = ("SELECT activity, SUM(duration) FROM records WHERE timestamp >= ? AND timestamp < ? AND activity >= 0 "
+               "GROUP BY activity")
+SELECT_ACTIVITY_RECORDS = ("SELECT timestamp / 86400, activity, duration, timestamp % 86400 FROM records "
+                           "WHERE activity = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp")
+SELECT_LONGEST = ("SELECT timestamp / 86400, activity, duration, timestamp % 86400 FROM records "
+                  "WHERE timestamp >= ? AND timestamp < ? AND activity >= 0 AND duration >= ? "
+                  "ORDER BY duration DESC, timestamp LIMIT ?")
+SELECT_LONGEST_OF_ACTIVITY = ("SELECT timestamp / 86400, activity, duration, timestamp % 86400 FROM records "
+                              "WHERE activity = ? AND timestamp >= ? AND timestamp < ? AND duration >= ? "
+                              "ORDER BY duration DESC, timestamp LIMIT ?")
 
-    def connect_with_table(self, table_name: str, headers: List[str]):
-        """
-        Creates a new sqlite3 table with the given headers.
+# Bucket of a record for date-bucketed totals: SQL expression, and the first date of a bucket from its value.
+# Day ordinals are converted to Julian days (ordinal 1, 0001-01-01, is Julian day 1721425.5) for strftime.
+PERIOD_BUCKETS = {
+    "day": ("timestamp / 86400", datetime.date.fromordinal),
+    "week": ("timestamp / 86400 - (timestamp / 86400 - 1) % 7", datetime.date.fromordinal),
+    "month": ("CAST(strftime('%Y%m', timestamp / 86400 + 1721424.5) AS INTEGER)",
+              lambda value: datetime.date(value // 100, value % 100, 1)),
+    "year": ("CAST(strftime('%Y', timestamp / 86400 + 1721424.5) AS INTEGER)",
+             lambda value: datetime.date(value, 1, 1)),
+}
+
+
+class SQLiteDatabase:
+    """
+    Interface to operate with a single SQLite file as a database, with the same surface as CSVDatabase.
+    The metadata is kept in a metadata.json file next to it, so both kinds of databases are listed alike.
+    """
+
+    def __init__(self, metadata: DBMetadata):
+        self.metadata = metadata
+        self._connections: Optional[ConnectionManager] = None
+        # Connections are thread-safe (see ConnectionManager): the lock only guards opening and closing them.
+        self.lock = threading.RLock()
+
+    @classmethod
+    def create(cls, name: str, activities: list[str], par_dir: pathlib.Path):
+        metadata = DBMetadata(name=name, activities=activities, par_dir=par_dir, backend="sqlite")
+        metadata.db_path.mkdir(parents=True)
+        db = cls(metadata)
+        db.save_metadata()
+        db.connections  # Creates the file and its schema.
+        return db
+
+    @classmethod
+    def load_from_name(cls, name: str, par_dir: pathlib.Path):
+        metadata_file = par_dir / pathlib.Path(name) / pathlib.Path("metadata.json")
+        try:
+            with open(metadata_file, "r") as f:
+                metadata = json.load(f)
+                return cls(DBMetadata(**metadata))
+        except FileNotFoundError:
+            return None
+
+    def save_metadata(self) -> None:
+        with open(self.metadata.file, "w") as f:
+            json_string = self.metadata.model_dump_json(indent=4)
+            f.write(json_string)
+        register_database(self.metadata)
 
-        :param table_name:
-        :param headers:
-        :return:
+    def read_log(self, date: datetime.date) -> RecordBatch:
         """
-        if not self.table_exists(table_name):
-            self._cur.execute(f"CREATE TABLE {self._name}({', '.join(headers)})")
+        Read every record of the given date.
+        :return: Records of the day, in start time order.
+        """
+        for _, records in self.iter_records(date):
+            return records
+        return RecordBatch()
 
-    def table_exists(self, table_name: str):
-        table = self._cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'") \
-            .fetchone()
-        return True if table else False
+    def update_log(self, date: datetime.date, records: Union[Record, RecordBatch]):
+        """
+        Append one record, or a batch of records, to the given date, in a single transaction.
+        """
+        records = RecordBatch.coerce(records)
+        with self.connections.writer() as conn:
+            conn.executemany(INSERT_RECORD, self.record_rows(date, records))
 
-    def add_record(self, timestamp: int, name: str, duration: int, desc: str = None):
+    def upsert_record(self, date: datetime.date, record: Record) -> None:
+        """
+        Write a record, replacing the record of the same day and activity that starts at the same second, if any.
+        An interval still being tracked is rewritten in place as it grows (see Tracker.checkpoint).
         """
+        timestamp = date.toordinal() * SECS_PER_DAY + record.seconds_from_start
+        with self.connections.writer() as conn:
+            if not conn.execute(UPDATE_DURATION, (record.interval_seconds, timestamp, record.activity)).rowcount:
+                conn.execute(INSERT_RECORD, (timestamp, record.activity, record.interval_seconds))
 
-        :param timestamp:
-        :param name:
-        :param duration:
-        :param desc:
-        :return:
+    def delete_log(self, date: datetime.date) -> None:
+        with self.connections.writer() as conn:
+            conn.execute(DELETE_RECORDS, self._bounds(date, date))
+
+    def read_interval(self, start_date: datetime.date,
+                      end_date: datetime.date = None) -> dict[datetime.date, RecordBatch]:
+        interval_records = dict()
+        if end_date is None:
+            end_date = start_date
+        elif end_date < start_date:
+            warnings.warn("Not valid interval_seconds: end date is earlier than the start date.",
+                          category=UserWarning)
+            return interval_records
+
+        with tracing.span("SQLiteDatabase.read_interval") as span:
+            days = (end_date - start_date).days
+            for t_delta in range(days + 1):
+                interval_records[start_date + datetime.timedelta(days=t_delta)] = RecordBatch()
+            interval_records.update(self.iter_records(start_date, end_date))
+            if span:
+                # Size of the rows fetched, as SQLite pages are shared by many days.
+                span.set(days=days + 1, records=sum(map(len, interval_records.values())),
+                         bytes=sum(records.nbytes for records in interval_records.values()))
+        return interval_records
+
+    def iter_records(self, start_date: datetime.date, end_date: datetime.date = None) -> Iterator[tuple]:
+        """
+        Lazily yield the records of every day with data between both dates (both included), in date order.
+        Records are fetched one month at a time, and every fetch is traced as a span.
+        :param start_date: First date of the interval.
+        :param end_date: Last date of the interval. Defaults to the start date.
+        :return: Iterator of (date, RecordBatch) pairs. Days without records are skipped.
         """
-        self._cur.execute(
-            f"""
-            INSERT INTO {self._name} VALUES(
-            {timestamp},
-            '{name}',
-            {duration},
-            '{desc if desc else ""}')
-            """
-        )
-        self._conn.commit()
+        if end_date is None:
+            end_date = start_date
 
-    def create_table(self, name):
-        pass
+        month_start = start_date
+        while month_start <= end_date:
+            next_month = (month_start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+            month_end = min(end_date, next_month - datetime.timedelta(days=1))
+            with tracing.span("SQLiteDatabase.iter_records") as span, self.connections.reader() as conn:
+                rows = conn.execute(SELECT_RECORDS, self._bounds(month_start, month_end)).fetchall()
+                span.set(records=len(rows))
+            yield from self._split_days(rows)
+            month_start = next_month
 
-    def is_table_present(self, name):
-        pass
+    def read_summaries(self, start_date: datetime.date,
+                       end_date: datetime.date = None) -> dict[datetime.date, LogEntry]:
+        """
+        Summarise every day with records between both dates, aggregated by SQLite.
+        :return: Dictionary with the summary of every day with records, in date order.
+        """
+        if end_date is None:
+            end_date = start_date
 
-    def drop_table(self, name):
-        pass
+        with self.connections.reader() as conn:
+            rows = conn.execute(SELECT_SUMMARIES, self._bounds(start_date, end_date)).fetchall()
 
-    def add_records(self, records: List):
-        pass
+        summaries = dict()
+        for day, activity, secs, count, first_start, last_end in rows:
+            date = datetime.date.fromordinal(day)
+            summary = summaries.get(date)
+            if summary is None:
+                summary = summaries[date] = LogEntry(first_start=first_start, last_end=last_end)
+            summary.records += count
+            summary.first_start = min(summary.first_start, first_start)
+            summary.last_end = max(summary.last_end, last_end)
+            if activity >= 0:
+                summary.secs_per_activity[activity] = secs
+                summary.records_per_activity[activity] = count
+        return summaries
 
-    def drop_last_record(self):
-        pass
+    def secs_between(self, start_date: datetime.date, end_date: datetime.date) -> dict[int, int]:
+        """
+        Seconds per activity between both dates (both included), aggregated by SQLite.
+        :return: Seconds of every activity with any time in the interval, keyed by activity index.
+        """
+        if end_date < start_date:
+            return dict()
+        with self.connections.reader() as conn:
+            rows = conn.execute(SELECT_SECS, self._bounds(start_date, end_date)).fetchall()
+        return {activity: secs for activity, secs in rows if secs}
 
-    def drop_record_from_date(self, date: datetime):
-        pass
+    def secs_per_period(self, start_date: datetime.date, end_date: datetime.date,
+                        period: str = "day") -> dict[datetime.date, dict[int, int]]:
+        """
+        Seconds per activity of every day, week (from Monday), month or year between both dates, summed by SQLite.
+        :param period: One of PERIOD_BUCKETS.
+        :return: Seconds per activity index, keyed by the first date of every period with records, in date order.
+                 Periods at the edges are clipped to the interval, but keyed by their own first date.
+        """
+        if period not in PERIOD_BUCKETS:
+            raise ValueError(f"Unknown period '{period}'. Choose one of: {', '.join(PERIOD_BUCKETS)}.")
+        bucket, to_date = PERIOD_BUCKETS[period]
+        query = (f"SELECT {bucket} AS bucket, activity, SUM(duration) FROM records "
+                 f"WHERE timestamp >= ? AND timestamp < ? AND activity >= 0 GROUP BY bucket, activity ORDER BY bucket")
+        with self.connections.reader() as conn:
+            rows = conn.execute(query, self._bounds(start_date, end_date)).fetchall()
 
-    def get_all_records(self):
-        pass
+        secs_per_period = dict()
+        for value, activity, secs in rows:
+            secs_per_period.setdefault(to_date(value), dict())[activity] = secs
+        return secs_per_period
 
-    def get_records_from_activity(self, activity: str = None):
-        pass
+    def read_activity(self, activity: int, start_date: datetime.date,
+                      end_date: datetime.date = None) -> dict[datetime.date, RecordBatch]:
+        """
+        Read only the records of one activity, through the (activity, timestamp) index.
+        :return: Records of the activity, keyed by every date where it has any, in date order.
+        """
+        if end_date is None:
+            end_date = start_date
+        with self.connections.reader() as conn:
+            rows = conn.execute(SELECT_ACTIVITY_RECORDS, (activity, *self._bounds(start_date, end_date))).fetchall()
+        return dict(self._split_days(rows))
 
-    def get_records_for_period(self, start_date: datetime = None, end_date: datetime = None):
-        pass
+    def longest_records(self, start_date: datetime.date, end_date: datetime.date, n: int = 10,
+                        activity: Optional[int] = None, min_duration: int = 0) -> list[tuple[datetime.date, Record]]:
+        """
+        Top-N longest records between both dates, selected and sorted by SQLite.
+        :param n: Maximum number of records.
+        :param activity: Only look at the records of this activity.
+        :param min_duration: Only look at the records at least this long (seconds).
+        :return: (date, record) pairs, longest first.
+        """
+        bounds = self._bounds(start_date, end_date)
+        with self.connections.reader() as conn:
+            if activity is None:
+                rows = conn.execute(SELECT_LONGEST, (*bounds, min_duration, n)).fetchall()
+            else:
+                rows = conn.execute(SELECT_LONGEST_OF_ACTIVITY, (activity, *bounds, min_duration, n)).fetchall()
+        return [(datetime.date.fromordinal(day), Record(*values)) for day, *values in rows]
 
-    def get_longest_activities(self, min_duration: datetime.time):
-        pass
+    def sync(self) -> None:
+        """ Force the committed records to the database file (fsync), through a full WAL checkpoint."""
+        with self.connections.writer() as conn:
+            conn.execute("PRAGMA wal_checkpoint(FULL)")
 
-    """GETTERS/SETTERS"""
-    def get_activities_from_table(self, table_name: str) -> list:
-        pass
+    def close(self) -> None:
+        with self.lock:
+            if self._connections is not None:
+                self._connections.close()
+                self._connections = None
 
+    @property
+    def connections(self) -> ConnectionManager:
+        with self.lock:
+            if self._connections is None:
+                connections = ConnectionManager(self.metadata.sqlite_file)
+                with connections.reader() as conn:
+                    up_to_date = conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION
+                if not up_to_date:
+                    with connections.writer() as conn:
+                        conn.executescript(SCHEMA)
+                self._connections = connections
+            return self._connections
 
-# if __name__ == '__main__':
-#     sqliteDb = DBModel("sample")
-#     sqliteDb.connect_with_table('sample', ['timestamp', 'activity', 'duration', 'description'])
-#     sqliteDb.add_record(int(datetime.datetime(2024, 5, 15, 11, 34, 22).timestamp()), "a1", 2000)
-#     sqliteDb.add_record(datetime.datetime(2024, 5, 15, 14, 30, 10).timestamp().__int__(), "a2", 2000, "desc1")
-#     sqliteDb.add_record(datetime.datetime(2024, 4, 25, 14, 30, 10).timestamp().__int__(), "a3", 2000, "desc3")
-#     sqliteDb.add_record(datetime.datetime(2024, 5, 5, 14, 30, 10).timestamp().__int__(), "a4", 2000, "awdada")
-#     sqliteDb.add_record(datetime.datetime(2024, 6, 24, 14, 30, 10).timestamp().__int__(), "a5", 2000, "75644")
-#     print(sqliteDb._cur.execute('SELECT * FROM sample').fetchall())
+    @staticmethod
+    def record_rows(date: datetime.date, records: RecordBatch) -> Iterator[tuple[int, int, int]]:
+        """
+        :return: (timestamp, activity, duration) rows of the records table, for the records of the given date.
+        """
+        timestamps = date.toordinal() * SECS_PER_DAY + records.seconds_from_start.astype(np.int64)
+        return zip(timestamps.tolist(), records.activity.tolist(), records.interval_seconds.tolist())
 
+    @staticmethod
+    def _bounds(start_date: datetime.date, end_date: datetime.date) -> tuple[int, int]:
+        return start_date.toordinal() * SECS_PER_DAY, (end_date.toordinal() + 1) * SECS_PER_DAY
+
+    @staticmethod
+    def _split_days(rows: list[tuple]) -> Iterator[tuple]:
+        """
+        Split (day ordinal, activity, duration, seconds from start) rows, sorted by day, into one batch per day.
+        """
+        if not rows:
+            return
+        values = np.array(rows, dtype=np.int64)
+        bounds = np.flatnonzero(np.diff(values[:, 0])) + 1
+        for day_values in np.split(values, bounds):
+            yield datetime.date.fromordinal(int(day_values[0, 0])), RecordBatch.from_rows(day_values[:, 1:])
 
+    @property
+    def name(self):
+        return self.metadata.name
 
+    def __eq__(self, other):
+        return self.metadata.file == other.metadata.file
@@ -2,6 +2,7 @@ import logging
 import sqlite3
 from sqlite3 import Connection
 from habit_tracker import settings
+from habit_tracker.database.sqlite.connection import DEF_CACHED_STATEMENTS, apply_pragmas
 from typing import Optional
 from enum import Enum
 
@@ -20,8 +21,8 @@ def connect_to_db() -> Optional[Connection]:
         settings.DB_DIR.mkdir(parents=True)
 
     try:
-        conn = sqlite3.connect(settings.DB_DIR / '.db')
-        logger.info("Successfully connected to database.")
+        conn = apply_pragmas(sqlite3.connect(settings.DB_DIR / '.db', cached_statements=DEF_CACHED_STATEMENTS))
+        logger.debug("Successfully connected to database.")
         return conn
     except sqlite3.Error:
         logger.error("Cannot connect to database.")
@@ -36,21 +37,18 @@ def create_table(conn: Connection, name: str, cols: list[tuple]) -> int:
     :param cols:
     :return: 0: OK; 1: ALREADY CREATED; 2: ERROR
     """
-    cur = conn.cursor()
     cols_and_types = ', '.join([f"{n} {t}" for (n, t) in cols])
     result = 0
     try:
-        cur.execute(f"CREATE TABLE {name}({cols_and_types})")
-        conn.commit()
+        with conn:
+            conn.execute(f"CREATE TABLE {name}({cols_and_types})")
     except sqlite3.OperationalError:
-        logger.warning(f"Table with name '{name}' already exists.")
+        logger.warning("Table with name '%s' already exists.", name)
         result = 1
     except sqlite3.Error:
         logger.error("An error occurred while trying to create a table.")
         result = 2
-    finally:
-        cur.close()
-        return result
+    return result
 
 
 def create_habits_table(conn: Connection, name: str) -> int:
@@ -66,79 +64,107 @@ def create_habits_table(conn: Connection, name: str) -> int:
         ("duration", "INTEGER NOT NULL")
     ]
 
-    return create_table(conn, name, HABITS_TABLE_COLS_AND_TYPES)
+    result = create_table(conn, name, HABITS_TABLE_COLS_AND_TYPES)
+    if result != 2:
+        # Covering index of the per-action queries: they never read the table itself.
+        with conn:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_name_duration ON {name} (name, duration)")
+    return result
 
 
 def insert_record(conn: Connection, table_name: str, record: tuple) -> bool:
-    if len(record) != len(HABITS_TABLE_COLS):
-        logger.error(f"Insert query not permitted. Should contain {len(HABITS_TABLE_COLS)} values.")
+    return insert_records(conn, table_name, [record])
+
+
+def insert_records(conn: Connection, table_name: str, records: list[tuple]) -> bool:
+    """
+    Insert a batch of records with a single prepared statement, in one transaction.
+    :return: False if any record is not valid or the query failed (then nothing is inserted), True elsewhere.
+    """
+    if any(len(record) != len(HABITS_TABLE_COLS) for record in records):
+        logger.error("Insert query not permitted. Should contain %s values.", len(HABITS_TABLE_COLS))
         return False
 
-    cur = conn.cursor()
     result = True
-
     try:
         query = f"""
         INSERT INTO {table_name}
         ({', '.join(HABITS_TABLE_COLS)})
         VALUES
-        (?, ?, ?) 
+        (?, ?, ?)
         """
-        cur.execute(query, record)
-        conn.commit()
-        logger.info(f"Successfully added record to table {table_name}")
+        with conn:
+            conn.executemany(query, records)
+        logger.debug("Successfully added %s record(s) to table %s", len(records), table_name)
     except sqlite3.Error as e:
-        logger.error(f'Could not perform INSERT query. Error trace: {e}')
+        logger.error("Could not perform INSERT query. Error trace: %s", e)
         result = False
-    finally:
-        logger.info("Closing connection to database.")
-        cur.close()
-        return result
+    return result
 
 
 def select_all(conn: Connection, table_name: str):
-    cur = conn.cursor()
     records = None
     try:
         query = f"""SELECT * FROM {table_name}"""
-        cur.execute(query)
-        records = cur.fetchall()
+        records = conn.execute(query).fetchall()
     except sqlite3.Error as e:
-        logger.error(f"Could not perform SELECT query. Error trace: {e}")
-    finally:
-        logger.info('Closing connection to database.')
-        cur.close()
-        return records
+        logger.error("Could not perform SELECT query. Error trace: %s", e)
+    return records
 
 
 def select_action(conn: Connection, table_name: str, action_name: str):
-    cur = conn.cursor()
     records = None
     try:
-        query = f"""SELECT * FROM {table_name} WHERE name = '{action_name}'"""
-        cur.execute(query)
-        records = cur.fetchall()
+        query = f"""SELECT * FROM {table_name} WHERE name = ?"""
+        records = conn.execute(query, (action_name,)).fetchall()
     except sqlite3.Error as e:
-        logger.error(f"Could not perform SELECT query. Error trace: {e}")
-    finally:
-        logger.info('Closing connection to database.')
-        cur.close()
-        return records
+        logger.error("Could not perform SELECT query. Error trace: %s", e)
+    return records
 
 
 def select_actions_with_min_duration(conn: Connection, table_name: str, min_duration: int):
-    cur = conn.cursor()
     records = None
     try:
-        query = f"""SELECT * FROM {table_name} WHERE duration > {min_duration}"""
-        cur.execute(query)
-        records = cur.fetchall()
+        query = f"""SELECT * FROM {table_name} WHERE duration > ?"""
+        records = conn.execute(query, (min_duration,)).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Could not perform SELECT query. Error trace: %s", e)
+    return records
+
+
+def sum_duration_per_action(conn: Connection, table_name: str, start: int = None, end: int = None):
+    """
+    Total duration of every action, summed by SQLite.
+    :param start: Only sum the records from this timestamp (included).
+    :param end: Only sum the records until this timestamp (excluded).
+    :return: (name, total duration, number of records) rows, longest total first.
+    """
+    records = None
+    try:
+        query = f"""SELECT name, SUM(duration), COUNT(*) FROM {table_name}
+        WHERE timestamp >= ? AND timestamp < ? GROUP BY name ORDER BY 2 DESC"""
+        records = conn.execute(query, (start if start is not None else -2 ** 63,
+                                       end if end is not None else 2 ** 63 - 1)).fetchall()
+    except sqlite3.Error as e:
+        logger.error("Could not perform SELECT query. Error trace: %s", e)
+    return records
+
+
+def select_longest_actions(conn: Connection, table_name: str, n: int, action_name: str = None):
+    """
+    :return: The n longest records, of a single action if given, longest first.
+    """
+    records = None
+    try:
+        if action_name is None:
+            query = f"""SELECT * FROM {table_name} ORDER BY duration DESC LIMIT ?"""
+            records = conn.execute(query, (n,)).fetchall()
+        else:
+            query = f"""SELECT * FROM {table_name} WHERE name = ? ORDER BY duration DESC LIMIT ?"""
+            records = conn.execute(query, (action_name, n)).fetchall()
     except sqlite3.Error as e:
-        logger.error(f"Could not perform SELECT query. Error trace: {e}")
-    finally:
-        logger.info('Closing connection to database.')
-        cur.close()
-        return records
+        logger.error("Could not perform SELECT query. Error trace: %s", e)
+    return records
 
 
 def main(table_name: str):
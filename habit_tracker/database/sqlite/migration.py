@@ -0,0 +1,108 @@
+"""
+Migrate a CSV database to the SQLite backend, in place:
+
+    python -m habit_tracker.database.sqlite.migration <name> [--par-dir .db]
+"""
+import argparse
+import datetime
+import logging
+import pathlib
+
+from typing import Optional
+
+from .database import INSERT_RECORD, SCHEMA, SQLiteDatabase
+from ..csv.database import CSVDatabase
+from ...records import RecordBatch
+
+logger = logging.getLogger(__name__)
+
+# Days already copied, committed in the same transaction as their records: a migration resumes after them.
+MIGRATION_SCHEMA = "CREATE TABLE IF NOT EXISTS migrated_days (day INTEGER PRIMARY KEY, records INTEGER NOT NULL)"
+INSERT_MIGRATED_DAY = "INSERT INTO migrated_days (day, records) VALUES (?, ?)"
+COUNT_RECORDS_PER_DAY = "SELECT timestamp / 86400, COUNT(*) FROM records GROUP BY 1"
+
+DEF_BATCH_RECORDS = 100_000
+
+
+def migrate_csv_to_sqlite(csv_db: CSVDatabase, batch_records: int = DEF_BATCH_RECORDS) -> SQLiteDatabase:
+    """
+    Copy every day of a CSV database into a SQLite file in its own folder, then switch its metadata to the SQLite
+    backend. Days are streamed (at most one sealed month of records and one batch are held in memory) and
+    committed in batches of whole days. If interrupted, running it again resumes after the last committed batch.
+    The CSV tree is left untouched, as a backup.
+    :param csv_db: Database to migrate.
+    :param batch_records: Minimum number of records per transaction.
+    :return: The migrated database.
+    :raises RuntimeError: If the number of records of any day differs between both databases. The metadata isn't
+                          switched then.
+    """
+    sqlite_db = SQLiteDatabase(csv_db.metadata.model_copy(update={"backend": "sqlite"}))
+    with sqlite_db.connections.writer() as conn:
+        conn.executescript(SCHEMA)
+        conn.execute(MIGRATION_SCHEMA)
+        migrated = dict(conn.execute("SELECT day, records FROM migrated_days"))
+    if migrated:
+        logger.info("Resuming the migration of %s after %s day(s).", csv_db.name, len(migrated))
+
+    dates = csv_db.manifest.dates_between(datetime.date.min, datetime.date.max)
+    batch, n_batch_records = [], 0
+    if dates:
+        for date, records in csv_db.iter_records(dates[0], dates[-1]):
+            if date.toordinal() in migrated:
+                continue
+            batch.append((date, records))
+            n_batch_records += len(records)
+            if n_batch_records >= batch_records:
+                _commit(sqlite_db, batch, migrated)
+                batch, n_batch_records = [], 0
+    _commit(sqlite_db, batch, migrated)
+
+    _check_counts(csv_db, sqlite_db, migrated)
+    sqlite_db.save_metadata()
+    logger.info("Migrated %s: %s day(s) to %s.", csv_db.name, len(migrated), sqlite_db.metadata.sqlite_file)
+    return sqlite_db
+
+
+def _commit(sqlite_db: SQLiteDatabase, batch: list[tuple[datetime.date, RecordBatch]], migrated: dict) -> None:
+    if not batch:
+        return
+    with sqlite_db.connections.writer() as conn:
+        for date, records in batch:
+            conn.executemany(INSERT_RECORD, sqlite_db.record_rows(date, records))
+        conn.executemany(INSERT_MIGRATED_DAY, [(date.toordinal(), len(records)) for date, records in batch])
+    migrated.update((date.toordinal(), len(records)) for date, records in batch)
+    logger.debug("Committed %s day(s), up to %s.", len(batch), batch[-1][0])
+
+
+def _check_counts(csv_db: CSVDatabase, sqlite_db: SQLiteDatabase, migrated: dict) -> None:
+    """
+    Compare the number of records of every day: in the CSV manifest, as read from the CSV tree, and in SQLite.
+    """
+    expected = {date.toordinal(): entry.records for date, entry in csv_db.manifest.logs.items() if entry.records}
+    with sqlite_db.connections.reader() as conn:
+        stored = dict(conn.execute(COUNT_RECORDS_PER_DAY))
+    mismatches = sorted(day for day in expected.keys() | migrated.keys() | stored.keys()
+                        if not expected.get(day) == migrated.get(day) == stored.get(day))
+    if mismatches:
+        dates = ", ".join(datetime.date.fromordinal(day).isoformat() for day in mismatches[:10])
+        raise RuntimeError(f"Record counts differ between the CSV and SQLite databases on {len(mismatches)} "
+                           f"day(s): {dates}.")
+
+
+def main(args=None) -> Optional[SQLiteDatabase]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("name", help="Name of the CSV database.")
+    parser.add_argument("--par-dir", type=pathlib.Path, default=pathlib.Path(".db"))
+    parser.add_argument("--batch-records", type=int, default=DEF_BATCH_RECORDS)
+    args = parser.parse_args(args)
+
+    csv_db = CSVDatabase.load_from_name(args.name, args.par_dir)
+    if csv_db is None:
+        parser.error(f"No database named '{args.name}' in {args.par_dir}.")
+    if csv_db.metadata.backend != "csv":
+        parser.error(f"'{args.name}' is not a CSV database.")
+    return migrate_csv_to_sqlite(csv_db, args.batch_records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import datetime
+import json
+import pathlib
+import shutil
+import threading
+
+from typing import Iterator, Optional, Protocol, Union, runtime_checkable
+
+from .csv.database import CSVDatabase
+from .csv.manifest import LogEntry
+from .metadata import DBMetadata
+from .registry import DatabaseRegistry
+from .sqlite.database import SQLiteDatabase
+from ..records import Record, RecordBatch
+
+BACKENDS = {
+    "csv": CSVDatabase,
+    "sqlite": SQLiteDatabase,
+}
+
+
+@runtime_checkable
+class Storage(Protocol):
+    """
+    Operations that every storage backend implements, so the Tracker, the Controller and the reports work with
+    any of them. The backend of a database is stored in its metadata.json (see load_database).
+    Every operation may be called from any thread. `lock` is held by callers that chain several operations that
+    must not be interleaved with those of other threads (e.g. a BufferedAppender writing and syncing a batch).
+    """
+    metadata: DBMetadata
+    lock: threading.RLock
+
+    @property
+    def name(self) -> str:
+        ...
+
+    def read_log(self, date: datetime.date) -> RecordBatch:
+        ...
+
+    def update_log(self, date: datetime.date, records: Union[Record, RecordBatch]):
+        ...
+
+    def upsert_record(self, date: datetime.date, record: Record) -> None:
+        ...
+
+    def delete_log(self, date: datetime.date) -> None:
+        ...
+
+    def read_interval(self, start_date: datetime.date,
+                      end_date: datetime.date = None) -> dict[datetime.date, RecordBatch]:
+        ...
+
+    def iter_records(self, start_date: datetime.date, end_date: datetime.date = None) -> Iterator[tuple]:
+        ...
+
+    def read_summaries(self, start_date: datetime.date,
+                       end_date: datetime.date = None) -> dict[datetime.date, LogEntry]:
+        ...
+
+    def secs_between(self, start_date: datetime.date, end_date: datetime.date) -> dict[int, int]:
+        ...
+
+    def sync(self) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def create_database(name: str, activities: list[str], par_dir: pathlib.Path, backend: str = "csv",
+                    **options) -> Storage:
+    """
+    :param backend: One of BACKENDS.
+    :param options: Backend specific options (e.g. log_format for "csv").
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{backend}'. Choose one of: {', '.join(BACKENDS)}.")
+    return BACKENDS[backend].create(name, activities, par_dir, **options)
+
+
+def load_database(name: str, par_dir: pathlib.Path) -> Optional[Storage]:
+    """
+    Load a database with the backend stored in its metadata.
+    :return: None if there's no database with that name.
+    """
+    metadata_file = par_dir / pathlib.Path(name) / pathlib.Path("metadata.json")
+    try:
+        with open(metadata_file, "r") as f:
+            metadata = DBMetadata(**json.load(f))
+    except FileNotFoundError:
+        return None
+
+    if metadata.backend not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{metadata.backend}' in {metadata_file}.")
+    DatabaseRegistry(par_dir).check(metadata)  # In case the metadata was edited by hand.
+    return BACKENDS[metadata.backend](metadata)
+
+
+def delete_database(name: str, par_dir: pathlib.Path) -> bool:
+    """
+    Delete a database, with all its records, and remove it from the registry of its folder.
+    :return: False if there's no database with that name.
+    """
+    db = load_database(name, par_dir)
+    if db is None:
+        return False
+    db.close()
+    shutil.rmtree(db.metadata.db_path)
+    DatabaseRegistry(par_dir).unregister(name)
+    return True
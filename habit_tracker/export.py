@@ -0,0 +1,78 @@
+import concurrent.futures
+import datetime
+import itertools
+import os
+import pathlib
+
+from typing import Optional
+
+from .database.storage import Storage, load_database
+from .plots import Graphics
+from .report import Report
+
+PERIODS = ("day", "week")
+
+
+def export_reports(db: Storage, start_date: datetime.date, end_date: datetime.date, out_dir: pathlib.Path,
+                   period: str = "day", fmt: str = "png", max_workers: Optional[int] = None) -> list[pathlib.Path]:
+    """
+    Render the report of every day or week with records between both dates into image files, in parallel.
+    The periods are split into slices of consecutive days, and every worker process loads the database and reads
+    only the records of its own slice.
+    :param db: Database of the reports.
+    :param start_date: First date to export.
+    :param end_date: Last date to export (included).
+    :param out_dir: Folder of the images: "YYYY-MM-DD.<fmt>" for days, "YYYY-Www.<fmt>" (ISO week) for weeks.
+    :param period: "day" or "week".
+    :param fmt: Image format (see Graphics.render).
+    :param max_workers: Number of worker processes. Defaults to the number of CPUs.
+    :return: Path of every image written, in date order.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}'. Choose one of: {', '.join(PERIODS)}.")
+
+    periods = _periods(list(db.read_summaries(start_date, end_date)), period)
+    if not periods:
+        return []
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    # A few slices per worker keeps every process busy, even if some periods have many more records.
+    slice_size = -(-len(periods) // (max_workers * 4))
+    slices = [periods[i:i + slice_size] for i in range(0, len(periods), slice_size)]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_workers, len(slices))) as executor:
+        futures = [executor.submit(_export_slice, db.name, db.metadata.par_dir, periods_slice, out_dir, fmt)
+                   for periods_slice in slices]
+        return list(itertools.chain.from_iterable(future.result() for future in futures))
+
+
+def _periods(dates: list[datetime.date], period: str) -> list[tuple[str, datetime.date, datetime.date]]:
+    """
+    :return: (file stem, first date, last date) of every period with records. Only dates with records are kept,
+             so a week at the edges of the exported range is not read beyond it.
+    """
+    if period == "day":
+        return [(date.isoformat(), date, date) for date in dates]
+
+    periods = []
+    for (year, week), week_dates in itertools.groupby(dates, key=lambda date: date.isocalendar()[:2]):
+        week_dates = list(week_dates)
+        periods.append((f"{year}-W{week:02d}", week_dates[0], week_dates[-1]))
+    return periods
+
+
+def _export_slice(db_name: str, par_dir: pathlib.Path, periods: list[tuple], out_dir: pathlib.Path,
+                  fmt: str) -> list[pathlib.Path]:
+    """
+    Worker: render the reports of a slice of periods, drawing all of them on the same figure.
+    """
+    db = load_database(db_name, par_dir)
+    graphics = Graphics()
+    files = []
+    for stem, first_date, last_date in periods:
+        report = Report(db.iter_records(first_date, last_date), db.metadata.activities, graphics)
+        file = out_dir / f"{stem}.{fmt}"
+        file.write_bytes(report.render(fmt))
+        files.append(file)
+    return files
@@ -1,81 +1,212 @@
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-import numpy as np
+import contextlib
 import datetime
+import io
+import threading
 
+from typing import TYPE_CHECKING, Optional
 
-class Graphics:
-    plt.style.use('seaborn-v0_8-darkgrid')
-
-    def __init__(self):
-        fig, axes = plt.subplots(1, 2, figsize=(14, 3), gridspec_kw={'width_ratios': [1, 3]})
-        self.fig: plt.Figure = fig
-        self.ax1: plt.axis = axes[0]
-        self.ax2: plt.axis = axes[1]
-
-    def pie(self, x, labels: list[str], autopct=None, wedgeprops=None):
-        self.ax1.pie(x, labels=labels, autopct=autopct, wedgeprops=wedgeprops)
-
-    def workday(self, records: dict, activity_set):
-        dates = list(records.keys())
-        if not dates:
-            return None
-        else:
-            base_dt = dates[0]
-            base_date = datetime.datetime.combine(base_dt, datetime.datetime.min.time())
+import numpy as np
 
-            self.ax2.set_xlim((np.datetime64(str(base_date + datetime.timedelta(hours=6))),
-                               np.datetime64(str(base_date + datetime.timedelta(hours=22)))))
+from . import tracing
+from .records import RecordBatch
 
-            self.ax2.set_yticks(np.array(list(range(len(activity_set)))), labels=activity_set)
-            self.ax2.set_ylim(-0.5, len(activity_set) - 0.5)
+if TYPE_CHECKING:
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
 
-            locator = mdates.HourLocator(interval=1)
-            formatter = mdates.DateFormatter('%H:%M')
+STYLE = 'seaborn-v0_8-darkgrid'
 
-            self.ax2.xaxis.set_major_locator(locator)
-            self.ax2.xaxis.set_major_formatter(formatter)
+# The style is applied through rcParams, which are global to matplotlib: figures are drawn one at a time.
+_STYLE_LOCK = threading.RLock()
 
-            for daily_records in records.values():
-                intervals = self.compute_intervals(daily_records, base_date)
 
-                for label in intervals:
-                    y = [int(label)] * 2
-                    for interval in intervals[label]:
-                        self.discrete_interval(interval, y, ax=self.ax2, linewidth=25, solid_capstyle='butt',
-                                               color=(0.2, 0.2, 0.2, 0.2))
+class Graphics:
+    """
+    Figure of a report: the time per activity (pie) on the left and the intervals of the day on the right.
+    matplotlib is imported and the figure is created only when something is drawn. By default the figure is
+    headless (Agg canvas, not registered in pyplot), so it can be rendered to bytes from any thread. Plotting
+    again clears the axes, so the same Graphics can be reused across consecutive reports.
+    """
+
+    def __init__(self, interactive: bool = False):
+        """
+        :param interactive: If True, the figure is created through pyplot, so it can be displayed with show().
+        """
+        self.interactive = interactive
+        self._fig: Optional["Figure"] = None
+        self._ax1: Optional["Axes"] = None
+        self._ax2: Optional["Axes"] = None
+
+    @property
+    def fig(self) -> "Figure":
+        if self._fig is None:
+            self._create_figure()
+        return self._fig
+
+    @property
+    def ax1(self) -> "Axes":
+        if self._fig is None:
+            self._create_figure()
+        return self._ax1
+
+    @property
+    def ax2(self) -> "Axes":
+        if self._fig is None:
+            self._create_figure()
+        return self._ax2
+
+    def clear(self) -> None:
+        """ Clear both axes (artists, ticks, labels and limits), keeping the figure."""
+        if self._fig is not None:
+            with self._style():
+                self._ax1.cla()
+                self._ax2.cla()
+
+    def render(self, fmt: str = "png", dpi: Optional[int] = None) -> bytes:
+        """
+        Render the figure without displaying it.
+        :param fmt: Any format supported by matplotlib (e.g. "png", "svg", "pdf").
+        :param dpi: Resolution of raster formats. Defaults to the one of the style.
+        :return: The encoded image.
+        """
+        buffer = io.BytesIO()
+        with tracing.span("Graphics.render", format=fmt) as span, self._style():
+            self.fig.savefig(buffer, format=fmt, dpi=dpi)  # matplotlib draws the figure here
+            span.set(bytes=buffer.tell())
+        return buffer.getvalue()
 
-    @staticmethod
-    def show():
-        plt.show()
+    def pie(self, x, labels: list[str], autopct=None, wedgeprops=None):
+        with self._style():
+            ax = self._axes()[0]
+            self._reset(ax)
+            ax.pie(x, labels=labels, autopct=autopct, wedgeprops=wedgeprops)
+
+    def workday(self, records, activity_set):
+        """
+        Plot the intervals of every day on a single timeline, with one LineCollection per activity.
+        :param records: Dictionary of RecordBatch per date, or an iterable of (date, RecordBatch) pairs, in date order.
+        :param activity_set: Activity labels.
+        """
+        with tracing.span("Graphics.workday") as span:
+            if self._fig is not None:
+                self._reset(self._ax2)
+
+            days = iter(records.items() if isinstance(records, dict) else records)
+            first_day = next(days, None)
+            if first_day is None:
+                if self._fig is not None:
+                    # Nothing is drawn over the timeline: the ticks, labels and limits of a previous range go too.
+                    with self._style():
+                        self._ax2.cla()
+                return None
+
+            with self._style():
+                import matplotlib.dates as mdates
+                from matplotlib.collections import LineCollection
+
+                ax = self._axes()[1]
+
+                base_date = datetime.datetime.combine(first_day[0], datetime.datetime.min.time())
+
+                ax.set_xlim((np.datetime64(str(base_date + datetime.timedelta(hours=6))),
+                             np.datetime64(str(base_date + datetime.timedelta(hours=22)))))
+
+                ax.set_yticks(np.array(list(range(len(activity_set)))), labels=activity_set)
+                ax.set_ylim(-0.5, len(activity_set) - 0.5)
+
+                locator = mdates.HourLocator(interval=1)
+                formatter = mdates.DateFormatter('%H:%M')
+
+                ax.xaxis.set_major_locator(locator)
+                ax.xaxis.set_major_formatter(formatter)
+
+                # Every day is drawn over the timeline of the first one. Days are consumed one at a time: only the
+                # segments to draw are kept, not the records.
+                segments_per_activity: dict[int, list[np.ndarray]] = dict()
+                n_records = self._add_segments(segments_per_activity, first_day[1], base_date)
+                del first_day
+                for _, daily_records in days:
+                    n_records += self._add_segments(segments_per_activity, daily_records, base_date)
+                span.set(records=n_records)
+
+                for label, segments in segments_per_activity.items():
+                    ax.add_collection(LineCollection(np.concatenate(segments), linewidths=25, capstyle='butt',
+                                                     colors=[(0.2, 0.2, 0.2, 0.2)]), autolim=False)
+
+    def show(self):
+        """ Display the figure. A headless figure can't be displayed: use render() instead."""
+        if not self.interactive:
+            raise RuntimeError("Graphics is headless and can't be displayed: use render(), or create it with "
+                               "Graphics(interactive=True).")
+        import matplotlib.pyplot as plt
+        with tracing.span("Graphics.show"):
+            plt.show()
+
+    @classmethod
+    def _add_segments(cls, segments_per_activity: dict[int, list[np.ndarray]], records: RecordBatch,
+                      base_dt) -> int:
+        """
+        Add the [(start, y), (end, y)] line segments of the intervals of a day to those of their activity.
+        :return: Number of records of the day.
+        """
+        import matplotlib.dates as mdates
+
+        for label, activity_intervals in cls.compute_intervals(records, base_dt).items():
+            x = mdates.date2num(activity_intervals)
+            segments_per_activity.setdefault(label, []).append(np.stack([x, np.full_like(x, label)], axis=-1))
+        return len(records)
 
     @staticmethod
-    def discrete_interval(x, y, ax=None, where='post', **kwargs):
-        assert where in ['post', 'pre']
-        x = np.array(x)
-        y = np.array(y)
-
-        y_slice = y[:-1] if where == 'post' else y[1:]
+    def compute_intervals(records: RecordBatch, base_dt) -> dict[int, np.ndarray]:
+        """
+        :return: For every activity, an array of [start, end] datetime64 pairs, relative to the base datetime.
+        """
+        base = np.datetime64(base_dt, 's')
+        starts = base + records.seconds_from_start.astype('timedelta64[s]')
+        ends = starts + records.interval_seconds.astype('timedelta64[s]')
 
-        X = np.c_[x[:-1], x[1:], x[1:]]
-        Y = np.c_[y_slice, y_slice, np.zeros_like(x[:-1]) * np.nan]
+        intervals_per_activity = dict()
+        for activity in np.unique(records.activity[records.activity >= 0]).tolist():
+            mask = records.activity == activity
+            intervals_per_activity[activity] = np.stack([starts[mask], ends[mask]], axis=-1)
 
-        if not ax:
-            ax = plt.gca()
+        return intervals_per_activity
 
-        return ax.plot(X.flatten(), Y.flatten(), **kwargs)
+    def _axes(self) -> tuple["Axes", "Axes"]:
+        """
+        :return: Both axes, creating the figure if needed. An interactive figure closed by the user is replaced.
+        """
+        if self._fig is None or (self.interactive and not self._is_open()):
+            self._create_figure()
+        return self._ax1, self._ax2
 
     @staticmethod
-    def compute_intervals(records, base_dt):
-        intervals_per_activity = dict()
-        for record in records:
-            start = base_dt + datetime.timedelta(seconds=int(record[2]))
-            end = start + datetime.timedelta(seconds=int(record[1]))
-
-            if record[0] not in intervals_per_activity:
-                intervals_per_activity[record[0]] = [[start, end]]
+    def _reset(ax: "Axes") -> None:
+        """ Remove the plotted artists of some axes. Much cheaper than Axes.clear(), which rebuilds the ticks: the
+        plot methods set the ticks, labels and limits again."""
+        for artist in [*ax.collections, *ax.patches, *ax.texts, *ax.lines]:
+            artist.remove()
+
+    def _create_figure(self) -> None:
+        with self._style():
+            if self.interactive:
+                import matplotlib.pyplot as plt
+                fig = plt.figure(figsize=(14, 3))
             else:
-                intervals_per_activity[record[0]].append([start, end])
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.figure import Figure
+                fig = Figure(figsize=(14, 3))
+                FigureCanvasAgg(fig)
+            self._ax1, self._ax2 = fig.subplots(1, 2, gridspec_kw={'width_ratios': [1, 3]})
+        self._fig = fig
 
-        return intervals_per_activity
+    def _is_open(self) -> bool:
+        import matplotlib.pyplot as plt
+        return plt.fignum_exists(self._fig.number)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _style():
+        import matplotlib.style
+        with _STYLE_LOCK, matplotlib.style.context(STYLE):
+            yield
@@ -0,0 +1,132 @@
+from typing import Iterable, Iterator, Sequence, Union
+
+import numpy as np
+
+RECORD_DTYPE = np.dtype([
+    ("activity", "<i4"),
+    ("interval_seconds", "<i4"),
+    ("seconds_from_start", "<i4"),
+])
+
+
+class Record:
+    """ A single tracked interval: activity index, duration and start time (seconds from the start of the day)."""
+    __slots__ = ("activity", "interval_seconds", "seconds_from_start")
+
+    def __init__(self, activity: int, interval_seconds: int, seconds_from_start: int):
+        self.activity = activity
+        self.interval_seconds = interval_seconds
+        self.seconds_from_start = seconds_from_start
+
+    def values(self) -> tuple[int, int, int]:
+        return self.activity, self.interval_seconds, self.seconds_from_start
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __repr__(self):
+        return (f"Record(activity={self.activity}, interval_seconds={self.interval_seconds}, "
+                f"seconds_from_start={self.seconds_from_start})")
+
+
+class RecordBatch:
+    """
+    Columnar batch of records, backed by a structured array of int32 columns (12 bytes per record).
+    This is the type passed between the Tracker, the databases, the Report and the Graphics.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: np.ndarray = None):
+        """
+        :param data: Structured array with RECORD_DTYPE (e.g. a memory-mapped binary log). It is not copied.
+        """
+        if data is None:
+            data = np.empty(0, dtype=RECORD_DTYPE)
+        elif data.dtype != RECORD_DTYPE:
+            raise TypeError(f"Expected an array of dtype {RECORD_DTYPE}, got {data.dtype}.")
+        self._data = data
+
+    @classmethod
+    def from_records(cls, records: Iterable[Record]):
+        return cls(np.array([record.values() for record in records], dtype=RECORD_DTYPE))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]):
+        """
+        Build a batch from rows of (activity, interval_seconds, seconds_from_start) values, such as CSV rows.
+        Values are converted to integers in a single vectorised step.
+        """
+        values = np.array(rows if isinstance(rows, (list, np.ndarray)) else list(rows), dtype="<i4").reshape(-1, 3)
+        return cls(np.ascontiguousarray(values).view(RECORD_DTYPE).reshape(-1))
+
+    @classmethod
+    def concatenate(cls, batches: Iterable["RecordBatch"]):
+        arrays = [batch.data for batch in batches]
+        return cls(np.concatenate(arrays)) if arrays else cls()
+
+    @classmethod
+    def coerce(cls, records: Union[Record, "RecordBatch", Iterable[Record]]):
+        if isinstance(records, RecordBatch):
+            return records
+        if isinstance(records, Record):
+            return cls.from_records([records])
+        return cls.from_records(records)
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data
+
+    @property
+    def activity(self) -> np.ndarray:
+        return self._data["activity"]
+
+    @property
+    def interval_seconds(self) -> np.ndarray:
+        return self._data["interval_seconds"]
+
+    @property
+    def seconds_from_start(self) -> np.ndarray:
+        return self._data["seconds_from_start"]
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def secs_per_activity(self, minlength: int = 0) -> np.ndarray:
+        """
+        Total seconds per activity index. Records without activity (-1) are left out.
+        """
+        valid = self.activity >= 0
+        return np.bincount(self.activity[valid], weights=self.interval_seconds[valid],
+                           minlength=minlength).astype(np.int64)
+
+    def records_per_activity(self, minlength: int = 0) -> np.ndarray:
+        """
+        Number of records per activity index. Records without activity (-1) are left out.
+        """
+        return np.bincount(self.activity[self.activity >= 0], minlength=minlength)
+
+    def tolist(self) -> list[list[int]]:
+        return [list(row) for row in self._data.tolist()]
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Record]:
+        for row in self._data.tolist():
+            yield Record(*row)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return RecordBatch(self._data[item])
+        return Record(*self._data[item].tolist())
+
+    def __eq__(self, other):
+        if not isinstance(other, RecordBatch):
+            return NotImplemented
+        return np.array_equal(self._data, other.data)
+
+    def __repr__(self):
+        return f"RecordBatch({self.tolist()})"
@@ -1,42 +1,130 @@
 import datetime
 
+from typing import Iterable, Iterator, Optional, Union
+
+from . import tracing
+from .aggregation import Aggregates
 from .plots import Graphics
+from .records import RecordBatch
 
 
 class Report:
-    def __init__(self, records: dict[datetime.date], activity_set: list[str]):
+    def __init__(self, records: Union[dict[datetime.date, RecordBatch], Iterable[tuple]], activity_set: list[str],
+                 graphics: Optional[Graphics] = None):
+        """
+        :param records: Records per date, either as a dictionary or as a stream of (date, RecordBatch) pairs
+                        (see Storage.iter_records). A stream is consumed only once: totals are accumulated
+                        while the intervals are plotted, so they can't be plotted once the totals were read.
+        :param activity_set: Activity labels, indexed by the activity column of the records.
+        :param graphics: Figure to draw on, e.g. one shared by consecutive reports. By default, an interactive figure
+                         is created by show(), and a headless one the first time the report is plotted otherwise.
+        """
         self.records = records
         self.daily_records = dict()
         self.activity_set = activity_set
-        self.graphics = Graphics()
+        self._graphics = graphics
+        self._aggregates: Optional[Aggregates] = None
 
-    def plot_time_per_activity(self):
+    @classmethod
+    def from_summaries(cls, summaries: dict, activity_set: list[str], graphics: Optional[Graphics] = None):
+        """
+        Build a report with the totals of a set of days from their summaries (see Storage.read_summaries),
+        without reading any record. Intervals are not available in such a report.
+        """
+        report = cls(dict(), activity_set, graphics)
+        report._aggregates = Aggregates(len(activity_set))
+        for date, summary in summaries.items():
+            report._aggregates.add_summary(date, summary.secs_per_activity, summary.records_per_activity)
+        return report
+
+    @property
+    def graphics(self) -> Graphics:
+        if self._graphics is None:
+            self._graphics = Graphics()
+        return self._graphics
+
+    @property
+    def is_stream(self) -> bool:
+        return not isinstance(self.records, dict)
 
-        x = self.total_secs_per_activity.values()
-        labels = [self.activity_set[int(key)] for key in self.total_secs_per_activity.keys()]
+    def plot_time_per_activity(self):
+        secs_per_activity = self.total_secs_per_activity
+        x = secs_per_activity.values()
+        labels = [self.activity_set[key] for key in secs_per_activity.keys()]
+        total_secs = self.aggregate().total_secs
 
         def auto_pct(pct):
-            total_secs = round(sum(self.total_secs_per_activity.values()))
             return f'{pct:.2f}%\n({datetime.timedelta(seconds=total_secs)}'
 
         self.graphics.pie(x, labels, auto_pct, {'linewidth': 3.0, 'edgecolor': 'white'})
 
     def plot_intervals(self):
-        self.graphics.workday(self.records, self.activity_set)
+        """ Raises a RuntimeError if the records are a stream that was already consumed."""
+        self.graphics.workday(self._days(), self.activity_set)
 
-    def show(self):
-        self.plot_time_per_activity()
+    def plot(self):
+        # Intervals go first, so a stream of records is consumed in a single pass.
         self.plot_intervals()
+        self.plot_time_per_activity()
+
+    def show(self):
+        """ Plot the report and display it. Raises a RuntimeError if the report is drawn on a headless figure."""
+        if self._graphics is None:
+            self._graphics = Graphics(interactive=True)
+        self.plot()
         self.graphics.show()
 
+    def render(self, fmt: str = "png", dpi: Optional[int] = None) -> bytes:
+        """
+        Plot the report and render it without displaying it (see Graphics.render).
+        :return: The encoded image.
+        """
+        self.plot()
+        return self.graphics.render(fmt, dpi)
+
+    def aggregate(self) -> Aggregates:
+        """
+        Compute the totals of the report. This is done only once: later calls return the cached result.
+        """
+        if self._aggregates is None:
+            for _ in self._days():
+                pass
+        return self._aggregates
+
     @property
     def total_secs_per_activity(self) -> dict[int, int]:
         """
         Returns the total amount of seconds spent in a specific activity along the set of days that are registered
         in the report.
         """
-        time_per_activity = dict()
-        for daily_records in self.records.values():
-            for entry in daily_records:
-                time_per_activity[entry[0]] = time_per_activity.get(entry[0], 0) + int(entry[1])
-        return time_per_activity
+        with tracing.span("Report.total_secs_per_activity") as span:
+            secs = self.aggregate().as_dict()
+            if span:
+                span.set(records=int(self.aggregate().counts_per_activity.sum()))
+        return secs
+
+    @property
+    def secs_per_day(self) -> dict[datetime.date, dict[int, int]]:
+        return {date: dict(enumerate(secs.tolist())) for date, secs in self.aggregate().secs_per_day.items()}
+
+    @property
+    def records_per_activity(self) -> dict[int, int]:
+        counts = self.aggregate().counts_per_activity
+        return {activity: count for activity, count in enumerate(counts.tolist()) if count}
+
+    def _days(self) -> Iterable[tuple]:
+        days = self.records.items() if not self.is_stream else self.records
+        if self._aggregates is not None:
+            # Already aggregated: a dictionary can be iterated again, but a stream is exhausted.
+            if self.is_stream:
+                raise RuntimeError("The records of the report were streamed and are already consumed: plot it before "
+                                   "reading its totals, or generate it with stream=False.")
+            return days
+        return self._tally(days)
+
+    def _tally(self, days: Iterable[tuple]) -> Iterator[tuple]:
+        aggregates = Aggregates(len(self.activity_set))
+        for date, daily_records in days:
+            aggregates.add_day(date, daily_records)
+            yield date, daily_records
+        self._aggregates = aggregates
@@ -0,0 +1,110 @@
+import concurrent.futures
+import datetime
+import pathlib
+
+from typing import Optional
+
+from .aggregation import Aggregates
+from .database.csv.manifest import LogEntry
+from .database.registry import DatabaseRegistry
+from .database.storage import load_database
+from .plots import Graphics
+from .report import Report
+
+
+class RollupReport(Report):
+    """
+    Totals of several databases (e.g. one per member of a team) over the same dates, on a shared activity set.
+    It's a Report of the combined totals, built from the per-day summaries of every database, so intervals are not
+    available. The report of every database is kept in `per_database`.
+    """
+
+    def __init__(self, summaries_per_db: dict[str, dict[datetime.date, LogEntry]], activity_set: list[str],
+                 graphics: Optional[Graphics] = None):
+        """
+        :param summaries_per_db: Summaries of every day of every database (see Storage.read_summaries), with their
+                                 activities already mapped onto `activity_set`.
+        :param activity_set: Shared activity labels.
+        """
+        super().__init__(dict(), activity_set, graphics)
+        self.per_database = {name: Report.from_summaries(summaries, activity_set)
+                             for name, summaries in summaries_per_db.items()}
+        self._aggregates = Aggregates(len(activity_set))
+        for summaries in summaries_per_db.values():
+            for date, summary in summaries.items():
+                self._aggregates.add_summary(date, summary.secs_per_activity, summary.records_per_activity)
+
+    @property
+    def secs_per_database(self) -> dict[str, dict[int, int]]:
+        """ Seconds per activity of every database, keyed by the index of the activity in the shared set."""
+        return {name: report.total_secs_per_activity for name, report in self.per_database.items()}
+
+
+def rollup_report(names: list[str], par_dir: pathlib.Path, start_date: datetime.date,
+                  end_date: datetime.date = None, aliases: Optional[dict[str, str]] = None,
+                  max_workers: Optional[int] = None, processes: bool = False,
+                  graphics: Optional[Graphics] = None) -> RollupReport:
+    """
+    Build the combined report of several databases of the same folder, reading them in parallel.
+    :param names: Names of the databases.
+    :param par_dir: Folder of the databases.
+    :param start_date: First date of the report.
+    :param end_date: Last date of the report (included). Defaults to the start date.
+    :param aliases: Labels to merge into another one, e.g. {"dev": "coding"}. Other labels are kept as they are.
+    :param max_workers: Number of databases read at the same time (see concurrent.futures).
+    :param processes: If True, databases are read in worker processes instead of threads.
+    :param graphics: Figure to draw the combined report on (see Report).
+    :raises ValueError: If any of the databases doesn't exist.
+    """
+    entries = DatabaseRegistry(par_dir).entries()
+    missing = [name for name in names if name not in entries]
+    if missing:
+        raise ValueError(f"No database named {', '.join(repr(name) for name in missing)} in {par_dir}.")
+
+    activity_set, mappings = shared_activity_set({name: entries[name].activities for name in names}, aliases)
+    executor_cls = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+    with executor_cls(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(_read_summaries, name, par_dir, start_date, end_date, mappings[name])
+                   for name in names}
+        summaries_per_db = {name: future.result() for name, future in futures.items()}
+    return RollupReport(summaries_per_db, activity_set, graphics)
+
+
+def shared_activity_set(activity_sets: dict[str, list[str]],
+                        aliases: Optional[dict[str, str]] = None) -> tuple[list[str], dict[str, list[int]]]:
+    """
+    Merge the activity sets of several databases: labels are matched by name (after applying the aliases), in
+    order of first appearance.
+    :return: The shared activity set, and the index in it of every activity of every database.
+    """
+    aliases = aliases if aliases else dict()
+    shared: dict[str, int] = dict()
+    mappings = dict()
+    for name, activities in activity_sets.items():
+        labels = [aliases.get(activity, activity) for activity in activities]
+        mappings[name] = [shared.setdefault(label, len(shared)) for label in labels]
+    return list(shared), mappings
+
+
+def _read_summaries(name: str, par_dir: pathlib.Path, start_date: datetime.date, end_date: Optional[datetime.date],
+                    mapping: list[int]) -> dict[datetime.date, LogEntry]:
+    """
+    Worker: read the summaries of a database, with its activities mapped onto the shared activity set.
+    """
+    db = load_database(name, par_dir)
+    try:
+        summaries = db.read_summaries(start_date, end_date)
+    finally:
+        db.close()
+
+    mapped = dict()
+    for date, summary in summaries.items():
+        entry = LogEntry(records=summary.records)
+        for idx, secs in summary.secs_per_activity.items():
+            if 0 <= idx < len(mapping):  # Records without activity (-1) aren't aggregated.
+                entry.secs_per_activity[mapping[idx]] = entry.secs_per_activity.get(mapping[idx], 0) + secs
+        for idx, count in summary.records_per_activity.items():
+            if 0 <= idx < len(mapping):
+                entry.records_per_activity[mapping[idx]] = entry.records_per_activity.get(mapping[idx], 0) + count
+        mapped[date] = entry
+    return mapped
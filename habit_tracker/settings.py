@@ -5,3 +5,15 @@ MODULE_DIR = pathlib.Path(os.path.dirname(os.path.realpath(__file__)))
 PAR_DIR = MODULE_DIR.parent
 DB_DIR = PAR_DIR / 'db'
 LOGS_DIR = PAR_DIR / 'logs'
+DEF_DB_PAR_DIR = pathlib.Path('.db')  # Folder of the databases, relative to the working directory
+
+# Logging (see habit_tracker.config_logger)
+LOG_FILE_NAME = 'output.log'
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Size of the log file that triggers a rotation
+LOG_BACKUP_COUNT = 3  # Rotated files kept: output.log.1 ... output.log.3
+LOG_LEVEL = 'INFO'
+LOG_LEVELS = {  # Per logger levels, overriding LOG_LEVEL. Also set with HABIT_TRACKER_LOG_LEVELS="name=LEVEL,..."
+    'matplotlib': 'WARNING',
+    'PIL': 'WARNING',
+}
+LOG_LEVELS_ENV_VAR = 'HABIT_TRACKER_LOG_LEVELS'
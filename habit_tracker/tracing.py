@@ -0,0 +1,214 @@
+"""
+Lightweight tracing of the hot paths (storage reads, aggregation, rendering, appends). It's off by default, and a
+disabled span costs a function call. When enabled, every span records its wall time, CPU time and counters (e.g.
+records and bytes read), and the run can be dumped as a Chrome trace (chrome://tracing, Perfetto) or as folded
+stacks (flamegraph.pl, speedscope):
+
+    HABIT_TRACKER_TRACE=trace.json python main.py
+    HABIT_TRACKER_TRACE=trace.folded python main.py
+
+    tracer = tracing.enable()
+    ...
+    tracer.dump(pathlib.Path("trace.json"))
+
+Only the last `max_events` spans are kept, so a long-running process traces in bounded memory.
+"""
+import atexit
+import collections
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+
+from typing import Callable, Optional
+
+ENV_VAR = "HABIT_TRACKER_TRACE"
+FOLDED_SUFFIX = ".folded"
+DEF_MAX_EVENTS = 100_000  # About 60 MB of spans
+
+
+class Span:
+    """ A traced stage. Counters are attached with set() or add(), e.g. span.set(records=n, bytes=size)."""
+    __slots__ = ("name", "args", "_tracer", "_start_ns", "_cpu_start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, args: dict):
+        self.name = name
+        self.args = args
+        self._tracer = tracer
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def add(self, **counters: int) -> None:
+        for key, value in counters.items():
+            self.args[key] = self.args.get(key, 0) + value
+
+    def __enter__(self) -> "Span":
+        self._tracer._stack().append(self.name)
+        self._cpu_start_ns = time.thread_time_ns()
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        end_ns = time.perf_counter_ns()
+        cpu_ns = time.thread_time_ns() - self._cpu_start_ns
+        stack = self._tracer._stack()
+        self._tracer._record(self, tuple(stack), end_ns - self._start_ns, cpu_ns)
+        stack.pop()
+        return False
+
+    def __bool__(self) -> bool:
+        return True
+
+
+class _NullSpan:
+    """ Span returned while tracing is disabled: it records nothing. It's falsy, so costly counters can be skipped
+    with `if span: span.set(...)`."""
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def add(self, **counters: int) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        return False
+
+    def __bool__(self) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """ Collects the spans of every thread of the process. Once `max_events` spans are recorded, the oldest ones are
+    dropped (and counted in `dropped`)."""
+
+    def __init__(self, max_events: int = DEF_MAX_EVENTS):
+        self.events: collections.deque[dict] = collections.deque(maxlen=max_events)
+        self.dropped = 0
+        self._origin_ns = time.perf_counter_ns()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **args) -> Span:
+        return Span(self, name, args)
+
+    def chrome_trace(self) -> dict:
+        """
+        :return: The spans as Chrome trace events ("X" complete events, times in microseconds).
+        """
+        pid = os.getpid()
+        events = [{"name": event["name"], "cat": event["name"].split(".")[0], "ph": "X", "pid": pid,
+                   "tid": event["tid"], "ts": event["start_ns"] / 1000, "dur": event["wall_ns"] / 1000,
+                   "args": {"cpu_ms": event["cpu_ns"] / 1e6, **event["args"]}}
+                  for event in self._snapshot()]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"dropped_events": self.dropped}}
+
+    def folded(self) -> list[str]:
+        """
+        :return: The wall time spent in every stack of spans, excluding the time in nested spans, as "a;b;c <us>"
+                 lines.
+        """
+        totals, nested = dict(), dict()
+        for event in self._snapshot():
+            stack = event["stack"]
+            totals[stack] = totals.get(stack, 0) + event["wall_ns"]
+            if len(stack) > 1:
+                nested[stack[:-1]] = nested.get(stack[:-1], 0) + event["wall_ns"]
+        return [f"{';'.join(stack)} {(wall_ns - nested.get(stack, 0)) // 1000}"
+                for stack, wall_ns in sorted(totals.items())]
+
+    def dump(self, file: pathlib.Path) -> None:
+        """ Write the spans as folded stacks if the file ends with .folded, or as a Chrome trace elsewhere."""
+        if file.suffix == FOLDED_SUFFIX:
+            file.write_text("\n".join(self.folded()) + "\n")
+        else:
+            file.write_text(json.dumps(self.chrome_trace()))
+
+    def _snapshot(self) -> list[dict]:
+        """ Copy of the events, as other threads may be recording spans meanwhile."""
+        with self._lock:
+            return list(self.events)
+
+    def _stack(self) -> list[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span: Span, stack: tuple, wall_ns: int, cpu_ns: int) -> None:
+        event = {"name": span.name, "stack": stack, "tid": threading.get_ident(),
+                 "start_ns": span._start_ns - self._origin_ns, "wall_ns": wall_ns, "cpu_ns": cpu_ns,
+                 "args": span.args}
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(max_events: int = DEF_MAX_EVENTS) -> Tracer:
+    """ Start tracing, or keep tracing if it's already enabled."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(max_events)
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """
+    Stop tracing.
+    :return: The tracer with the spans recorded so far, if tracing was enabled.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def current() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **args):
+    """ Context manager tracing a stage: a Span if tracing is enabled, a no-op elsewhere."""
+    tracer = _tracer
+    return _NULL_SPAN if tracer is None else tracer.span(name, **args)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """ Decorator tracing every call of a function, named after its qualified name by default."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name if name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_from_env() -> Optional[Tracer]:
+    """
+    Enable tracing if the HABIT_TRACKER_TRACE environment variable is set, and dump the trace to the file it
+    names when the program exits.
+    """
+    file = os.environ.get(ENV_VAR)
+    if not file:
+        return None
+    tracer = enable()
+    atexit.register(tracer.dump, pathlib.Path(file))
+    return tracer
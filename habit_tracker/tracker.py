@@ -1,31 +1,38 @@
 import datetime
 import time
 
-from dataclasses import dataclass, asdict
 from typing import Optional
 
-from .database.csv.database import CSVDatabase
+from . import tracing
+from .database.appender import BufferedAppender
+from .database.storage import Storage
+from .plots import Graphics
+from .records import Record
 from .report import Report
 
-
-@dataclass
-class Record:
-    activity: int
-    interval_seconds: int
-    seconds_from_start: int
-
-    def values(self) -> list:
-        return [str(val) for val in asdict(self).values()]
+PERIOD_STARTS = {
+    "week": lambda date: date - datetime.timedelta(days=date.weekday()),
+    "month": lambda date: date.replace(day=1),
+    "year": lambda date: date.replace(month=1, day=1),
+    "30days": lambda date: date - datetime.timedelta(days=29),
+}
 
 
 class Tracker:
     """
     Tracks user daily habits and stores them to a database.
     """
-    # TODO make constructor generic to other types of database
-    def __init__(self, db: CSVDatabase, date: datetime.date = datetime.date.today()):
+    def __init__(self, db: Storage, date: datetime.date = datetime.date.today(),
+                 appender: Optional[BufferedAppender] = None):
+        """
+        :param db: Database of the records.
+        :param date: Date of the records.
+        :param appender: Append path of the database, to buffer records added at a high rate. By default, every
+                         record is written as soon as it's added.
+        """
         self._db = db
         self._date = date
+        self._appender = appender if appender else BufferedAppender(db)
 
         self._current_activity_idx: int = -1
         self._seconds_from_base_date: int = 0
@@ -33,6 +40,7 @@ class Tracker:
         self._interval_seconds: int = 0
         self._record: Optional[Record] = None
         self._is_tracking: bool = False
+        self._checkpointed: bool = False  # Whether the current interval is already in the database
 
     def start(self, activity_idx: int) -> None:
         self._current_activity_idx = activity_idx
@@ -43,10 +51,12 @@ class Tracker:
 
         self._interval_start = time.time()
         self._is_tracking = True
+        self._checkpointed = False
 
-    def stop(self) -> None:
+    def stop(self, flush: bool = True) -> None:
         """
         Stop tracking current activity.
+        :param flush: If False, the record is left to the flush policy of the appender (see BufferedAppender).
         :return: None
         """
         if self._is_tracking:
@@ -56,7 +66,28 @@ class Tracker:
             self._interval_seconds = 0
 
         record = Record(self._current_activity_idx, self._interval_seconds, self._seconds_from_base_date)
-        self.add_record(record)
+        if self._checkpointed:
+            self._checkpointed = False
+            self._write_checkpoint(record)  # Completes the record of the last checkpoint.
+        else:
+            self.add_record(record)
+        if flush:
+            self._appender.flush()
+
+    def checkpoint(self) -> int:
+        """
+        Write the current interval as tracked so far, while it's still tracked. Every checkpoint replaces the record
+        of the previous one, and stop() completes it, so an interval is always a single record. A crash then loses
+        at most the time since the last checkpoint.
+        :return: Seconds of the interval written, 0 if not tracking.
+        """
+        if not self._is_tracking:
+            return 0
+        elapsed = int(time.time() - self._interval_start)
+        if elapsed > 0:
+            self._write_checkpoint(Record(self._current_activity_idx, elapsed, self._seconds_from_base_date))
+            self._checkpointed = True
+        return elapsed
 
     def add_record(self, record: Record) -> bool:
         """
@@ -66,19 +97,81 @@ class Tracker:
         if self._is_tracking:
             return False
         else:
-            self._db.update_log(self._date, record.values())
+            with tracing.span("Tracker.add_record"):
+                self._appender.add(self._date, record)
             return True
 
-    def generate_report(self, start_date: str, end_date: str = None) -> Report:
+    @tracing.traced("Tracker.generate_report")
+    def generate_report(self, start_date: str, end_date: str = None, stream: bool = False,
+                        totals_only: bool = False, graphics: Optional[Graphics] = None) -> Report:
+        """
+        :param start_date: First date of the report ("dd-mm-yyyy"), or "today".
+        :param end_date: Last date of the report ("dd-mm-yyyy"). Defaults to the start date.
+        :param stream: If True, records are read lazily while the report is computed, instead of loading the
+                       whole interval first.
+        :param totals_only: If True, the report is built from the per-day summaries of the database, without
+                            reading any record. Intervals can't be plotted then.
+        :param graphics: Figure to draw the report on, so it can be reused across reports (see Graphics).
+        """
+        self._appender.flush()  # So the report includes every record added so far.
         if start_date == 'today':
-            records = self._db.read_interval(self._date)
-
+            start_date, end_date = self._date, None
         else:
             start_date = datetime.datetime.strptime(start_date, "%d-%m-%Y").date()
             end_date = datetime.datetime.strptime(end_date, "%d-%m-%Y").date() if end_date else None
+
+        if totals_only:
+            return Report.from_summaries(self._db.read_summaries(start_date, end_date),
+                                         activity_set=self._db.metadata.activities, graphics=graphics)
+        if stream:
+            records = self._db.iter_records(start_date, end_date)
+        else:
             records = self._db.read_interval(start_date, end_date)
 
-        return Report(records, activity_set=self._db.metadata.activities)
+        return Report(records, activity_set=self._db.metadata.activities, graphics=graphics)
+
+    def totals_to_date(self, period: str) -> dict[int, int]:
+        """
+        Seconds per activity for a period ending at the tracker date, read from the range index of the database.
+        :param period: One of "week" (week to date), "month" (month to date), "year" (year to date) or "30days"
+                       (rolling 30 days).
+        :return: Seconds of every activity with any time in the period, keyed by activity index.
+        """
+        if period not in PERIOD_STARTS:
+            raise ValueError(f"Unknown period '{period}'. Choose one of: {', '.join(PERIOD_STARTS)}.")
+        self._appender.flush()
+        return self._db.secs_between(PERIOD_STARTS[period](self._date), self._date)
+
+    def flush(self) -> None:
+        """ Write the buffered records."""
+        self._appender.flush()
+
+    def close(self) -> None:
+        """ Write the buffered records and release the open files of the database."""
+        self._appender.close()
+        self._db.close()
+
+    def _write_checkpoint(self, record: Record) -> None:
+        self._appender.flush()  # Buffered records go first, so the day log stays in order.
+        self._db.upsert_record(self._date, record)
+
+    @property
+    def is_tracking(self) -> bool:
+        return self._is_tracking
+
+    @property
+    def elapsed_seconds(self) -> int:
+        """ Seconds since the current activity started (0 if not tracking)."""
+        return int(time.time() - self._interval_start) if self._is_tracking else 0
+
+    @property
+    def current_activity(self) -> int:
+        """ Index of the activity being tracked, or of the last one (-1 if none)."""
+        return self._current_activity_idx
+
+    @property
+    def date(self) -> datetime.date:
+        return self._date
 
     @property
     def activity_set(self):
@@ -25,6 +25,7 @@ class CliView(View):
         logger.debug("VIEW: Command line interface")
         super().__init__()
         self.console = Console(force_terminal=True)
+        self._status = None  # Shown by wait_input
 
     def options_menu(self, message: str, options: list) -> Optional[str]:
         logger.info("Printing list of options.")
@@ -43,17 +44,22 @@ class CliView(View):
         print(f"Currently doing -> [bold italic green]{selection}[/bold italic green]")
 
     def invalid_input(self, user_input: Any) -> None:
-        logger.info(f'Invalid user input: {user_input}.')
+        logger.info("Invalid user input: %s.", user_input)
         print(f'Input "{user_input}" is not valid. Try again.')
 
     def wait_input(self, message: str, expected_key: str) -> None:
         logger.info('Waiting for user input to end wait loop.')
 
-        with self.console.status("Press enter to finish", spinner="simpleDots"):
+        with self.console.status("Press enter to finish", spinner="simpleDots") as self._status:
             input()
+        self._status = None
 
         logger.info('Exit from wait loop.')
 
+    def update_status(self, message: str) -> None:
+        if self._status is not None:
+            self._status.update(f"{message} - Press enter to finish")
+
     def get_list(self, message: str) -> list[str]:
         print(message)
         print("(Press 'q' to finish)")
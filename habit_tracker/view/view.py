@@ -24,3 +24,7 @@ class View(ABC):
     @abstractmethod
     def invalid_input(self, user_input: str) -> None:
         pass
+
+    def update_status(self, message: str) -> None:
+        """ Refresh the status shown while waiting for input (see wait_input). Views without one ignore it."""
+        pass
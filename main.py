@@ -1,16 +1,17 @@
 from habit_tracker.view.cli import CliView
-from habit_tracker.controller import Controller
-from habit_tracker import config_logger
+from habit_tracker.controller import AsyncController
+from habit_tracker import config_logger, tracing
 import logging
 
 logger = logging.getLogger(__name__)
 
 if __name__ == '__main__':
     config_logger()
+    tracing.configure_from_env()
 
     logger.debug("Initializing program.")
 
     view = CliView()
-    controller = Controller(view)
+    controller = AsyncController(view)
 
     controller.run()
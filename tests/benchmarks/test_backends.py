@@ -0,0 +1,32 @@
+import json
+
+from benchmarks import backends
+from benchmarks.workload import Workload, generate
+
+
+class TestBackendsBenchmark:
+
+    def test_timed(self):
+        # GIVEN operations returning the number of records they handled
+        # WHEN timing them
+        records, latencies = backends.timed([lambda: 2, lambda: 3])
+
+        # THEN the records are summed, and every operation has its latency
+        assert records == 5
+        assert len(latencies) == 2 and all(latency >= 0 for latency in latencies)
+
+    def test_run_every_backend(self, tmp_path):
+        # GIVEN a tiny workload
+        # WHEN running the benchmark against every backend
+        backends.main(["--years", "0.03", "--records-per-day", "3", "3", "--reads", "2",
+                       "--json", str(tmp_path / "out.json")])
+
+        # THEN every workload is measured for every backend, and every backend stored the same generated records
+        results = json.loads((tmp_path / "out.json").read_text())
+        assert {result["backend"] for result in results} == set(backends.BACKENDS)
+        n_records = sum(map(len, generate(Workload(years=0.03, records_per_day=(3, 3))).values()))
+        for workload in ("append", "append_batch"):
+            appended = [result["records"] for result in results if result["workload"] == workload]
+            assert appended == [n_records] * len(backends.BACKENDS)
+        reads = {(result["backend"], result["workload"]): result["records"] for result in results}
+        assert reads[("csv", "read_year")] == reads[("sqlite", "read_year")]
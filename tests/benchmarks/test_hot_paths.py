@@ -0,0 +1,28 @@
+import json
+
+from benchmarks import hot_paths
+
+
+class TestHotPathsBenchmark:
+
+    def test_run_and_compare(self, tmp_path, capsys):
+        # GIVEN a tiny workload, run once
+        args = ["--years", "0.05", "--reads", "2", "--appends", "20", "--backends", "csv", "sqlite"]
+        hot_paths.main(args + ["--json", str(tmp_path / "before.json")])
+
+        # WHEN running it again, compared with the first run
+        report = hot_paths.main(args + ["--json", str(tmp_path / "after.json"), "--compare",
+                                        str(tmp_path / "before.json")])
+
+        # THEN every hot path is measured for every backend
+        workloads = {(result["backend"], result["workload"]) for result in report["results"]}
+        for backend in ("csv", "sqlite"):
+            assert {(backend, "add_record"), (backend, "add_record_buffered"), (backend, "read_year"),
+                    (backend, "totals_month"), (backend, "workday_week")} <= workloads
+
+        # AND the results are stored with what they depend on, and compared with the previous run
+        stored = json.loads((tmp_path / "after.json").read_text())
+        assert stored["run"]["workload"]["years"] == 0.05
+        assert stored["run"]["workload"] == json.loads((tmp_path / "before.json").read_text())["run"]["workload"]
+        assert "Compared with" in capsys.readouterr().out
+        assert len(hot_paths.compare(stored["results"], stored["results"])) == len(stored["results"])
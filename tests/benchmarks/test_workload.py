@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+
+from benchmarks.workload import Workload, fill, generate
+from habit_tracker.database.storage import create_database
+
+
+class TestWorkload:
+
+    def test_generate_is_deterministic(self):
+        assert generate(Workload(years=0.1, seed=1)) == generate(Workload(years=0.1, seed=1))
+        assert generate(Workload(years=0.1, seed=1)) != generate(Workload(years=0.1, seed=2))
+
+    def test_generate_shape(self):
+        # GIVEN a two years workload
+        workload = Workload(years=2, records_per_day=(5, 30))
+
+        # WHEN generating its records
+        days = generate(workload)
+
+        # THEN some days have no records, mostly at weekends
+        dates = [workload.first_date + datetime.timedelta(days=n) for n in range(workload.n_days)]
+        empty = [date for date in dates if date not in days]
+        assert 0 < len(empty) < len(dates) / 2
+        assert sum(date.weekday() >= 5 for date in empty) > len(empty) / 2
+
+        # AND every day holds non-overlapping intervals of known activities, within the day
+        for records in days.values():
+            assert 1 <= len(records) <= 30
+            assert set(records.activity.tolist()) <= set(range(len(workload.activities)))
+            ends = records.seconds_from_start.astype(np.int64) + records.interval_seconds
+            assert np.all(records.seconds_from_start[1:] >= ends[:-1])
+            assert ends.max() <= 24 * 3600
+
+        # AND the activity mix follows the weights
+        activities = np.concatenate([records.activity for records in days.values()])
+        mix = np.bincount(activities) / len(activities)
+        assert abs(mix[0] - 0.45) < 0.05
+
+    def test_fill(self, tmp_path):
+        days = generate(Workload(years=0.1))
+        db = create_database("name", Workload().activities, tmp_path)
+
+        assert fill(db, days) == sum(map(len, days.values()))
+        stored = db.read_interval(min(days), max(days))
+        assert {date: records.tolist() for date, records in stored.items() if len(records)} == \
+            {date: records.tolist() for date, records in days.items()}
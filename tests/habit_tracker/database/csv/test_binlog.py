@@ -0,0 +1,63 @@
+import datetime
+import pytest
+
+from habit_tracker.database.csv.binlog import BinaryLog
+from habit_tracker.database.csv.log import CSVLog
+from habit_tracker.records import RECORD_DTYPE, RecordBatch
+
+
+@pytest.fixture()
+def binary_log(tmp_path):
+    sample_date = datetime.date(1999, 2, 19)
+    return BinaryLog(sample_date, tmp_path)
+
+
+class TestBinaryLog:
+
+    def test_same_tree_as_csv_log(self, binary_log, tmp_path):
+        # GIVEN a binary log and a CSV log for the same date
+        csv_log = CSVLog(binary_log.date, tmp_path)
+
+        # THEN both files live in the same folder, with different extensions
+        assert binary_log._file.parent == csv_log._file.parent
+        assert binary_log._file.suffix == ".bin"
+
+    def test_read_empty_log(self, binary_log):
+        # GIVEN a binary log that has not been written yet
+        # THEN reading it returns no rows
+        assert len(binary_log.read()) == 0
+
+    def test_load_zero_length_log(self, binary_log):
+        # GIVEN a binary log file that exists but holds no record
+        binary_log.create()
+
+        # THEN it's read as an empty batch
+        assert len(binary_log.load_batch()) == 0
+        assert list(binary_log.iter_rows()) == []
+
+    def test_update_multiple_rows(self, binary_log):
+        # GIVEN a binary log
+        # WHEN appending two records
+        binary_log.update(0, 3600, 32400)
+        binary_log.update("2", "1200", "36000")
+
+        # THEN the file holds 12 bytes per record
+        assert binary_log._file.stat().st_size == 2 * RECORD_DTYPE.itemsize
+
+        # AND the records are read back as integers without parsing
+        rows = binary_log.read()
+        assert rows["activity"].tolist() == [0, 2]
+        assert rows["interval_seconds"].tolist() == [3600, 1200]
+        assert rows["seconds_from_start"].tolist() == [32400, 36000]
+
+    def test_append_batch(self, binary_log):
+        # GIVEN a binary log
+        # WHEN appending a batch of records
+        batch = RecordBatch.from_rows([[0, 10, 100], [1, 20, 200]])
+        size = binary_log.append(batch)
+
+        # THEN the size of the file is returned
+        assert size == batch.nbytes
+
+        # AND the batch is read back as is
+        assert binary_log.read_batch() == batch
@@ -1,9 +1,11 @@
 import datetime
 import pytest
 
-from habit_tracker.database.csv.log import CSVLog
+from habit_tracker.database.appender import BufferedAppender
+from habit_tracker.database.csv import manifest
 from habit_tracker.database.csv.database import CSVDatabase
 from habit_tracker.database.csv.metadata import DBMetadata
+from habit_tracker.records import Record, RecordBatch
 
 
 @pytest.fixture()
@@ -52,15 +54,14 @@ class TestCSBDatabase:
         # GIVEN a CSV database
         # AND a CSV log with some sample data
         date = datetime.date(2023, 1, 1)
-        sample_data = ["sample_activity1", "1", "12:30"]
-        csv_log1 = CSVLog(date, base_dir=sample_db.metadata.db_path)
-        csv_log1.update(*sample_data)
+        sample_data = Record(activity=0, interval_seconds=1, seconds_from_start=45000)
+        sample_db.update_log(date, sample_data)
 
         # WHEN reading the log related to that date from the database
         interval_records = sample_db.read_interval(start_date=date)
 
         # THEN the database retrieves the records from that log in a dictionary
-        assert interval_records[date] == [sample_data]
+        assert interval_records[date] == RecordBatch.from_records([sample_data])
 
     def test_read_interval_read_single_log_is_empty(self, sample_db):
         # GIVEN a CSV database with no logs
@@ -71,7 +72,7 @@ class TestCSBDatabase:
         interval_records = sample_db.read_interval(start_date=date)
 
         # THEN the database retrieves an empty record in a dictionary
-        assert interval_records[date] == []
+        assert len(interval_records[date]) == 0
 
     def test_read_interval_existing_interval(self, sample_db):
         # GIVEN a CSV database
@@ -80,25 +81,21 @@ class TestCSBDatabase:
         date2 = date1 + datetime.timedelta(days=1)
         date3 = date2 + datetime.timedelta(days=1)
 
-        sample_data1 = ["sample_activity1", "1", "12:30"]
-        sample_data2 = ["sample_activity2", "2", "12:45"]
-        sample_data3 = ["sample_activity3", "3", "12:50"]
+        sample_data1 = Record(activity=0, interval_seconds=1, seconds_from_start=45000)
+        sample_data2 = Record(activity=1, interval_seconds=2, seconds_from_start=45900)
+        sample_data3 = Record(activity=2, interval_seconds=3, seconds_from_start=46200)
 
-        csv_log1 = CSVLog(date1, base_dir=sample_db.metadata.db_path)
-        csv_log2 = CSVLog(date2, base_dir=sample_db.metadata.db_path)
-        csv_log3 = CSVLog(date3, base_dir=sample_db.metadata.db_path)
-
-        csv_log1.update(*sample_data1)
-        csv_log2.update(*sample_data2)
-        csv_log3.update(*sample_data3)
+        sample_db.update_log(date1, sample_data1)
+        sample_db.update_log(date2, sample_data2)
+        sample_db.update_log(date3, sample_data3)
 
         # WHEN reading the logs related to those dates from the database
         interval_records = sample_db.read_interval(date1, date3)
 
         # THEN the database retrieves the records from each log in a dictionary
-        assert interval_records[date1] == [sample_data1]
-        assert interval_records[date2] == [sample_data2]
-        assert interval_records[date3] == [sample_data3]
+        assert interval_records[date1] == RecordBatch.from_records([sample_data1])
+        assert interval_records[date2] == RecordBatch.from_records([sample_data2])
+        assert interval_records[date3] == RecordBatch.from_records([sample_data3])
 
     def test_read_interval_some_existing_others_not(self, sample_db):
         # GIVEN a CSV database
@@ -107,22 +104,19 @@ class TestCSBDatabase:
         date2 = date1 + datetime.timedelta(days=1)
         date3 = date2 + datetime.timedelta(days=1)
 
-        sample_data1 = ["sample_activity1", "1", "12:30"]
-        sample_data3 = ["sample_activity3", "3", "12:50"]
-
-        csv_log1 = CSVLog(date1, base_dir=sample_db.metadata.db_path)
-        csv_log3 = CSVLog(date3, base_dir=sample_db.metadata.db_path)
+        sample_data1 = Record(activity=0, interval_seconds=1, seconds_from_start=45000)
+        sample_data3 = Record(activity=2, interval_seconds=3, seconds_from_start=46200)
 
-        csv_log1.update(*sample_data1)
-        csv_log3.update(*sample_data3)
+        sample_db.update_log(date1, sample_data1)
+        sample_db.update_log(date3, sample_data3)
 
         # WHEN reading the logs related to those dates from the database
         interval_records = sample_db.read_interval(date1, date3)
 
         # THEN the database retrieves the records from each log in a dictionary as expected
-        assert interval_records[date1] == [sample_data1]
-        assert interval_records[date2] == []
-        assert interval_records[date3] == [sample_data3]
+        assert interval_records[date1] == RecordBatch.from_records([sample_data1])
+        assert len(interval_records[date2]) == 0
+        assert interval_records[date3] == RecordBatch.from_records([sample_data3])
 
     def test_read_interval_not_valid_dates(self, sample_db):
         # GIVEN a CSV database
@@ -136,3 +130,237 @@ class TestCSBDatabase:
 
         # THEN the database retrieves an empty dictionary and raises a warning.
             assert len(interval_records) == 0
+
+    def test_binary_log_format(self, tmp_path):
+        # GIVEN a database that stores its logs in binary format
+        db = CSVDatabase.create("binary", ["a", "bb", "ccc"], tmp_path, log_format="binary")
+        date = datetime.date(2023, 1, 1)
+
+        # WHEN updating a log and loading the database again
+        db.update_log(date, Record(1, 3600, 32400))
+        db = CSVDatabase.load_from_name("binary", tmp_path)
+
+        # THEN the format is kept in the metadata and the record is read back as integers
+        assert db.metadata.log_format == "binary"
+        assert db.read_interval(date)[date].tolist() == [[1, 3600, 32400]]
+
+    @pytest.mark.parametrize("log_format", ["csv", "binary"])
+    def test_update_log_empty_batch(self, tmp_path, log_format):
+        # GIVEN a database
+        db = CSVDatabase.create("empty", ["a"], tmp_path, log_format=log_format)
+        date = datetime.date(2023, 1, 1)
+
+        # WHEN appending an empty batch of records, directly and through an appender
+        db.update_log(date, RecordBatch())
+        BufferedAppender(db).add(date, RecordBatch())
+
+        # THEN nothing is written, and the date reads as empty, also after loading the database again
+        assert date not in db.manifest.logs
+        assert not db._log(date).exists()
+        db = CSVDatabase.load_from_name("empty", tmp_path)
+        assert len(db.read_log(date)) == 0
+        assert list(db.iter_records(date)) == []
+        assert len(db.read_interval(date)[date]) == 0
+
+    def test_unknown_log_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            CSVDatabase.create("name", ["a"], tmp_path, log_format="parquet")
+
+    def test_convert_logs_to_binary_and_back(self, sample_db):
+        # GIVEN a CSV database with some logs
+        date1 = datetime.date(2023, 1, 31)
+        date2 = datetime.date(2023, 2, 1)
+        sample_db.update_log(date1, Record(0, 10, 100))
+        sample_db.update_log(date2, Record(1, 20, 200))
+        sample_db.update_log(date2, Record(2, 30, 300))
+
+        # WHEN converting the logs to binary format
+        sample_db.convert_logs("binary")
+
+        # THEN no CSV file is left and the records are the same
+        assert not list(sample_db.metadata.db_path.rglob("*.csv"))
+        assert sample_db.read_log(date2).interval_seconds.tolist() == [20, 30]
+
+        # AND converting back restores the readable CSV logs
+        sample_db.convert_logs("csv")
+        assert sample_db.read_log(date1).tolist() == [[0, 10, 100]]
+        assert sample_db.read_log(date2).tolist() == [[1, 20, 200], [2, 30, 300]]
+
+    def test_compact_closed_months(self, sample_db):
+        # GIVEN a database with logs in a closed month and in the current one
+        closed_date1 = datetime.date(2023, 1, 2)
+        closed_date2 = datetime.date(2023, 1, 30)
+        current_date = datetime.date(2023, 2, 5)
+        sample_db.update_log(closed_date1, Record(0, 10, 100))
+        sample_db.update_log(closed_date2, Record(1, 20, 200))
+        sample_db.update_log(current_date, Record(2, 30, 300))
+
+        # WHEN compacting the database
+        sealed = sample_db.compact(today=current_date)
+
+        # THEN only the closed month is sealed, and its loose logs are gone
+        assert sealed == [datetime.date(2023, 1, 1)]
+        january_dir = sample_db.metadata.db_path / "2023" / "01"
+        assert [p.name for p in january_dir.iterdir()] == ["segment.bin"]
+        assert sample_db.read_log(current_date).tolist() == [[2, 30, 300]]
+
+        # AND range reads return the same records as before
+        records = sample_db.read_interval(closed_date1, current_date)
+        assert len(records) == (current_date - closed_date1).days + 1
+        assert records[closed_date1].interval_seconds.tolist() == [10]
+        assert records[closed_date2].interval_seconds.tolist() == [20]
+        assert len(records[datetime.date(2023, 1, 3)]) == 0
+        assert records[current_date].tolist() == [[2, 30, 300]]
+
+    def test_update_and_delete_sealed_month(self, sample_db):
+        # GIVEN a database with a sealed month
+        date = datetime.date(2023, 1, 2)
+        sample_db.update_log(date, Record(0, 10, 100))
+        sample_db.compact(today=datetime.date(2023, 2, 1))
+
+        # WHEN appending a record to a sealed day
+        sample_db.update_log(date, Record(1, 20, 200))
+
+        # THEN the segment holds both records
+        assert sample_db.read_log(date).activity.tolist() == [0, 1]
+
+        # AND deleting the day removes the segment once it is empty
+        sample_db.delete_log(date)
+        assert len(sample_db.read_log(date)) == 0
+        assert not (sample_db.metadata.db_path / "2023" / "01" / "segment.bin").exists()
+
+    def test_manifest_tracks_updates_and_deletes(self, sample_db):
+        # GIVEN a database with two records on the same day
+        date = datetime.date(2023, 1, 1)
+        sample_db.update_log(date, Record(0, 10, 100))
+        sample_db.update_log(date, Record(1, 20, 200))
+
+        # THEN the manifest lists the day with its record count and log size, and is saved to disk
+        entry = sample_db.manifest.logs[date]
+        assert entry.records == 2
+        assert entry.size == sample_db._log(date).file.stat().st_size
+        reloaded = CSVDatabase.load_from_name(sample_db.name, sample_db.metadata.par_dir)
+        assert reloaded.manifest.logs[date] == entry
+
+        # AND deleting the log removes it from the manifest
+        sample_db.delete_log(date)
+        assert date not in sample_db.manifest.logs
+
+    def test_manifest_appends_journal(self, sample_db, monkeypatch):
+        # GIVEN a database with a long history in its manifest
+        monkeypatch.setattr(manifest, "MIN_JOURNAL_ENTRIES", 5)
+        manifest_file = sample_db.metadata.manifest_file
+        for day in range(10):
+            sample_db.update_log(datetime.date(2022, 1, 1) + datetime.timedelta(days=day), Record(0, 10, 100))
+        sample_db.manifest.save(manifest_file)
+        snapshot = manifest_file.read_bytes()
+
+        # WHEN appending records and deleting a day
+        date = datetime.date(2023, 1, 1)
+        sample_db.update_log(date, Record(0, 10, 100))
+        sample_db.update_log(date, Record(1, 20, 200))
+        sample_db.delete_log(datetime.date(2022, 1, 1))
+
+        # THEN only the changed days are appended to the journal, and the snapshot isn't rewritten
+        assert manifest_file.read_bytes() == snapshot
+        assert len(manifest.DBManifest.journal_file(manifest_file).read_text().splitlines()) == 3
+
+        # AND a reloaded database replays the journal, ignoring a line cut by a crash
+        with open(manifest.DBManifest.journal_file(manifest_file), "a") as f:
+            f.write('{"date": "2023-01-0')
+        reloaded = CSVDatabase.load_from_name(sample_db.name, sample_db.metadata.par_dir)
+        assert reloaded.manifest.logs == sample_db.manifest.logs
+        assert reloaded.manifest.logs[date].records == 2
+
+        # AND the journal is folded into the snapshot once it grows as large as it
+        for day in range(10):
+            sample_db.update_log(date + datetime.timedelta(days=day), Record(0, 10, 100))
+        assert manifest_file.read_bytes() != snapshot
+        reloaded = CSVDatabase.load_from_name(sample_db.name, sample_db.metadata.par_dir)
+        assert reloaded.manifest.logs == sample_db.manifest.logs
+
+    def test_read_interval_skips_dates_not_in_manifest(self, sample_db):
+        # GIVEN a log written outside the database API
+        date = datetime.date(2023, 1, 1)
+        sample_db._log(date).update(0, 10, 100)
+
+        # WHEN reading the interval
+        # THEN the date is not probed on disk
+        assert len(sample_db.read_interval(date)[date]) == 0
+
+        # AND it is found once the manifest is rebuilt
+        sample_db.rebuild_manifest()
+        assert sample_db.read_interval(date)[date].tolist() == [[0, 10, 100]]
+
+    def test_manifest_rebuilt_for_legacy_database(self, sample_db):
+        # GIVEN a database without manifest, as created by previous versions
+        date = datetime.date(2023, 1, 1)
+        sample_db.update_log(date, Record(0, 10, 100))
+        sample_db.metadata.manifest_file.unlink()
+
+        # WHEN loading it again
+        db = CSVDatabase.load_from_name(sample_db.name, sample_db.metadata.par_dir)
+
+        # THEN the manifest is rebuilt from the database tree
+        assert db.read_log(date).tolist() == [[0, 10, 100]]
+        assert db.metadata.manifest_file.is_file()
+
+    def test_iter_records_yields_days_in_order(self, sample_db):
+        # GIVEN a database with logs in a sealed month and in the current one
+        date1 = datetime.date(2023, 1, 31)
+        date2 = datetime.date(2023, 2, 2)
+        sample_db.update_log(date2, Record(1, 20, 200))
+        sample_db.update_log(date1, Record(0, 10, 100))
+        sample_db.compact(today=date2)
+
+        # WHEN iterating over the records of the interval
+        records = sample_db.iter_records(datetime.date(2023, 1, 1), datetime.date(2023, 2, 28))
+
+        # THEN a lazy iterator is obtained
+        assert not isinstance(records, (list, dict))
+
+        # AND it yields only the days with data, in date order
+        days = list(records)
+        assert [date for date, _ in days] == [date1, date2]
+        assert days[0][1].interval_seconds.tolist() == [10]
+        assert days[1][1].tolist() == [[1, 20, 200]]
+
+    def test_summaries_updated_on_append(self, sample_db):
+        # GIVEN a database
+        date = datetime.date(2023, 1, 1)
+
+        # WHEN appending records in several updates
+        sample_db.update_log(date, Record(0, 10, 1000))
+        sample_db.update_log(date, RecordBatch.from_rows([[2, 30, 500], [0, 5, 2000]]))
+
+        # THEN the summary of the day is kept up to date
+        summary = sample_db.read_summaries(date)[date]
+        assert summary.records == 3
+        assert summary.secs_per_activity == {0: 15, 2: 30}
+        assert summary.records_per_activity == {0: 2, 2: 1}
+        assert summary.first_start == 500
+        assert summary.last_end == 2005
+
+        # AND it is kept when the month is sealed or the manifest is rebuilt
+        sample_db.compact(today=datetime.date(2023, 2, 1))
+        assert sample_db.read_summaries(date)[date] == summary
+        assert sample_db.rebuild_manifest().logs[date] == summary
+
+    def test_secs_between(self, sample_db):
+        # GIVEN a database with records on several days
+        sample_db.update_log(datetime.date(2023, 1, 1), Record(0, 10, 100))
+        sample_db.update_log(datetime.date(2023, 1, 20), RecordBatch.from_rows([[1, 20, 100], [0, 5, 200]]))
+        sample_db.update_log(datetime.date(2023, 2, 1), Record(2, 30, 100))
+
+        # THEN totals for any range are answered by the range index
+        assert sample_db.secs_between(datetime.date(2023, 1, 1), datetime.date(2023, 1, 31)) == {0: 15, 1: 20}
+        assert sample_db.secs_between(datetime.date(2023, 1, 2), datetime.date(2023, 12, 31)) == {0: 5, 1: 20, 2: 30}
+
+        # AND deleting a log removes its seconds from the index
+        sample_db.delete_log(datetime.date(2023, 1, 20))
+        assert sample_db.secs_between(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31)) == {0: 10, 2: 30}
+
+        # AND the index can be rebuilt from the manifest
+        sample_db.metadata.range_index_file.unlink()
+        db = CSVDatabase.load_from_name(sample_db.name, sample_db.metadata.par_dir)
+        assert db.secs_between(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31)) == {0: 10, 2: 30}
@@ -0,0 +1,88 @@
+import datetime
+import os
+import pytest
+
+from habit_tracker.database.csv import layout_migration
+from habit_tracker.database.csv.database import CSVDatabase
+from habit_tracker.database.csv.layout_migration import main, migrate_layout
+from habit_tracker.database.csv.log import LAYOUT_V1, LAYOUT_V2
+from habit_tracker.records import Record
+
+DATES = [datetime.date(2023, 4, 28) + datetime.timedelta(days=n) for n in range(40)]
+
+
+@pytest.fixture()
+def v1_db(tmp_path):
+    """ Database in the year/month/week/weekday layout, with a log per day and a sealed month."""
+    db = CSVDatabase.create("name", ["a", "bb", "ccc"], tmp_path)
+    db.metadata.layout = LAYOUT_V1
+    db.save_metadata()
+    for n, date in enumerate(DATES):
+        db.update_log(date, Record(n % 3, n + 1, n))
+    db.compact(today=datetime.date(2023, 5, 1))  # April is sealed into a segment
+    db.close()
+    return db
+
+
+def read_all(db):
+    return {date: records.tolist() for date, records in db.iter_records(DATES[0], DATES[-1])}
+
+
+class TestLayoutMigration:
+
+    def test_migrate(self, v1_db, tmp_path):
+        # GIVEN a layout 1 database
+        expected = read_all(v1_db)
+
+        # WHEN migrating it
+        moved = migrate_layout(v1_db)
+
+        # THEN every loose log is moved to year/month/day, and no week folder is left
+        assert moved == 37
+        may = v1_db.metadata.db_path / "2023" / "05"
+        assert sorted(p.name for p in may.iterdir()) == [f"{day:02d}.csv" for day in range(1, 32)]
+
+        # AND the new layout is recorded, and every record is read back from a reloaded database
+        db = CSVDatabase.load_from_name("name", tmp_path)
+        assert db.metadata.layout == LAYOUT_V2
+        assert read_all(db) == expected
+        assert db.rebuild_manifest().logs == v1_db.manifest.logs
+
+        # AND migrating it again does nothing
+        assert migrate_layout(db) == 0
+
+    def test_resume_interrupted_migration(self, v1_db, tmp_path, monkeypatch):
+        # GIVEN a migration interrupted after moving a few logs
+        expected = read_all(v1_db)
+        replace = os.replace
+        calls = iter(range(1000))
+
+        def failing_replace(src, dst):
+            if next(calls) == 10:
+                raise KeyboardInterrupt
+            replace(src, dst)
+        monkeypatch.setattr(layout_migration.os, "replace", failing_replace)
+        with pytest.raises(KeyboardInterrupt):
+            migrate_layout(v1_db)
+        monkeypatch.undo()
+        assert CSVDatabase.load_from_name("name", tmp_path).metadata.layout == LAYOUT_V1
+
+        # WHEN running it again
+        moved = migrate_layout(CSVDatabase.load_from_name("name", tmp_path))
+
+        # THEN only the logs left are moved, and every record is kept
+        assert moved == 37 - 10
+        db = CSVDatabase.load_from_name("name", tmp_path)
+        assert db.metadata.layout == LAYOUT_V2
+        assert read_all(db) == expected
+
+    def test_new_databases_use_latest_layout(self, tmp_path):
+        db = CSVDatabase.create("name", ["a"], tmp_path)
+        db.update_log(DATES[0], Record(0, 10, 0))
+        assert (db.metadata.db_path / "2023" / "04" / "28.csv").is_file()
+
+    def test_main_all(self, v1_db, tmp_path):
+        CSVDatabase.create("other", ["a"], tmp_path)
+
+        assert main(["--all", "--par-dir", str(tmp_path)]) == 37
+        assert CSVDatabase.load_from_name("name", tmp_path).metadata.layout == LAYOUT_V2
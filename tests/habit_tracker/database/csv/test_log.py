@@ -2,7 +2,7 @@ import csv
 import datetime
 import pytest
 
-from habit_tracker.database.csv.log import CSVLog
+from habit_tracker.database.csv.log import LAYOUT_V1, LAYOUT_V2, CSVLog, v1_log_date
 
 
 @pytest.fixture()
@@ -198,3 +198,29 @@ class TestCSVLog:
 
         # THEN the day of week is computed as expected
         assert int(csv_log._day_of_week) == 6  # Monday = 0, Sunday = 6
+
+    def test_layout_v2_path(self, tmp_path):
+        # GIVEN a known date
+        sample_date = datetime.date(2023, 5, 28)
+
+        # WHEN creating a CSVLog instance with the year/month/day layout
+        csv_log = CSVLog(sample_date, tmp_path, LAYOUT_V2)
+
+        # THEN the log is named after the day of the month
+        assert csv_log.file == tmp_path / "2023" / "05" / "28.csv"
+
+    def test_v1_log_date(self, tmp_path):
+        # GIVEN every date of a year
+        dates = [datetime.date(2023, 1, 1) + datetime.timedelta(days=n) for n in range(365)]
+
+        for date in dates:
+            # WHEN computing the date back from the names of its layout 1 path
+            file = CSVLog(date, tmp_path, LAYOUT_V1).file
+
+            # THEN the same date is obtained
+            assert v1_log_date(date.replace(day=1), file.parent.name, file.stem) == date
+
+        # AND names that don't match any date are rejected
+        assert v1_log_date(datetime.date(2023, 5, 1), "01", "06") == datetime.date(2023, 5, 7)
+        assert v1_log_date(datetime.date(2023, 5, 1), "06", "06") is None
+        assert v1_log_date(datetime.date(2023, 5, 1), "01", "notes") is None
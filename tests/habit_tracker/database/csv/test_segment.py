@@ -0,0 +1,50 @@
+import datetime
+import pytest
+
+from habit_tracker.database.csv.segment import MonthSegment, HEADER_SIZE
+from habit_tracker.records import RECORD_DTYPE, RecordBatch
+
+
+@pytest.fixture()
+def segment(tmp_path):
+    return MonthSegment(datetime.date(2023, 2, 1), tmp_path)
+
+
+class TestMonthSegment:
+
+    def test_write_and_read(self, segment):
+        # GIVEN records for two days of the same month
+        days = {
+            datetime.date(2023, 2, 28): RecordBatch.from_rows([[2, 30, 300]]),
+            datetime.date(2023, 2, 1): RecordBatch.from_rows([[0, 10, 100], [1, 20, 200]]),
+        }
+
+        # WHEN writing the segment
+        segment.write(days)
+
+        # THEN the file holds the header and 12 bytes per record
+        assert segment.exists()
+        assert segment.file.stat().st_size == HEADER_SIZE + 3 * RECORD_DTYPE.itemsize
+
+        # AND every day is read back with its own records
+        actual = segment.read()
+        assert list(actual) == [datetime.date(2023, 2, 1), datetime.date(2023, 2, 28)]
+        assert actual[datetime.date(2023, 2, 1)].interval_seconds.tolist() == [10, 20]
+        assert actual[datetime.date(2023, 2, 28)].activity.tolist() == [2]
+
+    def test_read_day(self, segment):
+        # GIVEN a segment with records for a single day
+        segment.write({datetime.date(2023, 2, 14): RecordBatch.from_rows([[1, 20, 200]])})
+
+        # THEN that day can be read on its own, and any other day is empty
+        assert segment.read_day(datetime.date(2023, 2, 14)).seconds_from_start.tolist() == [200]
+        assert len(segment.read_day(datetime.date(2023, 2, 15))) == 0
+
+    def test_not_a_segment(self, segment):
+        # GIVEN a file with a wrong header at the segment path
+        segment.file.parent.mkdir(parents=True)
+        segment.file.write_bytes(b"0" * HEADER_SIZE)
+
+        # THEN reading it raises an error
+        with pytest.raises(ValueError):
+            segment.read()
@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+
+import pytest
+
+from habit_tracker.database.sqlite.connection import ConnectionManager
+
+
+@pytest.fixture()
+def manager(tmp_path):
+    manager = ConnectionManager(tmp_path / "test.sqlite3", max_readers=2)
+    with manager.writer() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    yield manager
+    manager.close()
+
+
+class TestConnectionManager:
+
+    def test_pragmas(self, manager):
+        with manager.reader() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+            assert conn.execute("PRAGMA synchronous").fetchone() == (1,)  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone() == (-32000,)
+
+    def test_writer_commits_or_rolls_back(self, manager):
+        # GIVEN a committed write and a failed one
+        with manager.writer() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+        with pytest.raises(ZeroDivisionError):
+            with manager.writer() as conn:
+                conn.execute("INSERT INTO t VALUES (2)")
+                1 / 0
+
+        # WHEN reading the table
+        # THEN only the first write is visible
+        with manager.reader() as conn:
+            assert conn.execute("SELECT x FROM t").fetchall() == [(1,)]
+
+    def test_readers_are_read_only(self, manager):
+        with manager.reader() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO t VALUES (1)")
+
+    def test_readers_are_reused(self, manager):
+        # GIVEN two readers checked out at the same time
+        with manager.reader() as first, manager.reader() as second:
+            assert first is not second
+
+        # WHEN checking out a reader again
+        # THEN an idle one is reused
+        with manager.reader() as third:
+            assert third in (first, second)
+
+    def test_concurrent_readers_and_writer(self, manager):
+        # GIVEN a writer thread and several reader threads, more than the readers of the pool
+        errors = []
+
+        def write():
+            for i in range(100):
+                with manager.writer() as conn:
+                    conn.execute("INSERT INTO t VALUES (?)", (i,))
+
+        def read():
+            try:
+                for _ in range(100):
+                    with manager.reader() as conn:
+                        conn.execute("SELECT COUNT(*) FROM t").fetchone()
+            except Exception as e:
+                errors.append(e)
+
+        # WHEN running all of them at once
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # THEN no reader fails, and every write is visible
+        assert not errors
+        with manager.reader() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (100,)
@@ -0,0 +1,68 @@
+import datetime
+import pytest
+
+from habit_tracker.database.csv.database import CSVDatabase
+from habit_tracker.database.sqlite import migration
+from habit_tracker.database.sqlite.database import SQLiteDatabase
+from habit_tracker.database.storage import load_database
+from habit_tracker.records import RecordBatch
+
+
+@pytest.fixture()
+def csv_db(tmp_path):
+    db = CSVDatabase.create("name", ["a", "bb", "ccc"], tmp_path)
+    for day in range(60):
+        date = datetime.date(2023, 1, 1) + datetime.timedelta(days=day)
+        db.update_log(date, RecordBatch.from_rows([[day % 3, 600, 3600], [(day + 1) % 3, 60, 7200 + day]]))
+    db.compact(today=datetime.date(2023, 2, 15))  # January in a segment, February in loose logs
+    return db
+
+
+class TestMigration:
+
+    def test_migrate(self, csv_db, tmp_path):
+        # GIVEN a CSV database
+        # WHEN migrating it to SQLite with small batches
+        sqlite_db = migration.migrate_csv_to_sqlite(csv_db, batch_records=7)
+
+        # THEN every day has the same records, and the database is now loaded as a SQLite one
+        start, end = datetime.date(2022, 12, 31), datetime.date(2023, 3, 31)
+        assert sqlite_db.read_interval(start, end) == csv_db.read_interval(start, end)
+        assert isinstance(load_database("name", tmp_path), SQLiteDatabase)
+
+    def test_resume_after_interruption(self, csv_db, monkeypatch):
+        # GIVEN a migration interrupted after its second batch
+        commit = migration._commit
+        calls = []
+
+        def interrupted_commit(*args):
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            calls.append(args[1])
+            commit(*args)
+
+        monkeypatch.setattr(migration, "_commit", interrupted_commit)
+        with pytest.raises(KeyboardInterrupt):
+            migration.migrate_csv_to_sqlite(csv_db, batch_records=10)
+        assert load_database("name", csv_db.metadata.par_dir).metadata.backend == "csv"
+
+        # WHEN running it again
+        monkeypatch.setattr(migration, "_commit", commit)
+        sqlite_db = migration.migrate_csv_to_sqlite(csv_db, batch_records=10)
+
+        # THEN it completes without duplicating the days of the first batches
+        start, end = datetime.date(2023, 1, 1), datetime.date(2023, 3, 1)
+        assert sqlite_db.read_interval(start, end) == csv_db.read_interval(start, end)
+
+    def test_count_mismatch(self, csv_db):
+        # GIVEN a SQLite file that already has a record the CSV database doesn't have
+        sqlite_db = SQLiteDatabase(csv_db.metadata)
+        with sqlite_db.connections.writer() as conn:
+            conn.executescript(migration.SCHEMA)
+        sqlite_db.update_log(datetime.date(2023, 1, 5), RecordBatch.from_rows([[0, 1, 1]]))
+
+        # WHEN migrating the CSV database
+        # THEN the migration fails, and the database isn't switched to SQLite
+        with pytest.raises(RuntimeError, match="2023-01-05"):
+            migration.migrate_csv_to_sqlite(csv_db)
+        assert load_database("name", csv_db.metadata.par_dir).metadata.backend == "csv"
@@ -0,0 +1,140 @@
+import datetime
+import pytest
+
+from habit_tracker.database.sqlite.database import SQLiteDatabase
+from habit_tracker.records import Record, RecordBatch
+
+
+@pytest.fixture()
+def sample_db(tmp_path):
+    sample_name = "name"
+    sample_activity_set = ["a", "bb", "ccc"]
+    db = SQLiteDatabase.create(sample_name, sample_activity_set, tmp_path)
+    yield db
+    db.close()
+
+
+class TestSQLiteDatabase:
+
+    def test_create_new_db(self, sample_db):
+        assert sample_db.metadata.file.is_file()
+        assert sample_db.metadata.sqlite_file.is_file()
+        with sample_db.connections.reader() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+    def test_load_from_name(self, sample_db, tmp_path):
+        assert SQLiteDatabase.load_from_name("name", tmp_path) == sample_db
+        assert SQLiteDatabase.load_from_name("other", tmp_path) is None
+
+    def test_update_and_read_log(self, sample_db):
+        # GIVEN a SQLite database
+        date = datetime.date(2023, 1, 1)
+
+        # WHEN adding a single record and then a batch of records to a date
+        sample_db.update_log(date, Record(activity=0, interval_seconds=1, seconds_from_start=45000))
+        sample_db.update_log(date, RecordBatch.from_rows([[1, 60, 3600], [2, 10, 86399]]))
+        sample_db.update_log(date + datetime.timedelta(days=1), Record(0, 5, 0))
+
+        # THEN only the records of that date are read, in start time order
+        assert sample_db.read_log(date) == RecordBatch.from_rows([[1, 60, 3600], [0, 1, 45000], [2, 10, 86399]])
+        assert len(sample_db.read_log(date - datetime.timedelta(days=1))) == 0
+
+    def test_delete_log(self, sample_db):
+        # GIVEN a SQLite database with records on two consecutive dates
+        date = datetime.date(2023, 1, 1)
+        sample_db.update_log(date, RecordBatch.from_rows([[1, 60, 3600], [2, 10, 7200]]))
+        sample_db.update_log(date + datetime.timedelta(days=1), Record(0, 5, 0))
+
+        # WHEN deleting the first one
+        sample_db.delete_log(date)
+
+        # THEN only the records of the other date are kept
+        assert len(sample_db.read_log(date)) == 0
+        assert sample_db.read_log(date + datetime.timedelta(days=1)) == RecordBatch.from_rows([[0, 5, 0]])
+
+    def test_read_interval(self, sample_db):
+        # GIVEN a SQLite database with records over two months
+        sample_db.update_log(datetime.date(2023, 1, 30), Record(0, 10, 100))
+        sample_db.update_log(datetime.date(2023, 2, 1), Record(1, 20, 200))
+        sample_db.update_log(datetime.date(2023, 2, 3), Record(2, 30, 300))
+
+        # WHEN reading an interval across both months
+        interval_records = sample_db.read_interval(datetime.date(2023, 1, 30), datetime.date(2023, 2, 2))
+
+        # THEN every date of the interval is listed, with the records of its own day only
+        assert list(interval_records) == [datetime.date(2023, 1, 30), datetime.date(2023, 1, 31),
+                                          datetime.date(2023, 2, 1), datetime.date(2023, 2, 2)]
+        assert interval_records[datetime.date(2023, 1, 30)] == RecordBatch.from_rows([[0, 10, 100]])
+        assert len(interval_records[datetime.date(2023, 1, 31)]) == 0
+        assert interval_records[datetime.date(2023, 2, 1)] == RecordBatch.from_rows([[1, 20, 200]])
+
+    def test_read_interval_end_before_start(self, sample_db):
+        with pytest.warns(UserWarning):
+            assert sample_db.read_interval(datetime.date(2023, 1, 2), datetime.date(2023, 1, 1)) == dict()
+
+    def test_iter_records_skips_empty_days(self, sample_db):
+        sample_db.update_log(datetime.date(2023, 1, 1), Record(0, 10, 100))
+        sample_db.update_log(datetime.date(2023, 3, 1), Record(1, 20, 200))
+
+        dates = [date for date, _ in sample_db.iter_records(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31))]
+
+        assert dates == [datetime.date(2023, 1, 1), datetime.date(2023, 3, 1)]
+
+    def test_range_query_uses_index(self, sample_db):
+        with sample_db.connections.reader() as conn:
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM records WHERE timestamp >= ? AND timestamp < ?",
+                                (0, 1)).fetchall()
+        assert "records_timestamp_activity" in str(plan)
+
+
+@pytest.fixture()
+def filled_db(sample_db):
+    # Sunday 29th January to Wednesday 1st February 2023
+    sample_db.update_log(datetime.date(2023, 1, 29), RecordBatch.from_rows([[0, 100, 0], [1, 50, 200]]))
+    sample_db.update_log(datetime.date(2023, 1, 30), RecordBatch.from_rows([[0, 300, 0], [-1, 0, 10]]))
+    sample_db.update_log(datetime.date(2023, 2, 1), RecordBatch.from_rows([[2, 1000, 0], [0, 10, 5000]]))
+    return sample_db
+
+
+class TestSQLiteAggregations:
+
+    @pytest.mark.parametrize("period, expected", [
+        ("day", {datetime.date(2023, 1, 29): {0: 100, 1: 50}, datetime.date(2023, 1, 30): {0: 300},
+                 datetime.date(2023, 2, 1): {0: 10, 2: 1000}}),
+        ("week", {datetime.date(2023, 1, 23): {0: 100, 1: 50}, datetime.date(2023, 1, 30): {0: 310, 2: 1000}}),
+        ("month", {datetime.date(2023, 1, 1): {0: 400, 1: 50}, datetime.date(2023, 2, 1): {0: 10, 2: 1000}}),
+        ("year", {datetime.date(2023, 1, 1): {0: 410, 1: 50, 2: 1000}}),
+    ])
+    def test_secs_per_period(self, filled_db, period, expected):
+        assert filled_db.secs_per_period(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31), period) == expected
+
+    def test_secs_per_period_unknown(self, filled_db):
+        with pytest.raises(ValueError):
+            filled_db.secs_per_period(datetime.date(2023, 1, 1), datetime.date(2023, 12, 31), "hour")
+
+    def test_read_activity(self, filled_db):
+        assert filled_db.read_activity(0, datetime.date(2023, 1, 30), datetime.date(2023, 2, 28)) == {
+            datetime.date(2023, 1, 30): RecordBatch.from_rows([[0, 300, 0]]),
+            datetime.date(2023, 2, 1): RecordBatch.from_rows([[0, 10, 5000]]),
+        }
+
+    def test_longest_records(self, filled_db):
+        start, end = datetime.date(2023, 1, 1), datetime.date(2023, 12, 31)
+
+        assert filled_db.longest_records(start, end, n=2) == [
+            (datetime.date(2023, 2, 1), Record(2, 1000, 0)),
+            (datetime.date(2023, 1, 30), Record(0, 300, 0)),
+        ]
+        assert filled_db.longest_records(start, end, activity=0, min_duration=50) == [
+            (datetime.date(2023, 1, 30), Record(0, 300, 0)),
+            (datetime.date(2023, 1, 29), Record(0, 100, 0)),
+        ]
+
+    @pytest.mark.parametrize("query", ["SELECT activity, SUM(duration) FROM records WHERE timestamp >= 0 AND "
+                                       "timestamp < 1 GROUP BY activity",
+                                       "SELECT timestamp, duration FROM records WHERE activity = 0 AND "
+                                       "timestamp >= 0 AND timestamp < 1"])
+    def test_aggregations_use_covering_indexes(self, filled_db, query):
+        with filled_db.connections.reader() as conn:
+            plan = str(conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
+        assert "COVERING INDEX" in plan
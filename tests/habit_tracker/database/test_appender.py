@@ -0,0 +1,106 @@
+import datetime
+import time
+import weakref
+
+import pytest
+
+from habit_tracker.database import appender as appender_module
+from habit_tracker.database.appender import BufferedAppender
+from habit_tracker.database.storage import BACKENDS, create_database
+from habit_tracker.records import Record, RecordBatch
+
+
+@pytest.fixture(params=list(BACKENDS))
+def sample_db(request, tmp_path):
+    db = create_database("name", ["a", "bb", "ccc"], tmp_path, request.param)
+    yield db
+    db.close()
+
+
+DATE = datetime.date(2023, 1, 2)
+
+
+class TestBufferedAppender:
+
+    def test_flush_every_n_records(self, sample_db):
+        # GIVEN an appender flushing every 3 records
+        appender = BufferedAppender(sample_db, max_records=3)
+
+        # WHEN adding 4 records
+        for i in range(4):
+            appender.add(DATE, Record(0, 10, i))
+
+        # THEN the first 3 are written together and the last one waits in the buffer
+        assert len(sample_db.read_log(DATE)) == 3
+        assert appender.n_buffered == 1
+        appender.close()
+        assert len(sample_db.read_log(DATE)) == 4
+
+    def test_flush_after_delay(self, sample_db):
+        # GIVEN an appender flushing records 50 ms after they are buffered
+        appender = BufferedAppender(sample_db, max_records=1000, max_delay=0.05)
+
+        # WHEN adding a record and waiting
+        appender.add(DATE, Record(0, 10, 0))
+        assert len(sample_db.read_log(DATE)) == 0
+        time.sleep(0.3)
+
+        # THEN the record is written without any other call
+        assert len(sample_db.read_log(DATE)) == 1
+        appender.close()
+
+    def test_day_rollover(self, sample_db):
+        # GIVEN an appender with records of a day in its buffer
+        appender = BufferedAppender(sample_db, max_records=1000, fsync=True)
+        appender.add(DATE, RecordBatch.from_rows([[0, 10, 86000], [1, 10, 86300]]))
+
+        # WHEN adding a record of the next day
+        appender.add(DATE + datetime.timedelta(days=1), Record(2, 10, 0))
+
+        # THEN the records of the first day are written to its own log
+        assert sample_db.read_log(DATE) == RecordBatch.from_rows([[0, 10, 86000], [1, 10, 86300]])
+        appender.close()
+        assert sample_db.read_log(DATE + datetime.timedelta(days=1)) == RecordBatch.from_rows([[2, 10, 0]])
+        assert sample_db.secs_between(DATE, DATE + datetime.timedelta(days=1)) == {0: 10, 1: 10, 2: 10}
+
+    def test_flush_holds_database_lock(self, sample_db):
+        # GIVEN an appender flushing from its timer thread, while this thread holds the database lock
+        appender = BufferedAppender(sample_db, max_records=1000, max_delay=0.05)
+        with sample_db.lock:
+            appender.add(DATE, Record(0, 10, 0))
+            time.sleep(0.3)
+
+            # THEN the flush waits for the lock
+            assert appender.n_buffered == 1
+
+        # AND it goes on once the lock is released
+        time.sleep(0.3)
+        assert appender.n_buffered == 0
+        assert len(sample_db.read_log(DATE)) == 1
+        appender.close()
+
+    @pytest.mark.parametrize("owns_db", [False, True])
+    def test_close_owned_database(self, sample_db, monkeypatch, owns_db):
+        # GIVEN an appender, owning its database or not
+        closed = []
+        monkeypatch.setattr(sample_db, "close", lambda: closed.append(True))
+        appender = BufferedAppender(sample_db, owns_db=owns_db)
+
+        # WHEN closing it
+        appender.close()
+
+        # THEN only a database it owns is closed
+        assert closed == ([True] if owns_db else [])
+
+    def test_flush_at_exit(self, sample_db):
+        # GIVEN an appender with buffered records, and another one that's no longer referenced
+        appender = BufferedAppender(sample_db, max_records=1000)
+        appender.add(DATE, Record(0, 10, 0))
+        dropped = weakref.ref(BufferedAppender(sample_db))
+
+        # WHEN the interpreter exits
+        appender_module._close_open_appenders()
+
+        # THEN the buffered records are written, and exiting didn't keep the other appender alive
+        assert len(sample_db.read_log(DATE)) == 1
+        assert dropped() is None
@@ -0,0 +1,86 @@
+import datetime
+import gc
+import os
+import random
+import weakref
+
+import numpy as np
+import pytest
+
+from habit_tracker.database.range_index import RangeIndex
+
+
+@pytest.fixture()
+def index_file(tmp_path):
+    return tmp_path / "range_index.npy"
+
+
+class TestRangeIndex:
+
+    def test_build_and_query(self, index_file):
+        # GIVEN the totals of some days
+        secs_per_day = {
+            datetime.date(2023, 1, 1): np.array([10, 0, 5]),
+            datetime.date(2023, 1, 15): np.array([0, 20]),
+            datetime.date(2023, 3, 1): np.array([1, 1, 1]),
+        }
+
+        # WHEN building the index
+        index = RangeIndex.build(index_file, secs_per_day, n_activities=3)
+
+        # THEN any range is answered with the seconds per activity of its days
+        assert index.query(datetime.date(2023, 1, 1), datetime.date(2023, 1, 1)).tolist() == [10, 0, 5]
+        assert index.query(datetime.date(2023, 1, 2), datetime.date(2023, 2, 28)).tolist() == [0, 20, 0]
+        assert index.query(datetime.date(2022, 1, 1), datetime.date(2030, 1, 1)).tolist() == [11, 21, 6]
+
+    def test_add_updates_in_place_and_persists(self, index_file):
+        # GIVEN an empty index
+        index = RangeIndex.build(index_file, {}, n_activities=2)
+
+        # WHEN adding (and removing) totals of days out of the initial range, and with more activities
+        index.add(datetime.date(2020, 5, 1), np.array([5, 5]))
+        index.add(datetime.date(2031, 5, 1), np.array([0, 0, 7]))
+        index.add(datetime.date(2020, 5, 1), np.array([-5]))
+
+        # THEN the index grows to cover them, and is persisted to disk
+        reloaded = RangeIndex(index_file)
+        assert reloaded.query(datetime.date(2020, 1, 1), datetime.date(2020, 12, 31)).tolist() == [0, 5, 0]
+        assert reloaded.query(datetime.date(2020, 1, 1), datetime.date(2031, 12, 31)).tolist() == [0, 5, 7]
+
+    def test_mapping_released_before_the_file_is_replaced(self, index_file, monkeypatch):
+        # GIVEN an index whose file is mapped
+        index = RangeIndex.build(index_file, {}, n_activities=2)
+        index.add(datetime.date(2020, 5, 1), np.array([5, 5]))
+        mapping = weakref.ref(index._tree)
+
+        # WHEN adding a day out of its range, which replaces the file
+        released = []
+        os_replace = os.replace
+
+        def replace(src, dst):
+            gc.collect()
+            released.append(mapping() is None)
+            os_replace(src, dst)
+
+        monkeypatch.setattr("habit_tracker.database.range_index.os.replace", replace)
+        index.add(datetime.date(2031, 5, 1), np.array([0, 7]))
+
+        # THEN no reference to the old mapping is left when the file is replaced (it fails on Windows otherwise)
+        assert released == [True]
+        assert index.query(datetime.date(2020, 1, 1), datetime.date(2031, 12, 31)).tolist() == [5, 12]
+
+    def test_random_ranges_match_a_full_scan(self, index_file):
+        random.seed(0)
+        index = RangeIndex.build(index_file, {}, n_activities=3)
+        truth = dict()
+        for _ in range(300):
+            date = datetime.date(2015, 1, 1) + datetime.timedelta(days=random.randint(0, 3000))
+            secs = np.array([random.randint(0, 100) for _ in range(3)])
+            index.add(date, secs)
+            truth[date] = truth.get(date, 0) + secs
+
+        for _ in range(50):
+            start = datetime.date(2015, 1, 1) + datetime.timedelta(days=random.randint(0, 3000))
+            end = start + datetime.timedelta(days=random.randint(0, 400))
+            expected = sum((secs for date, secs in truth.items() if start <= date <= end), np.zeros(3))
+            assert index.query(start, end).tolist() == expected.tolist()
@@ -0,0 +1,111 @@
+import json
+import logging
+import shutil
+
+from habit_tracker.database.csv.database import CSVDatabase
+from habit_tracker.database.registry import DatabaseRegistry
+from habit_tracker.database.sqlite.database import SQLiteDatabase
+from habit_tracker.database.storage import create_database, delete_database, load_database
+
+
+class TestDatabaseRegistry:
+
+    def test_create_registers(self, tmp_path):
+        # GIVEN databases of both backends created in the same folder
+        CSVDatabase.create("db1", ["a", "b"], tmp_path)
+        SQLiteDatabase.create("db2", ["c"], tmp_path)
+
+        # WHEN reading the registry of the folder
+        registry = DatabaseRegistry(tmp_path)
+        entries = registry.entries()
+
+        # THEN it lists them without rescanning the folder
+        assert registry.is_consistent()
+        assert registry.names() == ["db1", "db2"]
+        assert entries["db1"].activities == ["a", "b"] and entries["db1"].backend == "csv"
+        assert entries["db2"].activities == ["c"] and entries["db2"].backend == "sqlite"
+        assert entries["db1"].modified > 0
+
+    def test_delete_unregisters(self, tmp_path):
+        # GIVEN two databases
+        create_database("db1", ["a"], tmp_path)
+        create_database("db2", ["a"], tmp_path, "sqlite")
+
+        # WHEN deleting one of them
+        assert delete_database("db2", tmp_path)
+
+        # THEN its files are removed, and so is its entry in the registry
+        assert not (tmp_path / "db2").exists()
+        assert DatabaseRegistry(tmp_path).names() == ["db1"]
+        assert not delete_database("db2", tmp_path)
+
+    def test_rescan_when_folder_changes_behind_registry(self, tmp_path):
+        # GIVEN a registered database
+        db = CSVDatabase.create("db1", ["a"], tmp_path)
+        registry = DatabaseRegistry(tmp_path)
+
+        # WHEN a database is copied into the folder by hand, and another one removed
+        shutil.copytree(db.metadata.db_path, tmp_path / "copy")
+        metadata = json.loads((tmp_path / "copy" / "metadata.json").read_text())
+        metadata["name"] = "copy"
+        (tmp_path / "copy" / "metadata.json").write_text(json.dumps(metadata))
+        shutil.rmtree(db.metadata.db_path)
+
+        # THEN the registry notices it, and is rebuilt
+        assert not registry.is_consistent()
+        assert registry.names() == ["copy"]
+        assert registry.is_consistent()
+
+    def test_missing_registry_is_rebuilt(self, tmp_path):
+        # GIVEN a folder of databases created before the registry existed
+        CSVDatabase.create("db1", ["a"], tmp_path)
+        DatabaseRegistry(tmp_path).file.unlink()
+
+        # WHEN listing the databases
+        # THEN the folder is scanned, and the registry written again
+        assert DatabaseRegistry(tmp_path).names() == ["db1"]
+        assert DatabaseRegistry(tmp_path).file.is_file()
+
+    def test_metadata_edited_behind_registry(self, tmp_path):
+        # GIVEN a registered database
+        db = CSVDatabase.create("db1", ["a"], tmp_path)
+        registry = DatabaseRegistry(tmp_path)
+
+        # WHEN its metadata is edited by hand, which doesn't change the folder of the registry
+        metadata = json.loads(db.metadata.file.read_text())
+        metadata["activities"] = ["a", "b"]
+        db.metadata.file.write_text(json.dumps(metadata))
+
+        # THEN listing the databases doesn't look into every database
+        assert registry.entries()["db1"].activities == ["a"]
+
+        # AND loading the database updates its entry
+        load_database("db1", tmp_path)
+        assert registry.entries()["db1"].activities == ["a", "b"]
+
+    def test_explicit_rescan(self, tmp_path):
+        # GIVEN a registered database, whose metadata is edited by hand
+        db = CSVDatabase.create("db1", ["a"], tmp_path)
+        metadata = json.loads(db.metadata.file.read_text())
+        metadata["activities"] = ["b"]
+        db.metadata.file.write_text(json.dumps(metadata))
+
+        # WHEN rescanning the folder
+        # THEN the registry is rebuilt from the metadata of every database
+        assert DatabaseRegistry(tmp_path).rescan()["db1"].activities == ["b"]
+        assert DatabaseRegistry(tmp_path).entries()["db1"].activities == ["b"]
+
+    def test_save_metadata_does_not_rescan(self, tmp_path, caplog):
+        # GIVEN a registered database
+        db = CSVDatabase.create("db1", ["a"], tmp_path)
+        CSVDatabase.create("db2", ["b"], tmp_path)
+
+        # WHEN saving its metadata again
+        caplog.set_level(logging.INFO, logger="habit_tracker.database.registry")
+        db.metadata.activities.append("c")
+        db.save_metadata()
+
+        # THEN only its entry is updated, without a scan of the folder
+        assert "Rebuilding" not in caplog.text
+        assert DatabaseRegistry(tmp_path).entries()["db1"].activities == ["a", "c"]
+        assert "Rebuilding" not in caplog.text
@@ -0,0 +1,58 @@
+import datetime
+import json
+import pytest
+
+from habit_tracker.database.csv.database import CSVDatabase
+from habit_tracker.database.sqlite.database import SQLiteDatabase
+from habit_tracker.database.storage import BACKENDS, Storage, create_database, load_database
+from habit_tracker.records import RecordBatch
+from habit_tracker.tracker import Tracker
+
+
+class TestStorage:
+
+    @pytest.mark.parametrize("backend, db_cls", [("csv", CSVDatabase), ("sqlite", SQLiteDatabase)])
+    def test_create_and_load(self, backend, db_cls, tmp_path):
+        # GIVEN a database created with a given backend
+        db = create_database("name", ["a", "bb"], tmp_path, backend)
+
+        # WHEN loading it by name
+        loaded = load_database("name", tmp_path)
+
+        # THEN the backend stored in its metadata is used
+        assert isinstance(db, db_cls) and isinstance(loaded, db_cls)
+        assert isinstance(loaded, Storage)
+        assert json.loads(loaded.metadata.file.read_text())["backend"] == backend
+
+    def test_load_missing(self, tmp_path):
+        assert load_database("name", tmp_path) is None
+
+    def test_unknown_backend(self, tmp_path):
+        with pytest.raises(ValueError):
+            create_database("name", ["a"], tmp_path, "parquet")
+
+    def test_legacy_metadata_is_csv(self, tmp_path):
+        # GIVEN a CSV database whose metadata was written before the backend field existed
+        db = CSVDatabase.create("name", ["a"], tmp_path)
+        metadata = json.loads(db.metadata.file.read_text())
+        metadata.pop("backend")
+        db.metadata.file.write_text(json.dumps(metadata))
+
+        # WHEN loading it
+        # THEN it's loaded as a CSV database
+        assert isinstance(load_database("name", tmp_path), CSVDatabase)
+
+    @pytest.mark.parametrize("backend", list(BACKENDS))
+    def test_tracker_on_every_backend(self, backend, tmp_path):
+        # GIVEN a tracker on a database of any backend
+        date = datetime.date(2023, 1, 2)
+        tracker = Tracker(create_database("name", ["a", "bb", "ccc"], tmp_path, backend), date)
+
+        # WHEN adding some records
+        for row in [[0, 600, 3600], [1, 300, 7200], [0, 60, 9000]]:
+            tracker.add_record(RecordBatch.from_rows([row])[0])
+
+        # THEN reports and totals are the same, whatever the backend
+        assert tracker.generate_report("02-01-2023").total_secs_per_activity == {0: 660, 1: 300}
+        assert tracker.generate_report("02-01-2023", totals_only=True).total_secs_per_activity == {0: 660, 1: 300}
+        assert tracker.totals_to_date("week") == {0: 660, 1: 300}
@@ -0,0 +1,48 @@
+import datetime
+
+from habit_tracker.aggregation import Aggregates
+from habit_tracker.records import RecordBatch
+
+
+class TestAggregates:
+
+    def test_from_days(self):
+        # GIVEN the records of two days
+        day1, day2 = datetime.date(2023, 1, 1), datetime.date(2023, 1, 2)
+        days = [
+            (day1, RecordBatch.from_rows([[0, 10, 100], [2, 30, 300], [0, 5, 400]])),
+            (day2, RecordBatch.from_rows([[2, 1, 100]])),
+        ]
+
+        # WHEN aggregating them for an activity set of 4 activities
+        aggregates = Aggregates.from_days(days, n_activities=4)
+
+        # THEN totals, counts and per-day totals have one column per activity
+        assert aggregates.secs_per_activity.tolist() == [15, 0, 31, 0]
+        assert aggregates.counts_per_activity.tolist() == [2, 0, 2, 0]
+        assert aggregates.secs_per_day[day1].tolist() == [15, 0, 30, 0]
+        assert aggregates.secs_per_day[day2].tolist() == [0, 0, 1, 0]
+        assert aggregates.total_secs == 46
+
+        # AND only activities with records are listed in the dictionary of totals
+        assert aggregates.as_dict() == {0: 15, 2: 31}
+
+    def test_activity_out_of_set_grows_columns(self):
+        aggregates = Aggregates(1)
+        aggregates.add_day(datetime.date(2023, 1, 1), RecordBatch.from_rows([[0, 10, 100]]))
+        aggregates.add_day(datetime.date(2023, 1, 2), RecordBatch.from_rows([[3, 20, 100]]))
+
+        assert aggregates.secs_per_activity.tolist() == [10, 0, 0, 20]
+        assert aggregates.secs_per_day[datetime.date(2023, 1, 1)].tolist() == [10, 0, 0, 0]
+
+    def test_records_without_activity_are_ignored(self):
+        aggregates = Aggregates(2)
+        aggregates.add_day(datetime.date(2023, 1, 1), RecordBatch.from_rows([[-1, 0, 100], [1, 20, 100]]))
+
+        assert aggregates.as_dict() == {1: 20}
+
+    def test_empty(self):
+        aggregates = Aggregates.from_days([], n_activities=3)
+
+        assert aggregates.as_dict() == {}
+        assert aggregates.total_secs == 0
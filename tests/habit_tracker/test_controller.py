@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 import datetime
+import time
 
-from habit_tracker.controller import Controller, Stage
+from habit_tracker.controller import AsyncController, Controller, Stage
 from habit_tracker.database.csv.database import CSVDatabase
 from habit_tracker.tracker import Tracker, Record
 from habit_tracker.view.cli import CliView
@@ -66,12 +68,12 @@ class TestController:
         assert len(controller.db_list) == 2
         assert controller.db_list == [db1.metadata.name, db2.metadata.name]
 
-    def test_db_list_db_added_after_init_not_listed(self, tmp_path):
+    def test_db_list_db_added_after_init_listed(self, tmp_path):
         controller = Controller(CliView(), tmp_path)
 
         CSVDatabase.create("db1", ["a", "b", "c"], tmp_path)
 
-        assert len(controller.db_list) == 0
+        assert controller.db_list == ["db1"]
 
     def test_db_list_file_in_db_directory(self, tmp_path):
         sample_file_name = tmp_path / "sample.txt"
@@ -183,5 +185,67 @@ class TestController:
 
         assert controller_non_empty_tracker.stage == Stage.OtherReports
 
-
-
+    def test_async_wait_checkpoints_while_waiting_input(self, db1, tmp_path, monkeypatch):
+        # GIVEN an asynchronous controller that checkpoints the tracked activity often
+        now = [1000.0]
+        monkeypatch.setattr("habit_tracker.tracker.time.time", lambda: now[0])
+        controller = AsyncController(CliView(), tmp_path, checkpoint_interval=0.01, status_interval=0.01)
+        controller.tracker = Tracker(db1, datetime.date.today())
+        controller.tracker.start(0)
+
+        # AND a user that ends the activity after 90 seconds
+        written_while_waiting = []
+
+        def slow_input(*_):
+            now[0] += 60
+            deadline = time.monotonic() + 5
+            while not len(db1.read_log(controller.tracker.date)) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            written_while_waiting.append(db1.read_log(controller.tracker.date))
+            now[0] += 30
+            return ""
+        monkeypatch.setattr('builtins.input', slow_input)
+
+        # WHEN waiting for the user
+        asyncio.run(controller.wait_async())
+
+        # THEN part of the activity was written before the user ended it
+        assert list(written_while_waiting[0].interval_seconds) == [60]
+
+        # AND the activity is a single record of the whole interval
+        records = db1.read_log(controller.tracker.date)
+        assert list(records.activity) == [0] and list(records.interval_seconds) == [90]
+        assert not controller.tracker.is_tracking
+
+    def test_async_wait_checkpoints_after_a_failure(self, db1, tmp_path, monkeypatch, caplog):
+        # GIVEN an asynchronous controller whose first checkpoint fails
+        now = [1000.0]
+        monkeypatch.setattr("habit_tracker.tracker.time.time", lambda: now[0])
+        controller = AsyncController(CliView(), tmp_path, checkpoint_interval=0.01, status_interval=0.01)
+        controller.tracker = Tracker(db1, datetime.date.today())
+        controller.tracker.start(0)
+        checkpoint, calls = controller.tracker.checkpoint, []
+
+        def failing_once():
+            calls.append(True)
+            if len(calls) == 1:
+                raise OSError("disk full")
+            return checkpoint()
+        monkeypatch.setattr(controller.tracker, "checkpoint", failing_once)
+
+        # AND a user that ends the activity once it has been checkpointed again
+        def slow_input(*_):
+            now[0] += 60
+            deadline = time.monotonic() + 5
+            while not len(db1.read_log(controller.tracker.date)) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return ""
+        monkeypatch.setattr('builtins.input', slow_input)
+
+        # WHEN waiting for the user
+        asyncio.run(controller.wait_async())
+
+        # THEN the failure is logged, and the later checkpoints still ran
+        assert "disk full" in caplog.text
+        assert len(calls) >= 2
+        assert list(db1.read_log(controller.tracker.date).interval_seconds) == [60]
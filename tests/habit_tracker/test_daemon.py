@@ -0,0 +1,143 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+from habit_tracker.daemon import TrackingDaemon, send_events
+from habit_tracker.database.storage import create_database, load_database
+
+
+@pytest.fixture()
+def daemon(tmp_path):
+    create_database("work", ["coding", "review"], tmp_path)
+    create_database("home", ["cooking"], tmp_path, "sqlite")
+    return TrackingDaemon(tmp_path, tmp_path / "test.sock", flush_records=1000, flush_delay=60)
+
+
+class TestTrackingDaemon:
+
+    def test_start_stop_status(self, daemon):
+        # GIVEN a daemon
+        # WHEN starting to track an activity
+        assert daemon.handle_event({"op": "start", "db": "work", "activity": "review"}) == {"ok": True}
+
+        # THEN its status is known, until it's stopped
+        assert daemon.handle_event({"op": "status", "db": "work"}) == {"ok": True, "tracking": True,
+                                                                        "activity": "review"}
+        assert daemon.handle_event({"op": "stop", "db": "work"}) == {"ok": True}
+        assert daemon.handle_event({"op": "status", "db": "work"})["tracking"] is False
+
+    def test_records_are_buffered(self, daemon, tmp_path):
+        # GIVEN a daemon that writes records in groups
+        today = datetime.date.today()
+        for i in range(5):
+            daemon.handle_event({"op": "record", "db": "home", "activity": 0, "interval_seconds": 60,
+                                 "seconds_from_start": i * 60})
+
+        # WHEN querying the totals
+        # THEN the buffered records are written first
+        assert daemon.handle_event({"op": "query", "db": "home", "period": "week"}) == {"ok": True,
+                                                                                         "totals": {"cooking": 300}}
+        assert len(load_database("home", tmp_path).read_log(today)) == 5
+
+    @pytest.mark.parametrize("event, error", [
+        ({"op": "start", "db": "nope", "activity": "coding"}, "No database"),
+        ({"op": "start", "db": "work", "activity": "sleeping"}, "Unknown activity"),
+        ({"op": "stop", "db": "work"}, "Not tracking"),
+        ({"op": "query", "db": "work", "period": "decade"}, "Unknown period"),
+        ({"op": "record", "db": "work", "activity": 0}, "A record needs"),
+        ({"op": "dance", "db": "work"}, "Unknown op"),
+    ])
+    def test_errors(self, daemon, event, error):
+        answer = daemon._answer(json.dumps(event).encode())
+        assert not json.loads(answer)["ok"]
+        assert error in json.loads(answer)["error"]
+
+    def test_concurrent_clients(self, daemon, tmp_path):
+        # GIVEN a running daemon
+        async def client(i):
+            reader, writer = await asyncio.open_unix_connection(str(daemon.socket_path))
+            for j in range(50):
+                event = {"id": j, "op": "record", "db": "work", "activity": i % 2, "interval_seconds": 1,
+                         "seconds_from_start": i * 100 + j}
+                writer.write(json.dumps(event).encode() + b"\n")
+            await writer.drain()
+            answers = [json.loads(await reader.readline()) for _ in range(50)]
+            writer.close()
+            return answers
+
+        async def run():
+            await daemon.start()
+            # WHEN 10 clients send 50 events each at the same time
+            answers = await asyncio.gather(*(client(i) for i in range(10)))
+            await daemon.stop()
+            return answers
+
+        answers = asyncio.run(run())
+
+        # THEN every event is answered in order, and every record is written when the daemon stops
+        assert all([answer["id"] for answer in client_answers] == list(range(50)) for client_answers in answers)
+        assert all(answer["ok"] for client_answers in answers for answer in client_answers)
+        assert load_database("work", tmp_path).secs_between(datetime.date.today(), datetime.date.today()) == {
+            0: 250, 1: 250}
+        assert not daemon.socket_path.exists()
+
+    def test_send_events(self, daemon):
+        # GIVEN a daemon running in the background
+        async def run():
+            await daemon.start()
+            answers = await asyncio.get_running_loop().run_in_executor(None, send_events, [
+                {"op": "start", "db": "work", "activity": "coding"}, "not an object"], daemon.socket_path)
+            await daemon.stop()
+            return answers
+
+        # WHEN a script sends some events
+        # THEN it gets one answer per event
+        assert asyncio.run(run()) == [{"ok": True}, {"ok": False, "error": "An event must be a JSON object."}]
+
+    def test_event_too_long(self, daemon, monkeypatch):
+        # GIVEN a running daemon accepting events of at most 1 KiB
+        monkeypatch.setattr("habit_tracker.daemon.MAX_EVENT_BYTES", 1024)
+
+        async def run():
+            await daemon.start()
+            reader, writer = await asyncio.open_unix_connection(str(daemon.socket_path))
+            # WHEN a client sends a line longer than that, between two valid events
+            writer.write(b'{"op": "status", "db": "work", "id": 1}\n' + b"x" * 10000 + b"\n" +
+                         b'{"op": "status", "db": "work", "id": 2}\n')
+            writer.write_eof()
+            answers = [json.loads(line) async for line in reader]
+            writer.close()
+            await daemon.stop()
+            return answers
+
+        answers = asyncio.run(run())
+
+        # THEN the long line is answered with an error, and the connection goes on
+        assert [answer.get("id") for answer in answers] == [1, None, 2]
+        assert not answers[1]["ok"] and "1024 bytes" in answers[1]["error"]
+
+    def test_flush_failure_is_logged(self, daemon, monkeypatch, caplog):
+        # GIVEN a running daemon flushing every 10 ms, whose storage fails once
+        daemon.flush_delay = 0.01
+        calls = []
+
+        def flush():
+            calls.append(True)
+            if len(calls) == 1:
+                raise OSError("disk full")
+
+        monkeypatch.setattr(daemon, "_flush", flush)
+
+        async def run():
+            await daemon.start()
+            # WHEN the periodic flush fails
+            while len(calls) < 2:
+                await asyncio.sleep(0.01)
+            await daemon.stop()
+
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        # THEN the error is logged, and the next flushes go on
+        assert "Failed to flush" in caplog.text and "disk full" in caplog.text
@@ -0,0 +1,50 @@
+import datetime
+import pytest
+
+from habit_tracker.export import export_reports
+from habit_tracker.records import RecordBatch
+from habit_tracker.database.csv.database import CSVDatabase
+
+
+@pytest.fixture
+def sample_db(tmp_path):
+    db = CSVDatabase.create("name", ["a", "bb", "ccc"], tmp_path / "db")
+    # Tuesday 3rd to Tuesday 10th of January 2023, except Sunday 8th
+    for day in [3, 4, 5, 6, 7, 9, 10]:
+        db.update_log(datetime.date(2023, 1, day), RecordBatch.from_rows([[0, 3600, 32400], [day % 3, 600, 40000]]))
+    return db
+
+
+class TestExportReports:
+
+    def test_export_days(self, sample_db, tmp_path):
+        # GIVEN a database with 7 days of records
+        # WHEN exporting the daily reports of the whole range with several workers
+        files = export_reports(sample_db, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31), tmp_path / "out",
+                               max_workers=2)
+
+        # THEN one image per day with records is written, in date order
+        assert [file.name for file in files] == ["2023-01-03.png", "2023-01-04.png", "2023-01-05.png",
+                                                 "2023-01-06.png", "2023-01-07.png", "2023-01-09.png",
+                                                 "2023-01-10.png"]
+        assert all(file.read_bytes().startswith(b"\x89PNG") for file in files)
+
+    def test_export_weeks(self, sample_db, tmp_path):
+        # GIVEN a database with records over 2 ISO weeks
+        # WHEN exporting the weekly reports as SVG
+        files = export_reports(sample_db, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31), tmp_path / "out",
+                               period="week", fmt="svg", max_workers=2)
+
+        # THEN one image per week is written
+        assert [file.name for file in files] == ["2023-W01.svg", "2023-W02.svg"]
+        assert b"<svg" in files[0].read_bytes()
+
+    def test_export_empty_range(self, sample_db, tmp_path):
+        # GIVEN a range without records
+        # WHEN exporting it
+        # THEN nothing is written
+        assert export_reports(sample_db, datetime.date(2022, 1, 1), datetime.date(2022, 12, 31), tmp_path) == []
+
+    def test_export_unknown_period(self, sample_db, tmp_path):
+        with pytest.raises(ValueError):
+            export_reports(sample_db, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31), tmp_path, period="hour")
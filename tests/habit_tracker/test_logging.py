@@ -0,0 +1,109 @@
+import logging
+import threading
+import pytest
+
+from habit_tracker import config_logger, stop_logger, settings
+
+
+@pytest.fixture
+def restore_levels():
+    names = ["", "habit_tracker", "habit_tracker.database", *settings.LOG_LEVELS]
+    levels = {name: logging.getLogger(name).level for name in names}
+    yield
+    stop_logger()
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+class TestLogging:
+
+    def test_records_written_by_listener(self, tmp_path, restore_levels):
+        # GIVEN the logging pipeline
+        config_logger(tmp_path, level="INFO")
+
+        # WHEN logging from the application, with immutable arguments
+        logging.getLogger("habit_tracker.tracker").info("Message with %s and %d", "arg", 2)
+        stop_logger()
+
+        # THEN the message is written to the log file
+        content = (tmp_path / settings.LOG_FILE_NAME).read_text()
+        assert "INFO" in content and "habit_tracker.tracker: Message with arg and 2" in content
+
+    def test_mutable_args_formatted_when_logged(self, tmp_path, restore_levels):
+        # GIVEN the logging pipeline, and arguments that can change after being logged, or remember where they
+        # were formatted
+        config_logger(tmp_path, level="INFO")
+        formatted_in = []
+
+        class Arg:
+            def __str__(self):
+                formatted_in.append(threading.current_thread())
+                return "arg"
+
+        values = [1]
+
+        # WHEN logging them, then changing them
+        logging.getLogger("habit_tracker.tracker").info("Message with %s and %s", Arg(), values)
+        values.append(2)
+        stop_logger()
+
+        # THEN the message is formatted in the logging thread, with the values at the time it was logged
+        assert formatted_in and all(thread is threading.current_thread() for thread in formatted_in)
+        content = (tmp_path / settings.LOG_FILE_NAME).read_text()
+        assert "habit_tracker.tracker: Message with arg and [1]" in content
+
+    def test_per_module_levels(self, tmp_path, restore_levels, monkeypatch):
+        # GIVEN a root level of WARNING, DEBUG for the database modules, and ERROR from the environment
+        monkeypatch.setenv(settings.LOG_LEVELS_ENV_VAR, "habit_tracker.report=error")
+        config_logger(tmp_path, level="WARNING", levels={"habit_tracker.database": "DEBUG"})
+
+        # WHEN logging from several modules
+        logging.getLogger("habit_tracker.database.sqlite.db").debug("database debug")
+        logging.getLogger("habit_tracker.tracker").info("tracker info")
+        logging.getLogger("habit_tracker.tracker").warning("tracker warning")
+        logging.getLogger("habit_tracker.report").warning("report warning")
+        stop_logger()
+
+        # THEN every module is filtered with its own level
+        content = (tmp_path / settings.LOG_FILE_NAME).read_text()
+        assert "database debug" in content and "tracker warning" in content
+        assert "tracker info" not in content and "report warning" not in content
+
+    def test_rotation(self, tmp_path, restore_levels):
+        # GIVEN a small maximum size of the log file
+        config_logger(tmp_path, level="INFO", max_bytes=1000, backup_count=2)
+
+        # WHEN logging more than that
+        for i in range(100):
+            logging.getLogger("habit_tracker").info("Message number %s", i)
+        stop_logger()
+
+        # THEN the file is rotated, and only the given number of backups is kept
+        files = sorted(p.name for p in tmp_path.iterdir())
+        assert files == [settings.LOG_FILE_NAME, f"{settings.LOG_FILE_NAME}.1", f"{settings.LOG_FILE_NAME}.2"]
+        assert "Message number 99" in (tmp_path / settings.LOG_FILE_NAME).read_text()
+
+    def test_reconfigure(self, tmp_path, restore_levels):
+        # GIVEN a pipeline configured twice
+        config_logger(tmp_path / "first", level="INFO")
+        config_logger(tmp_path / "second", level="INFO")
+
+        # WHEN logging
+        logging.getLogger("habit_tracker").info("Only once")
+        stop_logger()
+
+        # THEN only the last pipeline writes it
+        assert not (tmp_path / "first" / settings.LOG_FILE_NAME).exists()
+        assert (tmp_path / "second" / settings.LOG_FILE_NAME).read_text().count("Only once") == 1
+
+    def test_unknown_env_levels_skipped(self, tmp_path, restore_levels, monkeypatch):
+        # GIVEN levels from the environment, some of them not valid
+        monkeypatch.setenv(settings.LOG_LEVELS_ENV_VAR, "habit_tracker.database=debug, habit_tracker=LOUD,=INFO,PIL")
+
+        # WHEN configuring the logs
+        # THEN every invalid item is reported and skipped, and the valid ones are applied
+        with pytest.warns(UserWarning) as warnings:
+            config_logger(tmp_path, level="WARNING")
+        assert [str(warning.message).split("'")[1] for warning in warnings] == ["habit_tracker=LOUD", "=INFO", "PIL"]
+        assert logging.getLogger("habit_tracker.database").level == logging.DEBUG
+        assert logging.getLogger("habit_tracker").level == logging.NOTSET
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+
+from habit_tracker.records import Record, RecordBatch, RECORD_DTYPE
+
+
+class TestRecord:
+
+    def test_values(self):
+        record = Record(activity=1, interval_seconds=10, seconds_from_start=100)
+        assert record.values() == (1, 10, 100)
+
+    def test_no_instance_dict(self):
+        # GIVEN a record
+        record = Record(1, 10, 100)
+
+        # THEN no attribute other than its fields can be set
+        with pytest.raises(AttributeError):
+            record.description = "sample"
+
+
+class TestRecordBatch:
+
+    def test_from_rows_parses_strings(self):
+        # GIVEN rows of strings, as read from a CSV file
+        rows = [["0", "10", "100"], ["2", "30", "300"]]
+
+        # WHEN building a batch
+        batch = RecordBatch.from_rows(rows)
+
+        # THEN the values are stored as int32 columns, 12 bytes per record
+        assert batch.activity.tolist() == [0, 2]
+        assert batch.interval_seconds.tolist() == [10, 30]
+        assert batch.seconds_from_start.tolist() == [100, 300]
+        assert batch.nbytes == 2 * 12
+
+    def test_from_records(self):
+        records = [Record(0, 10, 100), Record(1, 20, 200)]
+        batch = RecordBatch.from_records(records)
+
+        assert len(batch) == 2
+        assert list(batch) == records
+        assert batch[1] == records[1]
+        assert batch[1:] == RecordBatch.from_records(records[1:])
+
+    def test_empty(self):
+        batch = RecordBatch()
+        assert len(batch) == 0
+        assert RecordBatch.from_rows([]) == batch
+        assert RecordBatch.concatenate([]) == batch
+
+    def test_concatenate(self):
+        batch1 = RecordBatch.from_rows([[0, 10, 100]])
+        batch2 = RecordBatch.from_rows([[1, 20, 200]])
+
+        assert RecordBatch.concatenate([batch1, batch2]).tolist() == [[0, 10, 100], [1, 20, 200]]
+
+    def test_coerce(self):
+        record = Record(0, 10, 100)
+        batch = RecordBatch.from_records([record])
+
+        assert RecordBatch.coerce(record) == batch
+        assert RecordBatch.coerce(batch) is batch
+
+    def test_wrong_dtype(self):
+        with pytest.raises(TypeError):
+            RecordBatch(np.zeros(3, dtype=np.int64))
+
+    def test_wraps_array_without_copy(self):
+        data = np.zeros(2, dtype=RECORD_DTYPE)
+        batch = RecordBatch(data)
+
+        data["activity"][0] = 5
+        assert batch[0].activity == 5
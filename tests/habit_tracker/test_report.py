@@ -1,19 +1,26 @@
 import datetime
+import pathlib
+import subprocess
+import sys
+import weakref
 
 import pytest
 
 from habit_tracker.report import Report
+from habit_tracker.plots import Graphics
+from habit_tracker.records import RecordBatch
+from habit_tracker.database.csv.manifest import LogEntry
 
 
 @pytest.fixture()
 def report_single_day():
     records = {
-        datetime.date(2023, 1, 3): [
+        datetime.date(2023, 1, 3): RecordBatch.from_rows([
             [0, 7200, 32400],
             [1, 3600, 41400],
             [0, 1200, 54000],
             [2, 3600, 60000]
-        ]
+        ])
     }
 
     activity_set = [
@@ -28,22 +35,22 @@ def report_single_day():
 @pytest.fixture()
 def report_multiple_days():
     records = {
-        datetime.date(2023, 1, 1): [
+        datetime.date(2023, 1, 1): RecordBatch.from_rows([
             [0, 5000, 34000],
             [1, 6000, 40000],
             [2, 1200, 50000]
-        ],
-        datetime.date(2023, 1, 2): [
+        ]),
+        datetime.date(2023, 1, 2): RecordBatch.from_rows([
             [0, 8000, 31000],
             [0, 3000, 42000],
             [2, 1200, 50000]
-        ],
-        datetime.date(2023, 1, 3): [
+        ]),
+        datetime.date(2023, 1, 3): RecordBatch.from_rows([
             [0, 7200, 32400],
             [1, 3600, 41400],
             [0, 1200, 54000],
             [2, 3600, 60000]
-        ]
+        ])
     }
 
     activity_set = [
@@ -73,22 +80,192 @@ class TestReport:
 
     def test_plot_seconds_per_activity_single_day(self, report_single_day):
         report_single_day.plot_time_per_activity()
-        report_single_day.graphics.show()
+
+        assert report_single_day.graphics.ax1.patches
 
     def test_plot_seconds_per_activity_multiple_days(self, report_multiple_days):
         report_multiple_days.plot_time_per_activity()
-        report_multiple_days.graphics.show()
+
+        assert report_multiple_days.graphics.ax1.patches
 
     def test_plot_intervals_single_day(self, report_single_day):
         report_single_day.plot_intervals()
-        report_single_day.graphics.show()
+
+        assert report_single_day.graphics.ax2.collections
 
     def test_plot_intervals_multiple_days(self, report_multiple_days):
         report_multiple_days.plot_intervals()
-        report_multiple_days.graphics.show()
+
+        assert report_multiple_days.graphics.ax2.collections
+
+    def test_show_headless_raises(self, report_single_day):
+        # GIVEN a report plotted on the default headless figure
+        report_single_day.plot()
+
+        # WHEN displaying it
+        # THEN the error tells how to get an image instead
+        with pytest.raises(RuntimeError, match="render"):
+            report_single_day.graphics.show()
+        with pytest.raises(RuntimeError, match="headless"):
+            report_single_day.show()
 
     def test_plot_report_single_day(self, report_single_day):
+        # GIVEN a report without a figure of its own
+        # WHEN showing it
         report_single_day.show()
 
+        # THEN it's drawn on an interactive figure
+        assert report_single_day.graphics.interactive
+        assert report_single_day.graphics.ax1.patches and report_single_day.graphics.ax2.collections
+
     def test_plot_report_multiple_days(self, report_multiple_days):
         report_multiple_days.show()
+
+        assert report_multiple_days.graphics.interactive
+        assert report_multiple_days.graphics.ax1.patches and report_multiple_days.graphics.ax2.collections
+
+    def test_total_time_per_activity_stream(self, report_multiple_days):
+        # GIVEN a report built from a stream of (date, records) pairs
+        report = Report(iter(report_multiple_days.records.items()), report_multiple_days.activity_set)
+
+        # WHEN computing the totals twice
+        # THEN the stream is consumed once and gives the same totals as a dictionary
+        assert report.total_secs_per_activity == {0: 24400, 1: 9600, 2: 6000}
+        assert report.total_secs_per_activity == {0: 24400, 1: 9600, 2: 6000}
+
+    def test_plot_report_stream(self, report_multiple_days):
+        # GIVEN a report built from a stream of (date, records) pairs
+        report = Report(iter(report_multiple_days.records.items()), report_multiple_days.activity_set)
+
+        # WHEN showing the report
+        report.show()
+
+        # THEN the intervals and the totals are computed in a single pass
+        assert report.graphics.ax2.collections
+        assert report.total_secs_per_activity == {0: 24400, 1: 9600, 2: 6000}
+
+    def test_plot_consumed_stream(self, report_multiple_days):
+        # GIVEN a report built from a stream of (date, records) pairs, whose totals were already read
+        report = Report(iter(report_multiple_days.records.items()), report_multiple_days.activity_set)
+        assert report.total_secs_per_activity == {0: 24400, 1: 9600, 2: 6000}
+
+        # WHEN plotting it
+        # THEN an error tells the intervals are gone, instead of drawing an empty timeline
+        with pytest.raises(RuntimeError, match="already consumed"):
+            report.plot()
+
+    def test_aggregate_computed_once(self, report_multiple_days):
+        # GIVEN a report
+        # WHEN aggregating it twice
+        # THEN the same cached result is returned
+        assert report_multiple_days.aggregate() is report_multiple_days.aggregate()
+
+    def test_secs_per_day_and_records_per_activity(self, report_multiple_days):
+        assert report_multiple_days.secs_per_day[datetime.date(2023, 1, 2)] == {0: 11000, 1: 0, 2: 1200}
+        assert report_multiple_days.records_per_activity == {0: 5, 1: 2, 2: 3}
+
+    def test_from_summaries(self, report_multiple_days):
+        # GIVEN the summaries of the days of a report
+        summaries = dict()
+        for date, records in report_multiple_days.records.items():
+            summaries[date] = LogEntry()
+            summaries[date].add(records)
+
+        # WHEN building a report from them
+        report = Report.from_summaries(summaries, report_multiple_days.activity_set)
+
+        # THEN the totals are the same as the ones computed from the records
+        assert report.total_secs_per_activity == report_multiple_days.total_secs_per_activity
+        assert report.records_per_activity == report_multiple_days.records_per_activity
+        assert report.secs_per_day == report_multiple_days.secs_per_day
+
+    def test_plot_intervals_one_artist_per_activity(self, report_multiple_days):
+        # GIVEN a report of several days with 3 different activities
+        # WHEN plotting the intervals
+        report_multiple_days.plot_intervals()
+
+        # THEN a single collection per activity is drawn, whatever the number of intervals
+        ax = report_multiple_days.graphics.ax2
+        assert len(ax.collections) == 3
+        assert not ax.lines
+        assert sum(len(collection.get_segments()) for collection in ax.collections) == 10
+
+    def test_plot_intervals_streams_days(self, report_multiple_days):
+        # GIVEN a stream of days that checks which of the days already yielded are still referenced
+        yielded, still_alive = [], []
+
+        def days():
+            for date, records in report_multiple_days.records.items():
+                still_alive.append([ref() is not None for ref in yielded[:-1]])  # The last one may be in use
+                batch = RecordBatch(records.data.copy())
+                yielded.append(weakref.ref(batch.data))
+                yield date, batch
+                del batch
+
+        # WHEN plotting the intervals of the stream
+        Graphics().workday(days(), report_multiple_days.activity_set)
+
+        # THEN the records of every day are released once drawn
+        assert still_alive == [[], [], [False]]
+        assert not any(ref() for ref in yielded)
+
+    def test_compute_intervals(self, report_single_day):
+        base_dt = datetime.datetime(2023, 1, 3)
+        intervals = Graphics.compute_intervals(report_single_day.records[datetime.date(2023, 1, 3)], base_dt)
+
+        assert list(intervals) == [0, 1, 2]
+        assert intervals[0].tolist() == [
+            [datetime.datetime(2023, 1, 3, 9, 0), datetime.datetime(2023, 1, 3, 11, 0)],
+            [datetime.datetime(2023, 1, 3, 15, 0), datetime.datetime(2023, 1, 3, 15, 20)],
+        ]
+
+    def test_render_headless(self, report_single_day):
+        # GIVEN a report
+        # WHEN rendering it to PNG and SVG
+        png = report_single_day.render("png")
+        svg = report_single_day.render("svg")
+
+        # THEN the encoded images are returned, without registering any pyplot figure
+        assert png.startswith(b"\x89PNG")
+        assert b"<svg" in svg
+        assert report_single_day.graphics.fig.canvas.manager is None
+
+    def test_graphics_reused_across_reports(self, report_single_day, report_multiple_days):
+        # GIVEN two reports sharing the same graphics
+        graphics = Graphics()
+        first = Report(report_multiple_days.records, report_multiple_days.activity_set, graphics)
+        second = Report(report_single_day.records, report_single_day.activity_set, graphics)
+
+        # WHEN rendering both, one after the other
+        first.render()
+        fig = graphics.fig
+        second.render()
+
+        # THEN the figure is reused and cleared in between
+        assert graphics.fig is fig
+        assert sum(len(collection.get_segments()) for collection in graphics.ax2.collections) == 4
+        assert len(graphics.ax1.patches) == 3
+
+    def test_graphics_reused_for_empty_range(self, report_multiple_days):
+        # GIVEN graphics on which a report was drawn
+        graphics = Graphics()
+        Report(report_multiple_days.records, report_multiple_days.activity_set, graphics).render()
+        default_xlim = Graphics().ax2.get_xlim()
+
+        # WHEN drawing the intervals of a range without any record on it
+        graphics.workday(dict(), report_multiple_days.activity_set)
+
+        # THEN nothing of the previous report is left on the timeline
+        assert not graphics.ax2.collections
+        labels = {label.get_text() for label in graphics.ax2.get_yticklabels()}
+        assert not labels & set(report_multiple_days.activity_set)
+        assert graphics.ax2.get_xlim() == default_xlim
+
+    def test_graphics_created_lazily(self):
+        # GIVEN a new interpreter
+        # WHEN building a report
+        code = ("import sys; from habit_tracker.report import Report; "
+                "Report({}, ['a']); assert 'matplotlib' not in sys.modules")
+
+        # THEN matplotlib isn't imported
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=pathlib.Path(__file__).parents[2])
@@ -0,0 +1,66 @@
+import datetime
+import pytest
+
+from habit_tracker.database.storage import create_database
+from habit_tracker.records import Record, RecordBatch
+from habit_tracker.report import Report
+from habit_tracker.rollup import RollupReport, rollup_report, shared_activity_set
+
+
+@pytest.fixture
+def team(tmp_path):
+    """ Two databases with different activity sets and backends, with records on the same days."""
+    alice = create_database("alice", ["coding", "meetings"], tmp_path)
+    bob = create_database("bob", ["email", "dev", "coding"], tmp_path, "sqlite")
+    day1, day2 = datetime.date(2023, 5, 1), datetime.date(2023, 5, 2)
+    alice.update_log(day1, RecordBatch.from_records([Record(0, 3600, 0), Record(1, 600, 3600)]))
+    alice.update_log(day2, Record(0, 1200, 0))
+    bob.update_log(day1, RecordBatch.from_records([Record(0, 300, 0), Record(1, 1800, 300), Record(2, 60, 2100)]))
+    bob.update_log(datetime.date(2023, 6, 1), Record(0, 100, 0))  # Out of the report range
+    return tmp_path
+
+
+class TestRollupReport:
+
+    def test_shared_activity_set(self):
+        # GIVEN the activity sets of two databases, with a label named differently in each of them
+        # WHEN merging them, with an alias for that label
+        activity_set, mappings = shared_activity_set({"a": ["coding", "meetings"], "b": ["email", "dev", "coding"]},
+                                                     aliases={"dev": "coding"})
+
+        # THEN equal labels share an index, in order of first appearance
+        assert activity_set == ["coding", "meetings", "email"]
+        assert mappings == {"a": [0, 1], "b": [2, 0, 0]}
+
+    @pytest.mark.parametrize("processes", [False, True])
+    def test_rollup(self, team, processes):
+        # GIVEN a folder with the databases of a team
+        # WHEN building the rollup of a date range
+        report = rollup_report(["alice", "bob"], team, datetime.date(2023, 5, 1), datetime.date(2023, 5, 31),
+                               processes=processes)
+
+        # THEN the totals of every database are combined on the shared activity set
+        assert isinstance(report, RollupReport) and isinstance(report, Report)
+        assert report.activity_set == ["coding", "meetings", "email", "dev"]
+        assert report.total_secs_per_activity == {0: 3600 + 1200 + 60, 1: 600, 2: 300, 3: 1800}
+        assert report.records_per_activity == {0: 3, 1: 1, 2: 1, 3: 1}
+        assert report.secs_per_day[datetime.date(2023, 5, 2)] == {0: 1200, 1: 0, 2: 0, 3: 0}
+
+        # AND the breakdown of every database is kept
+        assert report.secs_per_database["alice"] == {0: 4800, 1: 600}
+        assert report.secs_per_database["bob"] == {0: 60, 2: 300, 3: 1800}
+
+    def test_rollup_aliases(self, team):
+        report = rollup_report(["alice", "bob"], team, datetime.date(2023, 5, 1), aliases={"dev": "coding"})
+
+        assert report.activity_set == ["coding", "meetings", "email"]
+        assert report.total_secs_per_activity == {0: 3600 + 60 + 1800, 1: 600, 2: 300}
+
+    def test_rollup_render(self, team):
+        report = rollup_report(["alice", "bob"], team, datetime.date(2023, 5, 1), datetime.date(2023, 5, 31))
+
+        assert report.render("png").startswith(b"\x89PNG")
+
+    def test_rollup_missing_database(self, team):
+        with pytest.raises(ValueError):
+            rollup_report(["alice", "carol"], team, datetime.date(2023, 5, 1))
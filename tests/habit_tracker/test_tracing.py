@@ -0,0 +1,129 @@
+import datetime
+import json
+import pytest
+
+from habit_tracker import tracing
+from habit_tracker.database.storage import create_database
+from habit_tracker.records import Record, RecordBatch
+from habit_tracker.tracker import Tracker
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.enable()
+    yield tracer
+    tracing.disable()
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def sample_tracker(request, tmp_path):
+    db = create_database("name", ["a", "bb"], tmp_path, request.param)
+    db.update_log(datetime.date(2023, 5, 1), RecordBatch.from_records([Record(0, 60, 0), Record(1, 120, 60)]))
+    db.update_log(datetime.date(2023, 5, 2), Record(1, 30, 0))
+    return Tracker(db, datetime.date(2023, 5, 2))
+
+
+class TestTracing:
+
+    def test_disabled_by_default(self, sample_tracker):
+        # GIVEN tracing is not enabled
+        # WHEN running a traced stage
+        with tracing.span("stage") as span:
+            span.set(records=1)
+
+        # THEN nothing is recorded
+        assert not span
+        assert tracing.current() is None
+
+    def test_report_spans(self, tracer, sample_tracker):
+        # GIVEN tracing is enabled
+        # WHEN generating, aggregating and rendering a report
+        report = sample_tracker.generate_report("01-05-2023", "02-05-2023")
+        report.total_secs_per_activity
+        report.render()
+
+        # THEN every stage is recorded with its wall and CPU time
+        events = {event["name"]: event for event in tracer.events}
+        db_cls = type(sample_tracker._db).__name__
+        assert {"Tracker.generate_report", f"{db_cls}.read_interval", "Report.total_secs_per_activity",
+                "Graphics.workday", "Graphics.render"} <= events.keys()
+        assert all(event["wall_ns"] > 0 and event["cpu_ns"] >= 0 for event in tracer.events)
+
+        # AND its counters
+        assert events[f"{db_cls}.read_interval"]["args"]["records"] == 3
+        assert events[f"{db_cls}.read_interval"]["args"]["bytes"] > 0
+        assert events["Report.total_secs_per_activity"]["args"]["records"] == 3
+        assert events["Graphics.workday"]["args"]["records"] == 3
+        assert events["Graphics.render"]["args"]["bytes"] > 0
+
+        # AND nested stages keep the stack they ran in
+        assert events[f"{db_cls}.read_interval"]["stack"] == ("Tracker.generate_report", f"{db_cls}.read_interval")
+
+    def test_iter_records_spans(self, tracer, sample_tracker):
+        # GIVEN tracing is enabled
+        # WHEN computing a report from a stream of records
+        report = sample_tracker.generate_report("01-05-2023", "02-05-2023", stream=True)
+        report.total_secs_per_activity
+
+        # THEN the reads of the stream are recorded, within the stage that consumed them
+        db_cls = type(sample_tracker._db).__name__
+        reads = [event for event in tracer.events if event["name"] == f"{db_cls}.iter_records"]
+        assert reads and sum(event["args"]["records"] for event in reads) == 3
+        assert all(event["stack"][0] == "Report.total_secs_per_activity" for event in reads)
+
+    def test_add_record_spans(self, tracer, sample_tracker):
+        sample_tracker.add_record(Record(0, 10, 500))
+
+        assert [event["stack"] for event in tracer.events] == [
+            ("Tracker.add_record", "BufferedAppender.flush"), ("Tracker.add_record",)]
+        assert tracer.events[0]["args"]["records"] == 1
+
+    def test_dump(self, tracer, tmp_path):
+        # GIVEN some nested spans
+        with tracing.span("outer"):
+            with tracing.span("inner", records=5):
+                pass
+
+        # WHEN dumping them as a Chrome trace and as folded stacks
+        tracer.dump(tmp_path / "trace.json")
+        tracer.dump(tmp_path / "trace.folded")
+
+        # THEN both files can be loaded by the usual viewers
+        trace = json.loads((tmp_path / "trace.json").read_text())
+        assert [(event["name"], event["ph"]) for event in trace["traceEvents"]] == [("inner", "X"), ("outer", "X")]
+        assert trace["traceEvents"][0]["args"]["records"] == 5
+        assert "cpu_ms" in trace["traceEvents"][0]["args"]
+        folded = (tmp_path / "trace.folded").read_text().splitlines()
+        assert [line.rsplit(" ", 1)[0] for line in folded] == ["outer", "outer;inner"]
+        assert all(int(line.rsplit(" ", 1)[1]) >= 0 for line in folded)
+
+    def test_bounded_events(self):
+        # GIVEN a tracer keeping at most 3 spans
+        tracer = tracing.Tracer(max_events=3)
+
+        # WHEN recording 5 spans
+        for i in range(5):
+            with tracer.span(f"stage{i}"):
+                pass
+
+        # THEN only the last 3 are kept, and the others are counted
+        assert [event["name"] for event in tracer.events] == ["stage2", "stage3", "stage4"]
+        assert tracer.dropped == 2
+        assert tracer.chrome_trace()["otherData"]["dropped_events"] == 2
+
+    def test_traced_decorator(self, tracer):
+        @tracing.traced()
+        def stage(x):
+            return x * 2
+
+        assert stage(2) == 4
+        assert tracer.events[0]["name"].endswith("stage")
+
+    def test_configure_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv(tracing.ENV_VAR, str(tmp_path / "trace.json"))
+        try:
+            assert tracing.configure_from_env() is tracing.current()
+        finally:
+            tracing.disable()
+        monkeypatch.delenv(tracing.ENV_VAR)
+        assert tracing.configure_from_env() is None
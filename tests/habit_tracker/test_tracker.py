@@ -2,9 +2,12 @@ import datetime
 import pytest
 import time
 
+from habit_tracker.database.appender import BufferedAppender
 from habit_tracker.tracker import Tracker, Record
+from habit_tracker.records import RecordBatch
 from habit_tracker.report import Report
 from habit_tracker.database.csv.database import CSVDatabase
+from habit_tracker.database.storage import create_database
 
 
 @pytest.fixture
@@ -86,7 +89,7 @@ class TestTrackerWithCSVDatabase:
 
         # Then the database saves the record.
         expected = sample_tracker._db.read_log(sample_tracker._date)
-        assert expected == [sample_record.values()]
+        assert expected == RecordBatch.from_records([sample_record])
 
         # AND the add_record() method returns True
         assert flag
@@ -103,7 +106,7 @@ class TestTrackerWithCSVDatabase:
 
         # Then the database does not save the record.
         expected = sample_tracker._db.read_log(sample_tracker._date)
-        assert expected == []
+        assert len(expected) == 0
 
         # AND the add_record() method returns True
         assert not flag
@@ -127,3 +130,111 @@ class TestTrackerWithCSVDatabase:
 
         # THEN a report is obtained
         assert isinstance(report, Report)
+
+    def test_generate_report_stream(self, sample_tracker):
+        # GIVEN a tracker with a record for its date
+        sample_tracker.add_record(Record(activity=1, interval_seconds=10, seconds_from_start=999))
+
+        # WHEN generating a report that streams its records
+        report = sample_tracker.generate_report("today", stream=True)
+
+        # THEN the records are not materialised, but the totals are the expected ones
+        assert report.is_stream
+        assert report.total_secs_per_activity == {1: 10}
+
+    def test_generate_report_totals_only(self, sample_tracker):
+        # GIVEN a tracker with some records for its date
+        sample_tracker.add_record(Record(activity=1, interval_seconds=10, seconds_from_start=999))
+        sample_tracker.add_record(Record(activity=1, interval_seconds=20, seconds_from_start=1999))
+
+        # WHEN generating a report with totals only
+        report = sample_tracker.generate_report("01-01-1999", "31-12-1999", totals_only=True)
+
+        # THEN the totals come from the summaries, and no record is read
+        assert report.records == {}
+        assert report.total_secs_per_activity == {1: 30}
+
+    def test_totals_to_date(self, sample_db):
+        # GIVEN a tracker on a Wednesday, with records earlier that week, month and year
+        tracker = Tracker(sample_db, datetime.date(2023, 3, 15))
+        sample_db.update_log(datetime.date(2023, 3, 15), Record(0, 1, 100))
+        sample_db.update_log(datetime.date(2023, 3, 13), Record(0, 10, 100))
+        sample_db.update_log(datetime.date(2023, 3, 1), Record(1, 100, 100))
+        sample_db.update_log(datetime.date(2023, 2, 10), Record(2, 1000, 100))
+
+        # THEN the totals of every period end at the tracker date
+        assert tracker.totals_to_date("week") == {0: 11}
+        assert tracker.totals_to_date("month") == {0: 11, 1: 100}
+        assert tracker.totals_to_date("30days") == {0: 11, 1: 100}
+        assert tracker.totals_to_date("year") == {0: 11, 1: 100, 2: 1000}
+
+        with pytest.raises(ValueError):
+            tracker.totals_to_date("decade")
+
+    def test_buffered_records(self, sample_db):
+        # GIVEN a tracker buffering up to 100 records
+        tracker = Tracker(sample_db, datetime.date(2023, 3, 15), BufferedAppender(sample_db, max_records=100))
+
+        # WHEN adding records at a high rate
+        for i in range(10):
+            tracker.add_record(Record(i % 3, 10, i * 10))
+
+        # THEN they are kept in the buffer until a report needs them
+        assert len(sample_db.read_log(datetime.date(2023, 3, 15))) == 0
+        assert tracker.generate_report("15-03-2023").total_secs_per_activity == {0: 40, 1: 30, 2: 30}
+        tracker.close()
+
+    def test_checkpoint(self, sample_tracker, monkeypatch):
+        # GIVEN a tracker that has been tracking an activity for 60 seconds
+        now = [1000.0]
+        monkeypatch.setattr("habit_tracker.tracker.time.time", lambda: now[0])
+        sample_tracker.start(1)
+        now[0] += 60
+
+        # WHEN checkpointing the activity
+        written = sample_tracker.checkpoint()
+
+        # THEN the time tracked so far is written, while the activity is still tracked
+        records = sample_tracker._db.read_log(sample_tracker.date)
+        assert written == 60
+        assert list(records.interval_seconds) == [60]
+        assert sample_tracker.is_tracking
+
+        # AND the next checkpoints, and stopping, update that record instead of adding new ones
+        now[0] += 60
+        assert sample_tracker.checkpoint() == 120
+        now[0] += 30
+        sample_tracker.stop()
+        records = sample_tracker._db.read_log(sample_tracker.date)
+        assert list(records.interval_seconds) == [150]
+        assert sample_tracker._db.secs_between(sample_tracker.date, sample_tracker.date) == {1: 150}
+        assert sample_tracker._db.read_summaries(sample_tracker.date)[sample_tracker.date].records == 1
+
+    @pytest.mark.parametrize("backend, options", [("sqlite", {}), ("csv", {"log_format": "binary"})])
+    def test_checkpoint_other_storage(self, tmp_path, monkeypatch, backend, options):
+        # GIVEN a tracker of another storage, tracking an activity after a record of the same day
+        now = [1000.0]
+        monkeypatch.setattr("habit_tracker.tracker.time.time", lambda: now[0])
+        db = create_database("name", ["a", "bb"], tmp_path, backend, **options)
+        tracker = Tracker(db, datetime.date(1999, 1, 1))
+        tracker.add_record(Record(0, 10, 0))
+        tracker.start(1)
+
+        # WHEN checkpointing it twice, then stopping it
+        for _ in range(2):
+            now[0] += 60
+            tracker.checkpoint()
+        now[0] += 5
+        tracker.stop()
+
+        # THEN the interval is a single record
+        records = tracker._db.read_log(tracker.date)
+        assert list(records.activity) == [0, 1] and list(records.interval_seconds) == [10, 125]
+        tracker.close()
+
+    def test_checkpoint_when_not_tracking(self, sample_tracker):
+        # GIVEN a tracker that isn't tracking any activity
+        # WHEN checkpointing
+        # THEN nothing is written
+        assert sample_tracker.checkpoint() == 0
+        assert len(sample_tracker._db.read_log(sample_tracker.date)) == 0